@@ -0,0 +1,66 @@
+"""
+为已有的问题回填 category 列:
+
+    python -m backend.backfill_categories [--batch-size 1000] [--all]
+
+旧数据库中没有 category 列时会先添加该列和索引。
+默认只处理 category 为空的问题, --all 会按当前的分类规则重新计算全部问题。
+"""
+import argparse
+
+from sqlalchemy import inspect, text, update
+
+from backend.database.base import Question
+from backend.database.database import SessionLocal, engine
+from backend.services.protocol_classifier import classify_question
+
+def ensure_category_column():
+    columns = {column["name"] for column in inspect(engine).get_columns("questions")}
+    if "category" in columns:
+        return
+    print("Adding questions.category column...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE questions ADD COLUMN category VARCHAR(64)"))
+        conn.execute(text("CREATE INDEX ix_questions_category ON questions (category)"))
+
+def backfill(batch_size: int = 1000, recompute_all: bool = False) -> int:
+    """按主键顺序分批回填, 返回更新的问题数量"""
+    db = SessionLocal()
+    updated = 0
+    last_id = None
+    try:
+        while True:
+            query = db.query(Question.question_id, Question.content)
+            if last_id is not None:
+                query = query.filter(Question.question_id > last_id)
+            if not recompute_all:
+                query = query.filter(Question.category.is_(None))
+            rows = query.order_by(Question.question_id).limit(batch_size).all()
+            if not rows:
+                break
+
+            db.execute(update(Question), [
+                {"question_id": question_id, "category": classify_question(content)}
+                for question_id, content in rows
+            ])
+            db.commit()
+
+            updated += len(rows)
+            last_id = rows[-1][0]
+            print(f"Backfilled {updated} questions")
+        return updated
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill questions.category")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--all", action="store_true", help="recompute categories for every question")
+    args = parser.parse_args()
+
+    ensure_category_column()
+    updated = backfill(batch_size=args.batch_size, recompute_all=args.all)
+    print(f"Done, {updated} questions updated")
+
+if __name__ == "__main__":
+    main()
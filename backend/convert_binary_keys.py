@@ -0,0 +1,75 @@
+"""
+把使用字符串主键的数据库复制到使用 BINARY(16) 主键的新数据库:
+
+    DB_BINARY_KEYS=true DATABASE_URL=<新数据库> python -m backend.convert_binary_keys --source <旧数据库> [--batch-size 5000]
+
+新数据库先执行迁移建表, 然后按外键顺序分批复制每张表, 所有 ID 列经过 UUIDKey 转换。
+UUID 格式的 ID 转换后保持不变; 不是 UUID 格式的旧 ID (例如 'admin1') 映射为固定的 uuid5,
+之后用旧 ID 查询仍然能找到同一行, 但 API 返回的是新的 UUID 字符串。
+旧数据库不会被修改, 确认无误后把 DATABASE_URL 指向新数据库并保持 DB_BINARY_KEYS=true。
+"""
+import argparse
+
+from sqlalchemy import column, create_engine, func, inspect, select, table
+
+from backend.config import settings
+from backend.database.base import Base
+from backend.database.database import engine
+from backend.database.migrate import upgrade_to_head
+from backend.database.types import UUIDKey
+
+def copy_table(source_conn, target_conn, table_name: str, batch_size: int) -> int:
+    """按源表的列复制一张表, 返回复制的行数"""
+    model_columns = Base.metadata.tables[table_name].columns
+    names = [column["name"] for column in inspect(source_conn).get_columns(table_name) if column["name"] in model_columns]
+    # 只有 ID 列需要转换, 其他列不指定类型, 驱动读出的原始值原样写入 (SQLite 中时间字符串的格式也保持不变)
+    source_table = table(table_name, *[column(name) for name in names])
+    target_table = table(table_name, *[
+        column(name, model_columns[name].type if isinstance(model_columns[name].type, UUIDKey) else None)
+        for name in names
+    ])
+
+    copied = 0
+    result = source_conn.execution_options(yield_per=batch_size).execute(select(*source_table.columns))
+    for rows in result.partitions():
+        # 每批一次 executemany, 绑定参数时由 UUIDKey 把 ID 转换成 16 字节
+        target_conn.execute(target_table.insert(), [dict(zip(names, row)) for row in rows])
+        target_conn.commit()
+        copied += len(rows)
+        print(f"{table_name}: {copied} rows")
+    return copied
+
+def convert(source_url: str, batch_size: int = 5000) -> int:
+    if not settings.DB_BINARY_KEYS:
+        raise SystemExit("Set DB_BINARY_KEYS=true so the target database is created with BINARY(16) keys")
+    if source_url == settings.DATABASE_URL:
+        raise SystemExit("--source must be a different database than DATABASE_URL")
+
+    upgrade_to_head()
+    source_engine = create_engine(source_url)
+    total = 0
+    try:
+        with source_engine.connect() as source_conn, engine.connect() as target_conn:
+            source_tables = set(inspect(source_conn).get_table_names())
+            for table in Base.metadata.sorted_tables:
+                if target_conn.execute(select(func.count()).select_from(table)).scalar():
+                    raise SystemExit(f"Target table {table.name} is not empty")
+            # sorted_tables 按外键依赖排序, 父表先于子表复制
+            for table in Base.metadata.sorted_tables:
+                if table.name in source_tables:
+                    total += copy_table(source_conn, target_conn, table.name, batch_size)
+    finally:
+        source_engine.dispose()
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy a string-keyed database into a BINARY(16)-keyed one")
+    parser.add_argument("--source", required=True, help="SQLAlchemy URL of the existing database")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    total = convert(args.source, batch_size=args.batch_size)
+    print(f"Done, {total} rows copied")
+
+if __name__ == "__main__":
+    main()
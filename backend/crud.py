@@ -2,8 +2,11 @@ from sqlalchemy.orm import Session
 from backend import models
 from backend.database.base import User, Question, Solution, Feedback, Protocol, Knowledge
 from backend import schemas
-import uuid
+from backend.database.pagination import keyset_page
+from backend.services.protocol_classifier import classify_question
+from backend.database.types import new_id
 from datetime import datetime
+from typing import Optional
 
 # --- User ---
 def get_user(db: Session, user_id: str):
@@ -12,8 +15,8 @@ def get_user(db: Session, user_id: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    return keyset_page(db.query(User), [User.register_date, User.user_id], cursor, limit)
 
 def create_user(db: Session, user: schemas.UserCreate):
     db_user = User(**user.dict())
@@ -26,11 +29,8 @@ def create_user(db: Session, user: schemas.UserCreate):
 def get_question(db: Session, question_id: str):
     return db.query(Question).filter(Question.question_id == question_id).first()
 
-def get_questions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Question).offset(skip).limit(limit).all()
-
 def create_question(db: Session, question: schemas.QuestionCreate, user_id: str):
-    question_id = str(uuid.uuid4())
+    question_id = new_id()
     db_question = Question(
         question_id=question_id,
         user_id=user_id,
@@ -38,6 +38,7 @@ def create_question(db: Session, question: schemas.QuestionCreate, user_id: str)
         image_url=question.image_url,
         file_url=question.file_url,
         file_name=question.file_name,
+        category=classify_question(question.content),
         ask_time=datetime.now()
     )
     db.add(db_question)
@@ -48,11 +49,8 @@ def create_question(db: Session, question: schemas.QuestionCreate, user_id: str)
 def get_solution(db: Session, solution_id: str):
     return db.query(Solution).filter(Solution.solution_id == solution_id).first()
 
-def get_solutions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Solution).offset(skip).limit(limit).all()
-
 def create_solution(db: Session, solution: schemas.SolutionCreate):
-    solution_id = str(uuid.uuid4())
+    solution_id = new_id()
     db_solution = Solution(
         solution_id=solution_id,
         question_id=solution.question_id,
@@ -66,7 +64,7 @@ def create_solution(db: Session, solution: schemas.SolutionCreate):
 
 # --- Feedback ---
 def create_feedback(db: Session, feedback: schemas.FeedbackCreate):
-    feedback_id = str(uuid.uuid4())
+    feedback_id = new_id()
     db_feedback = Feedback(
         feedback_id=feedback_id,
         user_id=feedback.user_id,
@@ -0,0 +1,113 @@
+# 聊天和认证高频路径使用的异步 CRUD, 与 crud.py 中的同名函数一一对应
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
+from . import base as models
+from . import schemas
+from .pagination import keyset_query, split_page
+from .types import new_id
+from backend.services.protocol_classifier import classify_question
+
+# User CRUD
+async def get_user(db: AsyncSession, user_id: str):
+    result = await db.execute(select(models.User).filter(models.User.user_id == user_id))
+    return result.scalars().first()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).filter(models.User.username == username))
+    return result.scalars().first()
+
+# Question CRUD
+async def create_question_with_solution(
+    db: AsyncSession,
+    question: schemas.QuestionCreate,
+    user_id: str,
+    steps: str,
+    confidence_score: float,
+    knowledge_ids: List[str]
+) -> Dict[str, str]:
+    """
+    在一个事务中保存问题、解决方案和引用的知识条目。
+    主键在客户端生成, 只提交一次且不 refresh, 返回新记录的 id。
+    """
+    question_id = new_id()
+    solution_id = new_id()
+    try:
+        db.add_all([
+            models.Question(
+                **question.dict(),
+                question_id=question_id,
+                user_id=user_id,
+                category=classify_question(question.content)
+            ),
+            models.Solution(
+                solution_id=solution_id,
+                question_id=question_id,
+                steps=steps,
+                confidence_score=confidence_score
+            ),
+        ])
+        await db.flush()
+        if knowledge_ids:
+            await db.execute(
+                models.solution_references_knowledge.insert(),
+                [{"solution_id": solution_id, "knowledge_id": knowledge_id} for knowledge_id in knowledge_ids]
+            )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return {"question_id": question_id, "solution_id": solution_id}
+
+async def get_user_conversations(
+    db: AsyncSession,
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    question_fields: Sequence[str] = (),
+    solution_fields: Optional[Sequence[str]] = None,
+    load_feedbacks: bool = False
+):
+    """
+    按提问时间倒序分页读取用户的问答记录, 返回 (问题列表, 下一页游标)。
+    解决方案与问题一起 JOIN 查出, 反馈用一次 IN 查询批量加载, 查询次数与记录数量无关。
+    question_fields / solution_fields 只加载需要的列, solution_fields 为 None 时不加载解决方案。
+    """
+    columns = [models.Question.ask_time, models.Question.question_id]
+    query = (
+        select(models.Question)
+        .filter(models.Question.user_id == user_id)
+        .options(load_only(*{
+            models.Question.question_id,
+            models.Question.ask_time,
+            *[getattr(models.Question, field) for field in question_fields],
+        }))
+    )
+    if solution_fields is not None:
+        solution = joinedload(models.Question.solution).load_only(*{
+            models.Solution.solution_id,
+            *[getattr(models.Solution, field) for field in solution_fields],
+        })
+        if load_feedbacks:
+            # 只加载该用户自己的反馈
+            solution = solution.selectinload(
+                models.Solution.feedbacks.and_(models.Feedback.user_id == user_id)
+            ).load_only(models.Feedback.rating, models.Feedback.comment, models.Feedback.created_at)
+        query = query.options(solution)
+
+    result = await db.execute(keyset_query(query, columns, cursor, limit))
+    return split_page(result.scalars().unique().all(), columns, limit)
+
+# Knowledge CRUD
+async def get_knowledge_by_ids(db: AsyncSession, knowledge_ids: List[str]):
+    """按给定的顺序返回知识条目，不存在的条目会被跳过"""
+    if not knowledge_ids:
+        return []
+    result = await db.execute(select(models.Knowledge).filter(models.Knowledge.knowledge_id.in_(knowledge_ids)))
+    by_id = {row.knowledge_id: row for row in result.scalars().all()}
+    return [by_id[knowledge_id] for knowledge_id in knowledge_ids if knowledge_id in by_id]
@@ -2,8 +2,9 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Integer,
-                        String, Text, Table, func)
-import uuid
+                        Index, String, Text, Table, func)
+
+from backend.database.types import key_type, new_id
 
 Base = declarative_base()
 
@@ -11,13 +12,13 @@ Base = declarative_base()
 solution_references_knowledge = Table(
     'solution_references_knowledge',
     Base.metadata,
-    Column('solution_id', String(255), ForeignKey('solutions.solution_id'), primary_key=True),
-    Column('knowledge_id', String(255), ForeignKey('knowledge.knowledge_id'), primary_key=True)
+    Column('solution_id', key_type(), ForeignKey('solutions.solution_id'), primary_key=True),
+    Column('knowledge_id', key_type(), ForeignKey('knowledge.knowledge_id'), primary_key=True)
 )
 
 class User(Base):
     __tablename__ = "users"
-    user_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(key_type(), primary_key=True, default=new_id)
     username = Column(String(255), unique=True, index=True, nullable=False)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
@@ -26,9 +27,14 @@ class User(Base):
     questions = relationship("Question", back_populates="owner")
     feedbacks = relationship("Feedback", back_populates="owner")
 
+    __table_args__ = (
+        # 用户列表的游标分页
+        Index("ix_users_register_date_id", "register_date", "user_id"),
+    )
+
 class Protocol(Base):
     __tablename__ = "protocols"
-    protocol_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
+    protocol_id = Column(key_type(), primary_key=True, default=new_id)
     name = Column(String(255), nullable=False, comment="协定名称, 例如: BGP, OSPF")
     rfc_number = Column(String(255), comment="相关的 RFC 文件编号")
 
@@ -36,8 +42,8 @@ class Protocol(Base):
 
 class Knowledge(Base):
     __tablename__ = "knowledge"
-    knowledge_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
-    protocol_id = Column(String(255), ForeignKey("protocols.protocol_id"), nullable=True)
+    knowledge_id = Column(key_type(), primary_key=True, default=new_id)
+    protocol_id = Column(key_type(), ForeignKey("protocols.protocol_id"), nullable=True)
     content = Column(Text, nullable=False)
     source = Column(String(2048), nullable=True, comment="知识来源, 如文件名或网址")
     update_time = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -49,25 +55,38 @@ class Knowledge(Base):
         back_populates="references_knowledge"
     )
 
+    __table_args__ = (
+        Index("ix_knowledge_protocol_id", "protocol_id"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
-    question_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    question_id = Column(key_type(), primary_key=True, default=new_id)
+    user_id = Column(key_type(), ForeignKey("users.user_id"), nullable=False)
     content = Column(Text, nullable=False)
     image_url = Column(String(2048), nullable=True)
     file_url = Column(String(2048), nullable=True, comment="附件文件的存储路径")
     file_name = Column(String(255), nullable=True, comment="附件文件的原始名称")
+    category = Column(String(64), nullable=True, index=True, comment="问题的协议分类, 创建问题时计算")
     ask_time = Column(DateTime, server_default=func.now())
 
     owner = relationship("User", back_populates="questions")
     solution = relationship("Solution", uselist=False, back_populates="question")
 
+    __table_args__ = (
+        # 问题列表的游标分页
+        Index("ix_questions_ask_time_id", "ask_time", "question_id"),
+        # 单个用户问答记录的游标分页
+        Index("ix_questions_user_ask_time_id", "user_id", "ask_time", "question_id"),
+    )
+
 class Solution(Base):
     __tablename__ = "solutions"
-    solution_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
-    question_id = Column(String(255), ForeignKey("questions.question_id"), nullable=False, unique=True)
+    solution_id = Column(key_type(), primary_key=True, default=new_id)
+    question_id = Column(key_type(), ForeignKey("questions.question_id"), nullable=False, unique=True)
     steps = Column(Text, nullable=True, comment="分步解决方案的内容")
     confidence_score = Column(Float, nullable=True, comment="系统对解决方案准确性的置信度评分 (0.0 - 1.0)")
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
 
     question = relationship("Question", back_populates="solution")
     feedbacks = relationship("Feedback", back_populates="solution")
@@ -77,15 +96,48 @@ class Solution(Base):
         back_populates="referenced_by_solutions"
     )
 
+    __table_args__ = (
+        # 解决方案列表的游标分页
+        Index("ix_solutions_created_at_id", "created_at", "solution_id"),
+    )
+
 class Feedback(Base):
     __tablename__ = "feedbacks"
-    feedback_id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
-    solution_id = Column(String(255), ForeignKey("solutions.solution_id"), nullable=False)
+    feedback_id = Column(key_type(), primary_key=True, default=new_id)
+    user_id = Column(key_type(), ForeignKey("users.user_id"), nullable=False)
+    solution_id = Column(key_type(), ForeignKey("solutions.solution_id"), nullable=False)
     rating = Column(Integer, nullable=True, comment="使用者给出的评分")
     comment = Column(Text, nullable=True)
     status = Column(String(255), nullable=True, default="待处理", comment="反馈状态: 待处理, 处理中, 已处理")
     created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
     
     owner = relationship("User", back_populates="feedbacks")
-    solution = relationship("Solution", back_populates="feedbacks") 
\ No newline at end of file
+    solution = relationship("Solution", back_populates="feedbacks")
+
+    __table_args__ = (
+        # 反馈列表的游标分页
+        Index("ix_feedbacks_created_at_id", "created_at", "feedback_id"),
+        # 问答记录中按解决方案加载用户自己的反馈
+        Index("ix_feedbacks_solution_user", "solution_id", "user_id"),
+        Index("ix_feedbacks_user_created", "user_id", "created_at"),
+        # 反馈统计只需要扫描这个覆盖索引
+        Index("ix_feedbacks_status_rating", "status", "rating"),
+    )
+
+class HotQuestionClick(Base):
+    __tablename__ = "hot_question_clicks"
+    click_id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(String(255), nullable=False, comment="热门问题 ID")
+    clicked_at = Column(DateTime, nullable=False, server_default=func.now(), comment="点击时间")
+
+    __table_args__ = (
+        Index("ix_hot_question_clicks_question_time", "question_id", "clicked_at"),
+    )
+
+class HotQuestionSnapshot(Base):
+    __tablename__ = "hot_question_snapshots"
+    question_id = Column(String(32), primary_key=True, comment="热门问题短 ID (规范化问题的哈希)")
+    question = Column(Text, nullable=False)
+    score = Column(Float, nullable=False, comment="updated_at 时刻的衰减分数")
+    users = Column(Integer, nullable=False, default=0, server_default="0", comment="问过该问题的不同用户数 (各 worker 累加的近似值)")
+    updated_at = Column(DateTime, nullable=False)
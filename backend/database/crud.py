@@ -1,11 +1,15 @@
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from . import base as models # Rename import for consistency
 from . import schemas
+from .pagination import keyset_page
 import bcrypt
+from backend.config import settings
+from backend.services.protocol_classifier import classify_question
 
 # Utility for password hashing
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
 
 # User CRUD
 def get_user(db: Session, user_id: str):
@@ -17,6 +21,10 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = 100, skip: int = 0):
+    """按注册时间倒序的游标分页, 返回 (用户列表, 下一页游标)"""
+    return keyset_page(db.query(models.User), [models.User.register_date, models.User.user_id], cursor, limit, skip=skip)
+
 def create_user(db: Session, user: schemas.UserCreate):
     db_user = models.User(
         user_id=user.user_id,
@@ -31,7 +39,11 @@ def create_user(db: Session, user: schemas.UserCreate):
 
 # Question CRUD
 def create_question(db: Session, question: schemas.QuestionCreate, user_id: str):
-    db_question = models.Question(**question.dict(), user_id=user_id)
+    db_question = models.Question(
+        **question.dict(),
+        user_id=user_id,
+        category=classify_question(question.content)
+    )
     db.add(db_question)
     db.commit()
     db.refresh(db_question)
@@ -68,9 +80,17 @@ def create_protocol(db: Session, protocol: schemas.ProtocolCreate):
 def get_knowledge(db: Session, knowledge_id: str):
     return db.query(models.Knowledge).filter(models.Knowledge.knowledge_id == knowledge_id).first()
 
+def get_knowledge_by_ids(db: Session, knowledge_ids: List[str]):
+    """按给定的顺序返回知识条目，不存在的条目会被跳过"""
+    if not knowledge_ids:
+        return []
+    rows = db.query(models.Knowledge).filter(models.Knowledge.knowledge_id.in_(knowledge_ids)).all()
+    by_id = {row.knowledge_id: row for row in rows}
+    return [by_id[knowledge_id] for knowledge_id in knowledge_ids if knowledge_id in by_id]
+
 def create_knowledge(db: Session, knowledge: schemas.KnowledgeCreate):
     db_knowledge = models.Knowledge(**knowledge.dict())
     db.add(db_knowledge)
     db.commit()
     db.refresh(db_knowledge)
-    return db_knowledge 
\ No newline at end of file
+    return db_knowledge
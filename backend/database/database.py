@@ -1,18 +1,145 @@
 import os
+import logging
+import threading
+import time
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 # 使用 config.py 中的设置
 DATABASE_URL = settings.DATABASE_URL
 print(f"Using database URL: {DATABASE_URL}")
 
+class PoolMetrics:
+    """记录从连接池获取连接的次数、等待时间和超时次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+class _PoolWaitMixin:
+    """统计每次取连接的等待时间, 等待过长时记录日志; metrics 由子类指定"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.metrics.record_wait(waited, timed_out)
+            if timed_out or waited * 1000 >= settings.DB_POOL_SLOW_WAIT_MS:
+                logger.warning(f"数据库连接池 ({type(self).__name__}) 等待 {waited * 1000:.1f} ms: {self.status()}")
+
+class InstrumentedQueuePool(_PoolWaitMixin, QueuePool):
+    """同步引擎使用的 QueuePool"""
+
+    metrics = pool_metrics
+
+class InstrumentedAsyncQueuePool(_PoolWaitMixin, AsyncAdaptedQueuePool):
+    """异步引擎使用的 AsyncAdaptedQueuePool, 等待时间在协程中测量, 与同步池分开统计"""
+
+    metrics = async_pool_metrics
+
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "mysql+mysqlconnector": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def _engine_options(url: str, is_async: bool = False) -> dict:
+    # SQLite (本地测试) 不支持 READ COMMITTED, 也不需要连接池参数
+    if url.startswith("sqlite"):
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+    return {
+        "isolation_level": "READ COMMITTED",
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 # Create engine
-engine = create_engine(DATABASE_URL, isolation_level="READ COMMITTED")
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# 异步引擎和会话, 供聊天和认证等高频路径使用, 不阻塞事件循环
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_status() -> dict:
+    """连接池当前的使用情况: 已借出、空闲的连接数和等待统计"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__, **pool_metrics.snapshot()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "pool_size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+
+    async_pool = async_engine.pool
+    if isinstance(async_pool, QueuePool):
+        status["async"] = {
+            "pool_class": type(async_pool).__name__,
+            **async_pool_metrics.snapshot(),
+            "pool_size": async_pool.size(),
+            "checked_out": async_pool.checkedout(),
+            "idle": async_pool.checkedin(),
+            "overflow": async_pool.overflow(),
+        }
+    return status
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from backend.config import settings
+from backend.database.database import engine
+from backend.database.types import stored_keys_are_binary
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# 多个 worker 同时启动时用 MySQL 命名锁保证只有一个在执行迁移, 其余等待后发现已是最新版本
+MIGRATION_LOCK_NAME = "agentai_alembic_upgrade"
+MIGRATION_LOCK_TIMEOUT = 600
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    # 由应用调用时沿用应用自己的日志配置
+    config.attributes["configure_logger"] = False
+    return config
+
+@contextmanager
+def migration_lock():
+    """MySQL 上持有 GET_LOCK 命名锁直到退出; SQLite 只用于本地单进程测试, 不加锁"""
+    if engine.dialect.name not in ("mysql", "mariadb"):
+        yield
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+        ).scalar()
+        if acquired != 1:
+            raise RuntimeError(f"Timed out after {MIGRATION_LOCK_TIMEOUT}s waiting for migration lock {MIGRATION_LOCK_NAME}")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+def upgrade_to_head():
+    """把数据库升级到最新版本, 已是最新时什么也不做"""
+    with migration_lock():
+        command.upgrade(alembic_config(), "head")
+    check_key_storage()
+
+def check_key_storage():
+    """DB_BINARY_KEYS 必须与数据库中主键列的实际类型一致, 否则所有按 ID 的查询都查不到数据"""
+    binary = stored_keys_are_binary(inspect(engine))
+    if binary != settings.DB_BINARY_KEYS:
+        raise RuntimeError(
+            f"DB_BINARY_KEYS={settings.DB_BINARY_KEYS} but the database stores "
+            f"{'BINARY(16)' if binary else 'string'} keys; "
+            "set DB_BINARY_KEYS accordingly or convert with python -m backend.convert_binary_keys"
+        )
+
+if __name__ == "__main__":
+    # 部署时在启动 uvicorn 之前执行一次: python -m backend.database.migrate
+    upgrade_to_head()
+    print("Database is up to date")
@@ -0,0 +1,96 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, String, literal, tuple_
+
+def encode_cursor(values: List[Any]) -> str:
+    """把排序键编码成对客户端不透明的游标字符串"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """解析游标; 格式不正确时返回 400"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def _cursor_value(column, value):
+    """
+    游标中的时间是 str(datetime) 字符串, 按字符串绑定: MySQL 会把它转换成 DATETIME 比较,
+    SQLite 中时间本来就以同样格式的字符串保存, 转换成 datetime 反而会因为格式不同而比较出错。
+    其他值按列的类型绑定 (二进制主键需要经过 UUIDKey 转换)
+    """
+    if value is not None and isinstance(column.type, DateTime):
+        try:
+            datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return literal(value, type_=String())
+    if value is not None:
+        return literal(value, type_=column.type)
+    return value
+
+def keyset_query(query, columns: Sequence, cursor: Optional[str], limit: int, skip: int = 0):
+    """
+    给 Query 或 select() 加上游标条件、倒序排序和 LIMIT (多取一条用来判断是否还有下一页)。
+    columns 的最后一列必须唯一 (一般是主键)。
+    skip 是已废弃的 OFFSET 分页, 只为旧客户端保留, 返回的游标同样可以用来取下一页。
+    """
+    if skip and cursor:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+    after = decode_cursor(cursor, len(columns))
+    if after is not None:
+        values = [_cursor_value(column, value) for column, value in zip(columns, after)]
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    query = query.order_by(*[column.desc() for column in columns])
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def split_page(
+    rows: list,
+    columns: Sequence,
+    limit: int,
+    key: Optional[Callable[[Any], List[Any]]] = None
+) -> Tuple[list, Optional[str]]:
+    """把 keyset_query 的结果拆成 (本页数据, 下一页游标)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(key(last) if key else [getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+def keyset_page(
+    query,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    key: Optional[Callable[[Any], List[Any]]] = None,
+    skip: int = 0
+) -> Tuple[list, Optional[str]]:
+    """
+    按 columns 倒序 (最新的在前) 做游标分页。
+    用 (a, b) < (:a, :b) 定位到上一页的最后一行, 配合 (a, b) 复合索引,
+    任何一页的代价都和第一页相同。返回 (本页数据, 下一页游标)。
+    """
+    rows = keyset_query(query, columns, cursor, limit, skip).all()
+    return split_page(rows, columns, limit, key)
+
+# 已废弃的 skip 参数, 列表接口共用
+SKIP_DEPRECATED = "Deprecated: OFFSET paging, use cursor (next_cursor from the previous page) instead"
+
+def mark_deprecated_skip(response, skip: Optional[int]):
+    """旧客户端仍在使用 skip 时在响应头中提示 (RFC 9745 Deprecation)"""
+    if skip is not None:
+        response.headers["Deprecation"] = "true"
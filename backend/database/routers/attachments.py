@@ -0,0 +1,225 @@
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import settings
+
+router = APIRouter()
+
+UPLOAD_ROOT = Path(settings.UPLOAD_DIR).resolve()
+
+# save_upload_file 生成的内容寻址文件名: <sha256><扩展名>, 存放在 sha256 前两位的子目录下
+CONTENT_ADDRESSED_PATTERN = re.compile(r"([0-9a-f]{64})(\.[a-z0-9]{1,10})?")
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+# 允许浏览器直接显示的类型, 其他扩展名 (html、svg、js 等) 一律作为附件下载,
+# 避免上传的文件在 API 的源下被当作页面或脚本执行
+INLINE_MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".txt": "text/plain; charset=utf-8",
+    ".log": "text/plain; charset=utf-8",
+    ".cfg": "text/plain; charset=utf-8",
+    ".conf": "text/plain; charset=utf-8",
+    ".pcap": "application/vnd.tcpdump.pcap",
+    ".pcapng": "application/vnd.tcpdump.pcap",
+    ".cap": "application/vnd.tcpdump.pcap",
+}
+DOWNLOAD_MEDIA_TYPE = "application/octet-stream"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 旧的按时间戳命名的文件可能被覆盖, 每次使用前需要重新验证
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+class RangeFileResponse(FileResponse):
+    """
+    只发送文件中 [start, start + length) 这一段的 FileResponse。
+    服务器支持 http.response.zerocopysend 扩展时, 由服务器直接 sendfile, 数据不经过 Python。
+    """
+
+    def __init__(self, path: Path, start: int, length: int, **kwargs):
+        super().__init__(path, **kwargs)
+        self.start = start
+        self.length = length
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if self.send_header_only or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # 发送过程中文件被截断, 结束响应避免客户端一直等待
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def resolve_upload_path(file_path: str) -> Path:
+    """把 URL 中的路径映射到上传目录内的文件, 拒绝目录穿越和隐藏文件 (如 .tmp 临时目录)"""
+    if any(part.startswith(".") for part in Path(file_path).parts):
+        raise HTTPException(status_code=404, detail="File not found")
+    path = (UPLOAD_ROOT / file_path).resolve()
+    if UPLOAD_ROOT not in path.parents:
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
+
+def content_digest(path: Path) -> Optional[str]:
+    """内容寻址文件返回文件名中的 sha256, 其他文件返回 None"""
+    match = CONTENT_ADDRESSED_PATTERN.fullmatch(path.name)
+    if match and path.parent.name == match.group(1)[:2]:
+        return match.group(1)
+    return None
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 请求头, 返回 (start, end) 闭区间。
+    多段或格式错误的 Range 返回 None (按 RFC 9110 忽略, 返回完整文件),
+    无法满足的范围抛出 416。
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.group(1), match.group(2)
+    if first == "":
+        # bytes=-N: 最后 N 个字节
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise_unsatisfiable(size)
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise_unsatisfiable(size)
+    return start, min(end, size - 1)
+
+def raise_unsatisfiable(size: int):
+    raise HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}", "X-Content-Type-Options": "nosniff"}
+    )
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def media_type_headers(path: Path) -> Tuple[str, dict]:
+    """返回响应的 Content-Type 和安全相关的响应头, 不在白名单中的类型强制下载"""
+    headers = {"X-Content-Type-Options": "nosniff"}
+    media_type = INLINE_MEDIA_TYPES.get(path.suffix.lower())
+    if media_type is None:
+        media_type = DOWNLOAD_MEDIA_TYPE
+        headers["Content-Disposition"] = "attachment"
+    return media_type, headers
+
+def range_applies(request: Request, etag: str, last_modified: str) -> bool:
+    """If-Range 与当前版本不一致时忽略 Range, 返回完整文件"""
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+@router.api_route("/static/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def get_attachment(file_path: str, request: Request):
+    """
+    提供上传的附件, 支持 Range (断点续传/拖动日志和抓包文件) 和协商缓存。
+    内容寻址的文件内容永远不会变, 使用 sha256 作为 ETag 并标记为 immutable。
+    只有图片、文本和抓包文件按原类型返回, 其他文件以 application/octet-stream 下载。
+    """
+    path = resolve_upload_path(file_path)
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    size = stat_result.st_size
+    digest = content_digest(path)
+    if digest:
+        etag = f'"{digest}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{int(stat_result.st_mtime_ns):x}-{size:x}"'
+        cache_control = REVALIDATE_CACHE_CONTROL
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+
+    media_type, headers = media_type_headers(path)
+    headers.update({
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    })
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    range_header = request.headers.get("range")
+    if range_header and range_applies(request, etag, last_modified):
+        byte_range = parse_range(range_header, size)
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(0, end - start + 1)
+    headers["Content-Length"] = str(length)
+    return RangeFileResponse(
+        path,
+        start=start,
+        length=length,
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result,
+        method=request.method,
+    )
@@ -1,102 +1,122 @@
 import os
+import re
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Form, Request, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Form, Request, Query
+from fastapi.responses import StreamingResponse
 from typing import Dict, Optional, List
-from backend.database import crud, schemas
-from backend.database.database import SessionLocal
+from backend.database import async_crud, schemas
+from backend.database.database import AsyncSessionLocal
 from backend.config import settings
-from openai import OpenAI
-import shutil
+from backend.services.llm_client import llm_client
+from backend.services.answer_cache import answer_cache
+from backend.services.knowledge_index import knowledge_index
+from backend.services.protocol_classifier import classify_question
+from backend.services.event_queue import event_queue
+from backend.services.trending import trending_questions
+from backend.database.base import HotQuestionClick
+import aiofiles
+import hashlib
 from pathlib import Path
 from datetime import datetime
 import uuid
 import json
 from pydantic import BaseModel
 import traceback
-import jwt
 from typing import Optional
-from backend.database.routers.users import SECRET_KEY, ALGORITHM  # 导入 users.py 中的 JWT 设置
+from backend.database.routers.users import verify_token  # 导入 users.py 中的 token 校验
 
 router = APIRouter()
 
 # 确保上传目录存在
-UPLOAD_DIR = Path("backend/static/uploads")
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_TMP_DIR = UPLOAD_DIR / ".tmp"
+UPLOAD_TMP_DIR.mkdir(exist_ok=True)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+SAFE_SUFFIX_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
 
-# 验证 JWT token
-async def verify_token(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization header missing")
-    
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # 验证用户是否存在
-        user = crud.get_user(db, user_id=user_id)
-        if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return user
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=f"Authentication error: {str(e)}")
+def safe_suffix(filename: Optional[str]) -> str:
+    """只保留简单的扩展名, 客户端提供的文件名不会出现在存储路径中"""
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if SAFE_SUFFIX_PATTERN.fullmatch(suffix) else ""
 
 async def save_upload_file(upload_file: UploadFile) -> str:
-    # 生成唯一文件名
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{upload_file.filename}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    try:
-        # 保存文件
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-        return f"/static/uploads/{unique_filename}"
-    finally:
-        upload_file.file.close()
-
-def get_ai_response(question_content: str) -> Dict:
-    client = OpenAI(
-        api_key=settings.KIMI_API_KEY,
-        base_url="https://api.moonshot.cn/v1",
-    )
+    """
+    分块流式保存上传文件, 边写边计算 SHA-256, 超过大小上限时返回 413。
+    文件按内容哈希存放 (uploads/ab/abcd...ext), 相同内容只保存一份。
+    """
+    tmp_path = UPLOAD_TMP_DIR / f"{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
 
     try:
-        # 实际API调用
-        completion = client.chat.completions.create(
-            model="moonshot-v1-8k",
-            messages=[
-                {"role": "system", "content": "你是 Kimi，由 Moonshot AI 提供的人工智能助手。请尽可能给出结构化的回答，使用适当的标题、项目符号和代码块来提高可读性。"},
-                {"role": "user", "content": question_content}
-            ],
-            temperature=0.3,
-        )
-        ai_steps = completion.choices[0].message.content
-        confidence = 0.95
-        return {"steps": ai_steps, "confidence_score": confidence}
-    except Exception as e:
-        # 如果API调用失败，返回模拟数据
-        print(f"AI API调用失败，使用模拟数据: {e}")
-        # 根据问题内容生成一个简单的回应
-        if "OSPF" in question_content:
-            ai_steps = """OSPF（开放式最短路径优先）协议是一种内部网关协议，用于在单一自治系统内确定路由。配置OSPF的基本步骤：
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = await upload_file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File {upload_file.filename} exceeds the {settings.UPLOAD_MAX_BYTES} byte limit"
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        sha256 = digest.hexdigest()
+        relative_path = f"{sha256[:2]}/{sha256}{safe_suffix(upload_file.filename)}"
+        file_path = UPLOAD_DIR / relative_path
+        if not file_path.exists():
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, file_path)
+        return f"/static/uploads/{relative_path}"
+    finally:
+        await upload_file.close()
+        # 出错或内容已存在时删除临时文件
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+SYSTEM_PROMPT = "你是 Kimi，由 Moonshot AI 提供的人工智能助手。请尽可能给出结构化的回答，使用适当的标题、项目符号和代码块来提高可读性。"
+
+# 前端用来控制打字速度的延迟标记
+PAUSE_MARKER_PATTERN = re.compile(r"<pause-(short|medium|long)>")
+
+async def retrieve_references(question_content: str) -> List[Dict]:
+    """从知识库索引中检索与问题最相关的段落, 数据库连接在调用 LLM 之前就已归还"""
+    hits = knowledge_index.search(question_content, k=settings.KNOWLEDGE_TOP_K)
+    if not hits:
+        return []
+    async with AsyncSessionLocal() as db:
+        entries = await async_crud.get_knowledge_by_ids(db, [knowledge_id for knowledge_id, _ in hits])
+    return [
+        {
+            "knowledge_id": entry.knowledge_id,
+            "content": entry.content[:settings.KNOWLEDGE_PASSAGE_CHARS],
+            "source": entry.source,
+        }
+        for entry in entries
+    ]
+
+def build_messages(question_content: str, references: Optional[List[Dict]] = None) -> List[Dict]:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if references:
+        passages = []
+        for index, reference in enumerate(references, 1):
+            source = f"（来源: {reference['source']}）" if reference.get("source") else ""
+            passages.append(f"[{index}]{source}\n{reference['content']}")
+        messages.append({
+            "role": "system",
+            "content": "以下是知识库中与问题相关的资料，回答时请优先参考：\n\n" + "\n\n".join(passages)
+        })
+    messages.append({"role": "user", "content": question_content})
+    return messages
+
+def get_fallback_answer(question_content: str) -> str:
+    """AI API 不可用时，根据问题内容生成一个简单的回应"""
+    protocol = classify_question(question_content)
+    if protocol == "OSPF":
+        ai_steps = """OSPF（开放式最短路径优先）协议是一种内部网关协议，用于在单一自治系统内确定路由。配置OSPF的基本步骤：
 
 1. 启用OSPF进程：
 ```
@@ -130,8 +150,8 @@ Router# show ip route ospf
 - 合理设计区域边界以减少LSA通告
 - 考虑使用认证增强安全性
 - 适当调整Hello间隔和Dead时间"""
-        elif "BGP" in question_content:
-            ai_steps = """BGP路由通告失败的常见原因：
+    elif protocol == "BGP":
+        ai_steps = """BGP路由通告失败的常见原因：
 
 1. **BGP对等体会话未建立**：
    - 检查TCP连接是否成功（端口179）
@@ -168,8 +188,8 @@ show ip bgp neighbors
 show ip bgp
 debug ip bgp updates
 ```"""
-        else:
-            ai_steps = f"""关于"{question_content}"的回答：
+    else:
+        ai_steps = f"""关于"{question_content}"的回答：
 
 这是一个关于网络协议的重要问题。在网络工程中，正确理解和配置各种协议对确保网络稳定运行至关重要。
 
@@ -182,134 +202,354 @@ debug ip bgp updates
 5. 保持配置的一致性和可维护性
 
 对于更具体的解答，您可以提供更多关于具体网络环境和设备型号的细节，我可以给出更有针对性的建议。"""
-        
-        # 对回答进行预处理，插入适当的延迟标记
-        # 这些标记可以被前端用来控制打字速度
-        ai_steps = ai_steps.replace('\n\n', '\n<pause-long>\n')
-        ai_steps = ai_steps.replace('：\n', '：<pause-medium>\n')
-        ai_steps = ai_steps.replace('。', '。<pause-short>')
-        ai_steps = ai_steps.replace('！', '！<pause-short>')
-        ai_steps = ai_steps.replace('？', '？<pause-short>')
-        
+
+    return ai_steps
+
+def insert_pause_markers(ai_steps: str) -> str:
+    """对回答进行预处理，插入适当的延迟标记"""
+    # 这些标记可以被前端用来控制打字速度
+    ai_steps = ai_steps.replace('\n\n', '\n<pause-long>\n')
+    ai_steps = ai_steps.replace('：\n', '：<pause-medium>\n')
+    ai_steps = ai_steps.replace('。', '。<pause-short>')
+    ai_steps = ai_steps.replace('！', '！<pause-short>')
+    ai_steps = ai_steps.replace('？', '？<pause-short>')
+    return ai_steps
+
+def get_cached_answer(question_content: str, attachments: Dict) -> Optional[Dict]:
+    """
+    在检索知识库之前先查回答缓存, 命中时直接使用缓存的回答和引用的知识条目。
+    缓存键只有问题文本, 带附件的问题不使用缓存。
+    """
+    if any(attachments.values()):
+        return None
+    return answer_cache.get(question_content)
+
+async def get_ai_response(question_content: str, references: Optional[List[Dict]] = None, cache: bool = True) -> Dict:
+    knowledge_ids = [reference["knowledge_id"] for reference in references or []]
+    try:
+        # 实际API调用，使用共享的异步客户端，不阻塞事件循环
+        ai_steps = await llm_client.complete(build_messages(question_content, references), temperature=0.3)
+        confidence = 0.95
+        if cache:
+            answer_cache.put(question_content, ai_steps, confidence, knowledge_ids)
+        return {"steps": ai_steps, "confidence_score": confidence, "knowledge_ids": knowledge_ids}
+    except Exception as e:
+        # 如果API调用失败，返回模拟数据
+        print(f"AI API调用失败，使用模拟数据: {e}")
+        ai_steps = insert_pause_markers(get_fallback_answer(question_content))
         confidence = 0.8
-        return {"steps": ai_steps, "confidence_score": confidence}
+        return {"steps": ai_steps, "confidence_score": confidence, "knowledge_ids": knowledge_ids}
+
+async def stream_ai_response(
+    question_content: str,
+    references: Optional[List[Dict]] = None,
+    cached: Optional[Dict] = None,
+    cache: bool = True
+):
+    """
+    以流式方式获取 AI 回复，逐个产生 (event, data) 事件:
+    - ("delta", {"content": ...}): 模型返回的增量文本
+    - ("pause", {"type": "short" | "medium" | "long"}): 模拟数据中的延迟标记
+    - ("answer", {"steps": ..., "confidence_score": ..., "knowledge_ids": ...}): 完整回答, 最后产生
+    """
+    if cached is not None:
+        yield "delta", {"content": cached["steps"]}
+        yield "answer", cached
+        return
+
+    knowledge_ids = [reference["knowledge_id"] for reference in references or []]
+    parts = []
+
+    try:
+        async for delta in llm_client.stream(build_messages(question_content, references), temperature=0.3):
+            parts.append(delta)
+            yield "delta", {"content": delta}
+    except Exception as e:
+        # 已经向客户端发送了部分内容时无法再切换到模拟数据
+        if parts:
+            raise
+        print(f"AI API流式调用失败，使用模拟数据: {e}")
+
+    if parts:
+        ai_steps = "".join(parts)
+        if cache:
+            answer_cache.put(question_content, ai_steps, 0.95, knowledge_ids)
+        yield "answer", {"steps": ai_steps, "confidence_score": 0.95, "knowledge_ids": knowledge_ids}
+        return
+
+    # 模拟数据: 延迟标记以独立事件发送，而不是写入文本
+    ai_steps = get_fallback_answer(question_content)
+    segments = PAUSE_MARKER_PATTERN.split(insert_pause_markers(ai_steps))
+    for index, segment in enumerate(segments):
+        if index % 2:
+            yield "pause", {"type": segment}
+        elif segment:
+            yield "delta", {"content": segment}
+    yield "answer", {"steps": ai_steps, "confidence_score": 0.8, "knowledge_ids": knowledge_ids}
 
 class ChatRequest(BaseModel):
     user_id: str
     content: str
 
+def request_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Request body exceeds the {settings.UPLOAD_MAX_REQUEST_BYTES} byte limit"
+    )
+
+def limit_request_body(request: Request) -> Request:
+    """
+    请求体大小上限: Content-Length 超过上限时不读取直接返回 413;
+    否则边接收边计数 (包括没有 Content-Length 的分块上传), 超过上限立即停止读取。
+    """
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_REQUEST_BYTES:
+        raise request_too_large()
+
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > settings.UPLOAD_MAX_REQUEST_BYTES:
+                raise request_too_large()
+        return message
+
+    return Request(request.scope, receive)
+
+async def read_chat_request(request: Request):
+    """
+    从 JSON 或 multipart form-data 请求中读取问题内容和附件。
+    接口不声明 File 参数, 否则 FastAPI 会在调用接口之前就把整个请求体解析并写入临时文件。
+    """
+    content_type = request.headers.get('content-type', '')
+    request = limit_request_body(request)
+
+    # 处理 multipart form-data 请求（有文件上传时）
+    if content_type.startswith('multipart/form-data'):
+        form = await request.form()
+        content = form.get('content')
+        files = form.getlist('files')
+    # 处理 JSON 请求（无文件上传时）
+    else:
+        body = await request.json()
+        content = body.get('content')
+        files = None
+
+    if not content:
+        raise HTTPException(status_code=400, detail="content is required")
+
+    return content, files
+
+async def save_attachments(files) -> Dict:
+    """保存上传的文件（如果有的话），返回图片和附件的地址"""
+    attachments = {"image_url": None, "file_url": None, "file_name": None}
+
+    if files:
+        for file in files:
+            # 检查文件类型
+            content_type = file.content_type or ""
+            is_image = content_type.startswith('image/')
+
+            saved_path = await save_upload_file(file)
+            if is_image and not attachments["image_url"]:  # 只保存第一张图片
+                attachments["image_url"] = saved_path
+            elif not is_image and not attachments["file_url"]:  # 只保存第一个非图片文件
+                attachments["file_url"] = saved_path
+                attachments["file_name"] = file.filename
+
+    return attachments
+
+async def persist_chat(user_id: str, content: str, attachments: Dict, ai_response: Dict, knowledge_ids: List[str]) -> Dict:
+    """在独立的短会话中保存问题和解决方案 (LLM 回答结束后才获取连接)"""
+    async with AsyncSessionLocal() as db:
+        return await async_crud.create_question_with_solution(
+            db,
+            question=schemas.QuestionCreate(content=content, **attachments),
+            user_id=user_id,
+            steps=ai_response["steps"],
+            confidence_score=ai_response["confidence_score"],
+            knowledge_ids=knowledge_ids
+        )
+
+def format_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chat_events(
+    user_id: str,
+    content: str,
+    attachments: Dict,
+    references: List[Dict],
+    cached: Optional[Dict] = None
+):
+    """
+    产生流式聊天的 (event, data) 事件：先是 delta/pause，
+    回答结束并保存到数据库后是 done，出错时是 error
+    """
+    try:
+        ai_response = None
+        cache = not any(attachments.values())
+        async for event, data in stream_ai_response(content, references, cached, cache):
+            if event == "answer":
+                ai_response = data
+            else:
+                yield event, data
+
+        knowledge_ids = ai_response["knowledge_ids"]
+        ids = await persist_chat(user_id, content, attachments, ai_response, knowledge_ids)
+        print(f"Created question: {ids['question_id']}, solution: {ids['solution_id']}")
+        yield "done", {
+            **ids,
+            "user_id": user_id,
+            "confidence_score": ai_response["confidence_score"],
+            "knowledge_ids": knowledge_ids,
+            **attachments,
+        }
+    except Exception as e:
+        print(f"Error in stream_chat_events: {e}")
+        traceback.print_exc()
+        yield "error", {"detail": f"Internal server error: {str(e)}"}
+
+def chat_event_stream_response(
+    user_id: str,
+    content: str,
+    attachments: Dict,
+    references: List[Dict],
+    cached: Optional[Dict] = None
+) -> StreamingResponse:
+    async def body():
+        async for event, data in stream_chat_events(user_id, content, attachments, references, cached):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # 禁止反向代理缓冲，保证逐字推送
+        },
+    )
+
 @router.post("/chat")
 async def create_chat(
     request: Request,
-    files: Optional[List[UploadFile]] = File(None),
-    current_user = Depends(verify_token),
-    db: Session = Depends(get_db)
+    current_user = Depends(verify_token)
 ):
     try:
-        content_type = request.headers.get('content-type', '')
-        
-        # 处理 multipart form-data 请求（有文件上传时）
-        if content_type.startswith('multipart/form-data'):
-            form = await request.form()
-            user_id = current_user.user_id  # 使用已验证的用户 ID
-            content = form.get('content')
-            files = form.getlist('files')
-        # 处理 JSON 请求（无文件上传时）
-        else:
-            body = await request.json()
-            user_id = current_user.user_id  # 使用已验证的用户 ID
-            content = body.get('content')
-            files = None
-
-        if not content:
-            raise HTTPException(status_code=400, detail="content is required")
-
-        # 保存文件（如果有的话）
-        image_url = None
-        file_url = None
-        file_name = None
-        
-        if files:
-            for file in files:
-                # 检查文件类型
-                content_type = file.content_type or ""
-                is_image = content_type.startswith('image/')
-                
-                saved_path = await save_upload_file(file)
-                if is_image and not image_url:  # 只保存第一张图片
-                    image_url = saved_path
-                elif not is_image and not file_url:  # 只保存第一个非图片文件
-                    file_url = saved_path
-                    file_name = file.filename
+        user_id = current_user.user_id  # 使用已验证的用户 ID
+        content, files = await read_chat_request(request)
+        trending_questions.record_ask(content, user_id)
+        attachments = await save_attachments(files)
+        image_url = attachments["image_url"]
+        file_url = attachments["file_url"]
+        file_name = attachments["file_name"]
+
+        # 重复的问题直接使用缓存的回答，否则检索知识库作为回答的参考资料
+        cached = get_cached_answer(content, attachments)
+        references = [] if cached is not None else await retrieve_references(content)
+
+        # 客户端请求 text/event-stream 时改为流式回复
+        if "text/event-stream" in request.headers.get('accept', ''):
+            return chat_event_stream_response(user_id, content, attachments, references, cached)
 
         # 调用 AI API 获取回复
-        print("Calling AI API...")
-        ai_response = get_ai_response(content)
+        if cached is not None:
+            ai_response = cached
+        else:
+            print("Calling AI API...")
+            ai_response = await get_ai_response(content, references, cache=not any(attachments.values()))
         print(f"AI response: {ai_response}")
         
-        # 创建问题
-        question_schema = schemas.QuestionCreate(
-            content=content,
-            image_url=image_url,
-            file_url=file_url,
-            file_name=file_name
-        )
-        db_question = crud.create_question(db=db, question=question_schema, user_id=user_id)
-        print(f"Created question: {db_question.question_id}")
-        
-        # 创建解决方案
-        solution_schema = schemas.SolutionCreate(
-            question_id=db_question.question_id,
-            steps=ai_response["steps"],
-            confidence_score=ai_response["confidence_score"]
-        )
-        db_solution = crud.create_solution(db=db, solution=solution_schema)
-        print(f"Created solution: {db_solution.solution_id}")
+        # 在一个事务中创建问题、解决方案，并记录回答引用的知识条目
+        knowledge_ids = ai_response["knowledge_ids"]
+        ids = await persist_chat(user_id, content, attachments, ai_response, knowledge_ids)
+        print(f"Created question: {ids['question_id']}, solution: {ids['solution_id']}")
         
         # 返回响应
         return {
             "content": ai_response["steps"],
-            "solution_id": db_solution.solution_id,
-            "question_id": db_question.question_id,
+            "solution_id": ids["solution_id"],
+            "question_id": ids["question_id"],
             "user_id": user_id,
             "image_url": image_url,
             "file_url": file_url,
-            "file_name": file_name
+            "file_name": file_name,
+            "knowledge_ids": knowledge_ids
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in create_chat: {e}")
         traceback.print_exc() # 添加这行来打印详细的错误堆叠
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") 
 
+@router.post("/chat/stream")
+async def create_chat_stream(
+    request: Request,
+    current_user = Depends(verify_token)
+):
+    """
+    以 Server-Sent Events 流式返回回答:
+    event: delta / pause / done / error
+    """
+    try:
+        user_id = current_user.user_id
+        content, files = await read_chat_request(request)
+        trending_questions.record_ask(content, user_id)
+        attachments = await save_attachments(files)
+        cached = get_cached_answer(content, attachments)
+        references = [] if cached is not None else await retrieve_references(content)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in create_chat_stream: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    return chat_event_stream_response(user_id, content, attachments, references, cached)
+
+@router.get("/chat/cache/stats")
+async def get_answer_cache_stats():
+    """获取回答缓存的命中统计"""
+    return answer_cache.stats()
+
+# 还没有足够的提问数据时展示的热门问题
+DEFAULT_HOT_QUESTIONS = [
+    {"id": "1", "question": "如何配置 OSPF 协议？", "count": 156},
+    {"id": "2", "question": "BGP 路由通告失败的常见原因", "count": 142},
+    {"id": "3", "question": "VLAN 间通信问题排查步骤", "count": 128},
+    {"id": "4", "question": "ACL 规则配置最佳实践", "count": 115},
+    {"id": "5", "question": "STP 根桥选举机制说明", "count": 98},
+    {"id": "6", "question": "如何解决 DHCP 地址分配问题？", "count": 87},
+    {"id": "7", "question": "VPN 隧道建立失败的排查方法", "count": 76},
+    {"id": "8", "question": "IPv6 部署的关键步骤", "count": 65},
+]
+
 @router.get("/chat/hot-questions")
-async def get_hot_questions():
-    """获取热门问题列表"""
+async def get_hot_questions(limit: int = Query(8, ge=1, le=50)):
+    """获取热门问题列表（内存中的时间衰减排行，不查询数据库）"""
     try:
-        # 这里可以从数据库或缓存中获取真实的热门问题
-        # 目前返回静态数据作为示例
-        hot_questions = [
-            {"id": "1", "question": "如何配置 OSPF 协议？", "count": 156},
-            {"id": "2", "question": "BGP 路由通告失败的常见原因", "count": 142},
-            {"id": "3", "question": "VLAN 间通信问题排查步骤", "count": 128},
-            {"id": "4", "question": "ACL 规则配置最佳实践", "count": 115},
-            {"id": "5", "question": "STP 根桥选举机制说明", "count": 98},
-            {"id": "6", "question": "如何解决 DHCP 地址分配问题？", "count": 87},
-            {"id": "7", "question": "VPN 隧道建立失败的排查方法", "count": 76},
-            {"id": "8", "question": "IPv6 部署的关键步骤", "count": 65},
-        ]
-        return hot_questions
+        hot_questions = trending_questions.top(limit)
+        return hot_questions or DEFAULT_HOT_QUESTIONS[:limit]
     except Exception as e:
         print(f"获取热门问题时出错: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") 
 
 @router.post("/chat/hot-questions/{question_id}/click")
 async def record_hot_question_click(question_id: str):
-    """记录热门问题的点击"""
+    """记录热门问题的点击（计入排行，并放入批量写入队列）"""
     try:
-        # 这里应该将点击记录到数据库中
-        # 目前只是打印日志作为示例
-        print(f"问题 {question_id} 被点击了")
+        trending_questions.record_click(question_id)
+        written = event_queue.enqueue(HotQuestionClick.__table__, {
+            "question_id": question_id,
+            "clicked_at": datetime.now(),
+        })
+        # sync 模式下等待所在批次提交
+        if written is not None:
+            await written
         return {"success": True, "question_id": question_id}
     except Exception as e:
         print(f"记录问题点击时出错: {e}")
@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from backend import crud
 from backend import schemas
-from backend.database.database import SessionLocal
-from typing import Dict, List
-from sqlalchemy import func
-from backend.database.base import Feedback, User, Solution
+from backend.database.database import AsyncSessionLocal, SessionLocal
+from backend.database.pagination import SKIP_DEPRECATED, keyset_page, mark_deprecated_skip
+from typing import Dict, List, Optional
+from sqlalchemy import case, exists, func, select
+from backend.config import settings
+import threading
+import time
+from datetime import datetime
+from backend.database.base import Feedback, User, Solution, Question
+from backend.database.types import new_id
+from backend.services.protocol_classifier import OTHER_CATEGORY
+from backend.services.event_queue import event_queue
 
 router = APIRouter()
 
+# 没有任何问题数据时展示的示例分布
+MOCK_CATEGORY_DISTRIBUTION = [
+    {"category": "OSPF配置问题", "count": 345, "percentage": 28.0},
+    {"category": "BGP路由通告", "count": 287, "percentage": 23.0},
+    {"category": "VLAN通信问题", "count": 245, "percentage": 20.0},
+    {"category": "ACL规则配置", "count": 187, "percentage": 15.0},
+    {"category": "其他问题", "count": 181, "percentage": 14.0},
+]
+
 def get_db():
     db = SessionLocal()
     try:
@@ -16,16 +32,53 @@ def get_db():
     finally:
         db.close()
 
+# 反馈统计缓存，新增反馈或修改状态时失效
+_stats_cache = {"value": None, "expires_at": 0.0, "generation": 0}
+_stats_lock = threading.Lock()
+
+def invalidate_feedback_stats():
+    with _stats_lock:
+        _stats_cache["value"] = None
+        _stats_cache["generation"] += 1
+
+# 批量写入的反馈落库后统计结果才会变化
+event_queue.on_flush(Feedback.__table__, invalidate_feedback_stats)
+
+def get_category_counts(db: Session) -> Dict[str, int]:
+    """一次 GROUP BY 统计各分类的问题数量，尚未回填分类的问题计入其他类"""
+    rows = db.query(Question.category, func.count(Question.question_id)).group_by(Question.category).all()
+
+    category_count: Dict[str, int] = {}
+    for category, count in rows:
+        category = category or OTHER_CATEGORY
+        category_count[category] = category_count.get(category, 0) + count
+    return category_count
+
 @router.get("/feedbacks/")
-def get_feedbacks(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """获取反馈列表"""
+def get_feedbacks(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description=SKIP_DEPRECATED),
+    db: Session = Depends(get_db)
+):
+    """获取反馈列表（按创建时间倒序，下一页的游标在 next_cursor 中）"""
     try:
         # 从数据库获取反馈
-        feedbacks = db.query(
+        query = db.query(
             Feedback, User.username.label('user_name')
         ).join(
             User, User.user_id == Feedback.user_id
-        ).offset(skip).limit(limit).all()
+        )
+        feedbacks, next_cursor = keyset_page(
+            query,
+            [Feedback.created_at, Feedback.feedback_id],
+            cursor,
+            limit,
+            key=lambda row: [row[0].created_at, row[0].feedback_id],
+            skip=skip or 0
+        )
+        mark_deprecated_skip(response, skip)
         
         # 格式化结果
         result = []
@@ -41,7 +94,9 @@ def get_feedbacks(skip: int = 0, limit: int = 10, db: Session = Depends(get_db))
                 "status": feedback.status if hasattr(feedback, 'status') else "待处理"
             })
         
-        return result
+        return {"items": result, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_feedbacks: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -49,24 +104,30 @@ def get_feedbacks(skip: int = 0, limit: int = 10, db: Session = Depends(get_db))
 @router.get("/feedbacks/stats")
 def get_feedback_stats(db: Session = Depends(get_db)):
     """获取反馈统计数据"""
+    # TTL 内直接返回缓存的统计结果
+    now = time.monotonic()
+    with _stats_lock:
+        if _stats_cache["value"] is not None and _stats_cache["expires_at"] > now:
+            return _stats_cache["value"]
+        generation = _stats_cache["generation"]
+
     try:
-        # 获取总数
-        total_count = db.query(func.count(Feedback.feedback_id)).scalar() or 0
-        
-        # 获取平均评分
-        average_rating = db.query(func.avg(Feedback.rating)).scalar() or 0
-        
-        # 获取待处理数量 (假设有status字段)
-        pending_count = db.query(func.count(Feedback.feedback_id)).filter(
-            Feedback.status == "待处理"
-        ).scalar() or 0
+        # 一次条件聚合查询得到总数、平均评分、待处理数量和评分分布
+        row = db.query(
+            # count(*) 而不是 count(feedback_id), 只扫描 (status, rating) 覆盖索引即可
+            func.count(),
+            func.avg(Feedback.rating),
+            func.sum(case((Feedback.status == "待处理", 1), else_=0)),
+            *[func.sum(case((Feedback.rating == rating, 1), else_=0)) for rating in range(1, 6)]
+        ).one()
+        total_count = row[0] or 0
+        average_rating = row[1] or 0
+        pending_count = int(row[2] or 0)
         
         # 获取评分分布
         rating_distribution = []
         for rating in range(1, 6):
-            count = db.query(func.count(Feedback.feedback_id)).filter(
-                Feedback.rating == rating
-            ).scalar() or 0
+            count = int(row[2 + rating] or 0)
             percentage = (count / total_count * 100) if total_count > 0 else 0
             rating_distribution.append({
                 "rating": rating,
@@ -74,53 +135,18 @@ def get_feedback_stats(db: Session = Depends(get_db)):
                 "percentage": percentage
             })
         
-        # 获取实际的问题分类分布
-        from sqlalchemy import text
-        from sqlalchemy.orm import Session
-        
-        # 定义协议关键词列表
-        protocol_keywords = [
-            'OSPF', 'BGP', 'RIP', 'EIGRP', 'VLAN', 'STP', 'RSTP', 'MSTP',
-            'ACL', 'NAT', 'VPN', 'QoS', 'MPLS', 'VRRP', 'HSRP', 'GLBP',
-            'DHCP', 'DNS', 'HTTP', 'HTTPS', 'FTP', 'SMTP', 'SNMP', 'SSH',
-            'TCP', 'UDP', 'ICMP', 'ARP', 'RARP', 'IGMP', 'PIM', 'OSPFV3',
-            'IPV4', 'IPV6', 'RIPNG', 'BGP4+', 'IS-IS', 'LDP', 'RSVP'
-        ]
-        
-        # 从问题表中获取问题内容进行分类
+        # 获取问题分类分布（分类在创建问题时已写入 category 列）
         try:
-            # 假设有 Question 表，如果没有则使用模拟数据
-            questions_query = text("""
-                SELECT content FROM Question 
-                WHERE content IS NOT NULL AND content != ''
-            """)
-            questions = db.execute(questions_query).fetchall()
-            
-            if questions:
-                # 统计问题分类
-                category_count = {}
-                total_questions = 0
-                
-                for question in questions:
-                    content = question[0].upper() if question[0] else ''
-                    total_questions += 1
-                    
-                    # 检查是否包含协议关键词
-                    found_protocol = None
-                    for protocol in protocol_keywords:
-                        if protocol in content:
-                            found_protocol = protocol
-                            break
-                    
-                    category = found_protocol if found_protocol else '其他'
-                    category_count[category] = category_count.get(category, 0) + 1
-                
+            category_count = get_category_counts(db)
+            total_questions = sum(category_count.values())
+
+            if total_questions:
                 # 转换为分布格式
                 category_distribution = []
                 for category, count in category_count.items():
                     percentage = (count / total_questions * 100) if total_questions > 0 else 0
                     category_distribution.append({
-                        "category": f"{category}相关问题" if category != '其他' else "其他问题",
+                        "category": f"{category}相关问题" if category != OTHER_CATEGORY else "其他问题",
                         "count": count,
                         "percentage": round(percentage, 1)
                     })
@@ -130,39 +156,34 @@ def get_feedback_stats(db: Session = Depends(get_db)):
                 
             else:
                 # 如果没有问题数据，使用模拟数据
-                category_distribution = [
-                    {"category": "OSPF配置问题", "count": 345, "percentage": 28.0},
-                    {"category": "BGP路由通告", "count": 287, "percentage": 23.0},
-                    {"category": "VLAN通信问题", "count": 245, "percentage": 20.0},
-                    {"category": "ACL规则配置", "count": 187, "percentage": 15.0},
-                    {"category": "其他问题", "count": 181, "percentage": 14.0},
-                ]
+                category_distribution = MOCK_CATEGORY_DISTRIBUTION
                 
         except Exception as e:
             print(f"Error getting question categories: {e}")
             # 使用模拟数据作为备用
-            category_distribution = [
-                {"category": "OSPF配置问题", "count": 345, "percentage": 28.0},
-                {"category": "BGP路由通告", "count": 287, "percentage": 23.0},
-                {"category": "VLAN通信问题", "count": 245, "percentage": 20.0},
-                {"category": "ACL规则配置", "count": 187, "percentage": 15.0},
-                {"category": "其他问题", "count": 181, "percentage": 14.0},
-            ]
+            category_distribution = MOCK_CATEGORY_DISTRIBUTION
         
-        return {
+        stats = {
             "total_count": total_count,
             "average_rating": float(average_rating),
             "pending_count": pending_count,
             "rating_distribution": rating_distribution,
             "category_distribution": category_distribution
         }
+
+        # 计算期间数据没有变化时才写入缓存
+        with _stats_lock:
+            if _stats_cache["generation"] == generation:
+                _stats_cache["value"] = stats
+                _stats_cache["expires_at"] = time.monotonic() + settings.FEEDBACK_STATS_TTL
+        return stats
     except Exception as e:
         print(f"Error in get_feedback_stats: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/feedbacks/")
-def create_feedback(feedback: Dict, db: Session = Depends(get_db)):
-    """创建新反馈"""
+async def create_feedback(feedback: Dict):
+    """创建新反馈（先检查用户和解决方案是否存在，再放入批量写入队列）"""
     print(f"Received feedback: {feedback}")
     
     try:
@@ -175,14 +196,17 @@ def create_feedback(feedback: Dict, db: Session = Depends(get_db)):
         if not user_id or not solution_id or rating is None:
             raise HTTPException(status_code=400, detail="user_id, solution_id and rating are required")
         
-        # 检查用户和解决方案是否存在
-        db_user = crud.get_user(db, user_id=user_id)
-        db_solution = crud.get_solution(db, solution_id=solution_id)
+        # 检查用户和解决方案是否存在（一次主键查询），否则 async 模式下错误的 id 会在落库时被丢弃
+        async with AsyncSessionLocal() as db:
+            user_exists, solution_exists = (await db.execute(select(
+                exists().where(User.user_id == user_id),
+                exists().where(Solution.solution_id == solution_id)
+            ))).one()
         
-        if not db_user:
+        if not user_exists:
             raise HTTPException(status_code=404, detail=f"User {user_id} not found")
         
-        if not db_solution:
+        if not solution_exists:
             raise HTTPException(status_code=404, detail=f"Solution {solution_id} not found")
         
         # 创建反馈
@@ -192,13 +216,25 @@ def create_feedback(feedback: Dict, db: Session = Depends(get_db)):
             rating=rating,
             comment=comment
         )
-        db_feedback = crud.create_feedback(db=db, feedback=feedback_schema)
-        print(f"Created feedback: {db_feedback.feedback_id}")
+        feedback_id = new_id()
+        written = event_queue.enqueue(Feedback.__table__, {
+            **feedback_schema.dict(),
+            "feedback_id": feedback_id,
+            "status": "待处理",
+            "created_at": datetime.now(),
+        })
+        # sync 模式下等待所在批次提交
+        if written is not None:
+            try:
+                await written
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to save feedback: {str(e)}")
+        print(f"Queued feedback: {feedback_id}")
         
         # 回传回应
         return {
             "success": True,
-            "feedback_id": db_feedback.feedback_id,
+            "feedback_id": feedback_id,
             "solution_id": solution_id,
             "user_id": user_id,
             "rating": rating,
@@ -227,6 +263,7 @@ def update_feedback_status(feedback_id: str, status_data: Dict, db: Session = De
         # 更新状态
         feedback.status = status
         db.commit()
+        invalidate_feedback_stats()
         
         return {"success": True, "feedback_id": feedback_id, "status": status}
     except HTTPException as he:
@@ -240,44 +277,12 @@ def update_feedback_status(feedback_id: str, status_data: Dict, db: Session = De
 def get_question_categories(db: Session = Depends(get_db)):
     """获取问题分类统计"""
     try:
-        from sqlalchemy import text
-        
-        # 定义协议关键词列表
-        protocol_keywords = [
-            'OSPF', 'BGP', 'RIP', 'EIGRP', 'VLAN', 'STP', 'RSTP', 'MSTP',
-            'ACL', 'NAT', 'VPN', 'QoS', 'MPLS', 'VRRP', 'HSRP', 'GLBP',
-            'DHCP', 'DNS', 'HTTP', 'HTTPS', 'FTP', 'SMTP', 'SNMP', 'SSH',
-            'TCP', 'UDP', 'ICMP', 'ARP', 'RARP', 'IGMP', 'PIM', 'OSPFV3',
-            'IPV4', 'IPV6', 'RIPNG', 'BGP4+', 'IS-IS', 'LDP', 'RSVP'
-        ]
-        
-        # 从问题表中获取问题内容进行分类
+        # 按已保存的分类直接聚合
         try:
-            questions_query = text("""
-                SELECT content FROM Question 
-                WHERE content IS NOT NULL AND content != ''
-            """)
-            questions = db.execute(questions_query).fetchall()
+            category_count = get_category_counts(db)
+            total_questions = sum(category_count.values())
             
-            if questions:
-                # 统计问题分类
-                category_count = {}
-                total_questions = 0
-                
-                for question in questions:
-                    content = question[0].upper() if question[0] else ''
-                    total_questions += 1
-                    
-                    # 检查是否包含协议关键词
-                    found_protocol = None
-                    for protocol in protocol_keywords:
-                        if protocol in content:
-                            found_protocol = protocol
-                            break
-                    
-                    category = found_protocol if found_protocol else '其他'
-                    category_count[category] = category_count.get(category, 0) + 1
-                
+            if total_questions:
                 # 转换为分布格式
                 categories = []
                 for category, count in category_count.items():
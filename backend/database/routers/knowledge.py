@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import Float, bindparam, text
 from sqlalchemy.orm import Session
-from typing import List
-from backend import crud
+from typing import List, Optional
+from backend.database import crud
 from backend import schemas
+from backend.config import settings
 from backend.database.database import SessionLocal
+from backend.database.pagination import encode_cursor, decode_cursor
+from backend.database.types import key_type
+from backend.services.knowledge_index import knowledge_index, make_snippet
+from backend.services.knowledge_sync import knowledge_sync
+from backend.services.knowledge_ingest import create_ingester
 
 router = APIRouter()
 
@@ -15,17 +24,122 @@ def get_db():
         db.close()
 
 @router.post("/knowledge/", response_model=schemas.Knowledge)
-def create_knowledge(knowledge: schemas.KnowledgeCreate, db: Session = Depends(get_db)):
+def create_knowledge(knowledge: schemas.KnowledgeCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # Optional: Check if protocol_id exists before creating
     if knowledge.protocol_id:
         db_protocol = crud.get_protocol(db, protocol_id=knowledge.protocol_id)
         if db_protocol is None:
             raise HTTPException(status_code=404, detail=f"Protocol with id {knowledge.protocol_id} not found")
-    return crud.create_knowledge(db=db, knowledge=knowledge)
+    db_knowledge = crud.create_knowledge(db=db, knowledge=knowledge)
+    # 增量更新知识库检索索引
+    knowledge_index.add(db_knowledge.knowledge_id, db_knowledge.content, db_knowledge.protocol_id)
+    # 通知其他 worker 加入同一条目
+    background_tasks.add_task(knowledge_sync.publish, [db_knowledge.knowledge_id])
+    return db_knowledge
+
+@router.post("/knowledge/bulk", response_model=schemas.KnowledgeImportResult)
+async def bulk_import_knowledge(request: Request, create_protocols: bool = True):
+    """
+    批量导入知识, 请求体为 NDJSON (每行一个 KnowledgeImport), 边接收边按批写入。
+    protocol 按名称解析, create_protocols 为 true 时自动创建不存在的协议。
+    格式错误的行会被跳过, 在结果的 errors 中按行号列出。
+    """
+    ingester = create_ingester(index=knowledge_index, create_protocols=create_protocols)
+    buffer = b""
+    line_number = 0
+
+    async def feed(raw: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not raw.strip():
+            return
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            ingester.add_error(line_number, "Invalid JSON")
+            return
+        if ingester.add(record, line=line_number):
+            await run_in_threadpool(ingester.flush)
+            await knowledge_sync.publish(ingester.take_new_ids())
+
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            await feed(raw)
+    await feed(buffer)
+    result = await run_in_threadpool(ingester.finish)
+    await knowledge_sync.publish(ingester.take_new_ids())
+    return result
+
+def search_local_index(q: str, protocol_id: Optional[str], after: Optional[list], limit: int):
+    """在进程内 BM25 索引中检索, 按 (score desc, knowledge_id asc) 做游标分页"""
+    return knowledge_index.page(q, limit, after=tuple(after) if after else None, protocol_id=protocol_id)
+
+def search_fulltext(db: Session, q: str, protocol_id: Optional[str], after: Optional[list], limit: int):
+    """使用 MySQL FULLTEXT (ngram parser) 索引检索"""
+    conditions = ["MATCH(content) AGAINST (:q IN NATURAL LANGUAGE MODE)"]
+    params = {"q": q, "limit": limit}
+    if protocol_id is not None:
+        conditions.append("protocol_id = :protocol_id")
+        params["protocol_id"] = protocol_id
+    having = ""
+    if after is not None:
+        having = "HAVING score < :last_score OR (score = :last_score AND knowledge_id > :last_id)"
+        params["last_score"], params["last_id"] = after
+    # ID 参数和结果列按主键类型转换 (DB_BINARY_KEYS 时为 BINARY(16))
+    query = text(f"""
+        SELECT knowledge_id, MATCH(content) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score
+        FROM knowledge
+        WHERE {" AND ".join(conditions)}
+        {having}
+        ORDER BY score DESC, knowledge_id ASC
+        LIMIT :limit
+    """).bindparams(
+        *[bindparam(name, type_=key_type()) for name in ("protocol_id", "last_id") if name in params]
+    ).columns(knowledge_id=key_type(), score=Float())
+    return [(row[0], float(row[1])) for row in db.execute(query, params).fetchall()]
+
+@router.get("/knowledge/search", response_model=schemas.KnowledgeSearchPage)
+def search_knowledge(
+    q: str = Query(..., min_length=1),
+    protocol_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """全文检索知识库，返回带高亮的片段，使用游标分页"""
+    after = decode_cursor(cursor, 2)
+
+    # 多取一条用来判断是否还有下一页
+    if settings.KNOWLEDGE_SEARCH_BACKEND == "fulltext":
+        hits = search_fulltext(db, q, protocol_id, after, limit + 1)
+    else:
+        hits = search_local_index(q, protocol_id, after, limit + 1)
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor([hits[-1][1], hits[-1][0]])
+
+    entries = crud.get_knowledge_by_ids(db, [knowledge_id for knowledge_id, _ in hits])
+    scores = dict(hits)
+    items = []
+    for entry in entries:
+        snippet, highlights = make_snippet(entry.content, q)
+        items.append(schemas.KnowledgeSearchHit(
+            knowledge_id=entry.knowledge_id,
+            protocol_id=entry.protocol_id,
+            source=entry.source,
+            score=scores[entry.knowledge_id],
+            snippet=snippet,
+            highlights=highlights,
+        ))
+    return schemas.KnowledgeSearchPage(items=items, next_cursor=next_cursor)
 
 @router.get("/knowledge/{knowledge_id}", response_model=schemas.Knowledge)
 def read_knowledge(knowledge_id: str, db: Session = Depends(get_db)):
     db_knowledge = crud.get_knowledge(db, knowledge_id=knowledge_id)
     if db_knowledge is None:
         raise HTTPException(status_code=404, detail="Knowledge not found")
-    return db_knowledge 
\ No newline at end of file
+    return db_knowledge
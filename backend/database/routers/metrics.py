@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from backend.database.database import pool_status
+from backend.services.principal_cache import principal_cache
+from backend.services.password_hasher import password_hasher
+from backend.services.event_queue import event_queue
+from backend.services.trending import trending_questions
+from backend.services.websocket_hub import manager as websocket_manager
+
+router = APIRouter(
+    prefix="/metrics",
+)
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """数据库连接池的借出/空闲连接数和等待时间"""
+    return pool_status()
+
+@router.get("/auth-cache")
+def get_auth_cache_metrics():
+    """认证缓存的命中统计"""
+    return principal_cache.stats()
+
+@router.get("/password-hasher")
+def get_password_hasher_metrics():
+    """密码哈希进程池的排队深度和耗时"""
+    return password_hasher.stats()
+
+@router.get("/event-queue")
+def get_event_queue_metrics():
+    """事件批量写入队列的积压和写入统计"""
+    return event_queue.stats()
+
+@router.get("/trending")
+def get_trending_metrics():
+    """热门问题排行的候选数量和计数统计"""
+    return trending_questions.stats()
+
+@router.get("/websocket")
+def get_websocket_metrics():
+    """WebSocket 连接数、发送队列积压和被断开的慢客户端数量"""
+    return websocket_manager.stats()
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from backend import crud
+from backend.database import crud
 from backend import schemas
 from backend.database.database import SessionLocal
+from backend.services.protocol_classifier import add_protocol_names
 
 router = APIRouter()
 
@@ -16,7 +17,10 @@ def get_db():
 
 @router.post("/protocols/", response_model=schemas.Protocol)
 def create_protocol(protocol: schemas.ProtocolCreate, db: Session = Depends(get_db)):
-    return crud.create_protocol(db=db, protocol=protocol)
+    db_protocol = crud.create_protocol(db=db, protocol=protocol)
+    # 新协议名称立即参与问题分类
+    add_protocol_names([db_protocol.name])
+    return db_protocol
 
 @router.get("/protocols/{protocol_id}", response_model=schemas.Protocol)
 def read_protocol(protocol_id: str, db: Session = Depends(get_db)):
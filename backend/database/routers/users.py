@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from backend.database import crud
-from backend.database.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import crud, async_crud
+from backend.database.database import AsyncSessionLocal, SessionLocal, get_async_db
 from backend.database.base import User
+from backend.database.pagination import SKIP_DEPRECATED, mark_deprecated_skip
+from backend.database.types import new_id
 from backend import schemas
-import uuid
-import bcrypt
+from backend.services.password_hasher import password_hasher
+from backend.services.principal_cache import Principal, principal_cache
+from backend.config import settings
 import logging
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import jwt
-from typing import Optional
+from typing import Dict, List, Optional
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -44,32 +49,76 @@ def get_db():
     finally:
         db.close()
 
+# 验证 JWT token
+async def verify_token(authorization: Optional[str] = Header(None)):
+    """
+    校验 token 并返回 Principal。缓存未命中时用短会话查询用户,
+    不使用请求级的数据库依赖: 它要等响应 (包括整个 LLM 调用和流式输出) 结束才归还连接
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != "bearer":
+            raise HTTPException(status_code=401, detail="Invalid authentication scheme")
+        
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = payload.get("sub")
+        
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        # 先查进程内缓存，未命中时才访问数据库
+        principal = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+
+        # 可选：直接信任 token 中已签名的用户信息
+        if settings.AUTH_TRUST_TOKEN_CLAIMS and payload.get("username") and payload.get("email"):
+            principal = Principal(user_id=user_id, username=payload["username"], email=payload["email"])
+            principal_cache.put(principal)
+            return principal
+
+        # 验证用户是否存在
+        async with AsyncSessionLocal() as db:
+            user = await async_crud.get_user(db, user_id=user_id)
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        
+        principal = Principal.from_user(user)
+        principal_cache.put(principal)
+        return principal
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Authentication error: {str(e)}")
+
 @router.post("/", response_model=schemas.User)
-def create_user(user: UserRegister, db: Session = Depends(get_db)):
+async def create_user(user: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """创建新用户"""
     try:
         logger.info(f"开始创建用户: {user.username}")
         # 检查用户是否已存在
-        existing_user = crud.get_user_by_email(db=db, email=user.email)
+        existing_user = await async_crud.get_user_by_email(db=db, email=user.email)
         if existing_user:
             logger.info(f"用户邮箱已存在: {user.email}")
             raise HTTPException(status_code=400, detail="Email already registered")
             
-        # 生成密码的哈希值
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(user.password.encode('utf-8'), salt)
+        # 在独立的进程池中生成密码的哈希值
+        hashed = await password_hasher.hash_password(user.password)
         
         # 创建新用户，移除 user_id 的手动赋值
         new_user = User(
             username=user.username,
             email=user.email,
-            hashed_password=hashed.decode('utf-8')
+            hashed_password=hashed
         )
         
         logger.info(f"准备将新用户写入数据库: {new_user.username}")
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         logger.info(f"用户创建成功，ID: {new_user.user_id}")
         
         return new_user
@@ -78,13 +127,21 @@ def create_user(user: UserRegister, db: Session = Depends(get_db)):
         raise he
     except Exception as e:
         logger.error(f"创建用户时发生错误: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@router.get("/", response_model=schemas.UserPage)
+def read_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description=SKIP_DEPRECATED),
+    db: Session = Depends(get_db)
+):
+    """按注册时间倒序列出用户，下一页的游标在 next_cursor 中"""
+    mark_deprecated_skip(response, skip)
+    users, next_cursor = crud.get_users(db, cursor=cursor, limit=limit, skip=skip or 0)
+    return {"items": users, "next_cursor": next_cursor}
 
 @router.get("/{user_id}", response_model=schemas.User)
 def read_user(user_id: str, db: Session = Depends(get_db)):
@@ -94,21 +151,21 @@ def read_user(user_id: str, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/token", response_model=dict)
-def login_for_access_token(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login_for_access_token(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """获取用户访问令牌"""
     try:
         logger.info(f"尝试登录用户: {user_data.email}")
         
         # 根据电子邮件查找用户
-        user = crud.get_user_by_email(db=db, email=user_data.email)
+        user = await async_crud.get_user_by_email(db=db, email=user_data.email)
         if not user:
             logger.warning(f"找不到用户: {user_data.email}")
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        # 验证密码
-        is_password_correct = bcrypt.checkpw(
-            user_data.password.encode('utf-8'), 
-            user.hashed_password.encode('utf-8')
+        # 在独立的进程池中验证密码
+        is_password_correct = await password_hasher.verify_password(
+            user_data.password,
+            user.hashed_password
         )
         
         if not is_password_correct:
@@ -144,12 +201,12 @@ def login_for_access_token(user_data: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/test")
-def create_test_user(db: Session = Depends(get_db)):
+async def create_test_user(db: AsyncSession = Depends(get_async_db)):
     """创建测试用户"""
     try:
         logger.info("开始创建测试用户")
         # 检查用户是否已存在
-        existing_user = crud.get_user_by_email(db=db, email="test@example.com")
+        existing_user = await async_crud.get_user_by_email(db=db, email="test@example.com")
         if existing_user:
             logger.info(f"用户已存在: {existing_user.user_id}")
             return {
@@ -161,21 +218,20 @@ def create_test_user(db: Session = Depends(get_db)):
             
         # 生成测试密码的哈希值
         password = "test123"
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+        hashed = await password_hasher.hash_password(password)
         
         # 创建新用户
         new_user = User(
-            user_id=str(uuid.uuid4()),
+            user_id=new_id(),
             username="test_user",
             email="test@example.com",
-            hashed_password=hashed.decode('utf-8')
+            hashed_password=hashed
         )
         
         logger.info(f"准备创建新用户: {new_user.user_id}")
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         logger.info(f"用户创建成功: {new_user.user_id}")
         
         return {
@@ -184,7 +240,83 @@ def create_test_user(db: Session = Depends(get_db)):
             "email": new_user.email,
             "register_date": new_user.register_date
         }
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"创建用户时发生错误: {str(e)}")
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+# 问答记录接口可以返回的字段
+CONVERSATION_QUESTION_FIELDS = ("content", "category", "image_url", "file_url", "file_name")
+CONVERSATION_SOLUTION_FIELDS = ("steps", "confidence_score")
+CONVERSATION_FEEDBACK_FIELDS = ("rating", "comment")
+CONVERSATION_FIELDS = (
+    "question_id", "ask_time", *CONVERSATION_QUESTION_FIELDS,
+    "solution_id", *CONVERSATION_SOLUTION_FIELDS, *CONVERSATION_FEEDBACK_FIELDS,
+)
+
+def parse_conversation_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(CONVERSATION_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in CONVERSATION_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # question_id 和 ask_time 总是返回, 用于标识记录和翻页
+    return ["question_id", "ask_time", *[field for field in requested if field not in ("question_id", "ask_time")]]
+
+def conversation_item(question, fields: List[str]) -> Dict:
+    # 只读取查询时加载了的关系, 访问未加载的关系会在异步会话中触发懒加载
+    solution = question.solution if "solution" not in inspect(question).unloaded else None
+    # 反馈按时间排序, 取用户最近一次的评分
+    feedback = None
+    if solution is not None and "feedbacks" not in inspect(solution).unloaded and solution.feedbacks:
+        feedback = max(solution.feedbacks, key=lambda item: item.created_at or datetime.min)
+
+    item = {}
+    for field in fields:
+        if field == "ask_time":
+            item[field] = question.ask_time.isoformat() if question.ask_time else None
+        elif field in CONVERSATION_FEEDBACK_FIELDS:
+            item[field] = getattr(feedback, field) if feedback is not None else None
+        elif field == "solution_id" or field in CONVERSATION_SOLUTION_FIELDS:
+            item[field] = getattr(solution, field) if solution is not None else None
+        else:
+            item[field] = getattr(question, field)
+    return item
+
+@router.get("/{user_id}/conversations")
+async def get_user_conversations(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="逗号分隔的字段列表，默认返回全部字段"),
+    current_user = Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取用户的历史问答（问题、解决方案和用户的评分），按提问时间倒序，使用游标分页。
+    无论记录多少，都只需要固定次数的查询。
+    """
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to read another user's conversations")
+
+    selected = parse_conversation_fields(fields)
+    solution_fields = [field for field in CONVERSATION_SOLUTION_FIELDS if field in selected]
+    load_feedbacks = any(field in selected for field in CONVERSATION_FEEDBACK_FIELDS)
+    load_solutions = "solution_id" in selected or bool(solution_fields) or load_feedbacks
+
+    questions, next_cursor = await async_crud.get_user_conversations(
+        db,
+        user_id=user_id,
+        cursor=cursor,
+        limit=limit,
+        question_fields=[field for field in CONVERSATION_QUESTION_FIELDS if field in selected],
+        solution_fields=solution_fields if load_solutions else None,
+        load_feedbacks=load_feedbacks
+    )
+    return {
+        "items": [conversation_item(question, selected) for question in questions],
+        "next_cursor": next_cursor,
+    }
@@ -1,29 +1,131 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+import asyncio
+import json
+from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from backend.database.routers.chat import get_cached_answer, retrieve_references, stream_chat_events
+from backend.database.routers.users import verify_token
+from backend.services.trending import trending_questions
+from backend.services.websocket_hub import manager
 
 router = APIRouter(
     tags=["websockets"],
 )
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# 每个连接同时进行中的问题数量上限
+MAX_CONCURRENT_QUESTIONS = 4
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+NO_ATTACHMENTS = {"image_url": None, "file_url": None, "file_name": None}
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+class ChatSocket:
+    """
+    /ws/chat 的一个连接。问题在独立的任务中回答, 同一连接可以同时回答多个问题,
+    发送帧时加锁, 保证不同问题的帧不会交错写入。
+    """
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    async def send(self, frame_type: str, request_id: Optional[str], data: Optional[Dict] = None):
+        frame = {"type": frame_type, "id": request_id}
+        if data is not None:
+            frame["data"] = data
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(frame, ensure_ascii=False))
 
-manager = ConnectionManager()
+    async def handle(self, text: str):
+        try:
+            frame = json.loads(text)
+            frame_type = frame.get("type")
+            request_id = str(frame.get("id") or "")
+        except (ValueError, AttributeError):
+            await self.send("error", None, {"detail": "Invalid frame"})
+            return
+
+        if not request_id:
+            await self.send("error", None, {"detail": "id is required"})
+        elif frame_type == "question":
+            await self.ask(request_id, frame.get("content"))
+        elif frame_type == "cancel":
+            await self.cancel(request_id)
+        else:
+            await self.send("error", request_id, {"detail": f"Unknown frame type: {frame_type}"})
+
+    async def ask(self, request_id: str, content: Optional[str]):
+        if not content:
+            await self.send("error", request_id, {"detail": "content is required"})
+        elif request_id in self.tasks:
+            await self.send("error", request_id, {"detail": "Duplicate question id"})
+        elif len(self.tasks) >= MAX_CONCURRENT_QUESTIONS:
+            await self.send("error", request_id, {"detail": "Too many questions in progress"})
+        else:
+            trending_questions.record_ask(content, self.user_id)
+            task = asyncio.get_running_loop().create_task(self.answer(request_id, content))
+            self.tasks[request_id] = task
+            task.add_done_callback(lambda _: self.tasks.pop(request_id, None))
+
+    async def answer(self, request_id: str, content: str):
+        """与 /chat/stream 相同的事件: delta / pause / done / error"""
+        cached = get_cached_answer(content, NO_ATTACHMENTS)
+        references = []
+        if cached is None:
+            try:
+                references = await retrieve_references(content)
+            except Exception as e:
+                print(f"Error retrieving references: {e}")
+        events = stream_chat_events(self.user_id, content, NO_ATTACHMENTS, references, cached)
+        try:
+            async for event, data in events:
+                await self.send(event, request_id, data)
+        finally:
+            await events.aclose()
+
+    async def cancel(self, request_id: str):
+        """取消回答: 任务被取消时 LLM 流式请求随之关闭, 不再消耗 token"""
+        task = self.tasks.get(request_id)
+        if task is None:
+            await self.send("error", request_id, {"detail": "No such question in progress"})
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            pass
+        await self.send("cancelled", request_id)
+
+    async def close(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@router.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    通过 WebSocket 流式回答问题, token 放在查询参数中 (/ws/chat?token=...)。
+    客户端发送 {"type": "question", "id", "content"} 或 {"type": "cancel", "id"},
+    服务端返回 {"type": "delta" | "pause" | "done" | "error" | "cancelled", "id", "data"}。
+    """
+    try:
+        principal = await verify_token(f"Bearer {token}" if token else None)
+    except HTTPException:
+        # 握手阶段关闭, 客户端收到 403
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    connection = ChatSocket(websocket, principal.user_id)
+    try:
+        while True:
+            await connection.handle(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await connection.close()
 
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: int):
@@ -34,5 +136,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
             data = await websocket.receive_text()
             await manager.broadcast(f"Client #{client_id} says: {data}")
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
-        await manager.broadcast(f"Client #{client_id} has left the chat") 
\ No newline at end of file
+    await manager.broadcast(f"Client #{client_id} has left the chat")
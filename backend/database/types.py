@@ -0,0 +1,82 @@
+import os
+import time
+import uuid
+
+from sqlalchemy import BINARY, String
+from sqlalchemy.types import TypeDecorator
+
+from backend.config import settings
+
+# 旧数据中不是 UUID 格式的 ID (例如 init-db.sql 中的 'p1', 'admin1') 用 uuid5 映射到固定的 UUID
+LEGACY_KEY_NAMESPACE = uuid.UUID("6f1c2a4e-8d3b-5e7a-9c0f-1b2d3e4f5a6b")
+
+def uuid7() -> uuid.UUID:
+    """
+    时间有序的 UUIDv7: 前 48 位是毫秒时间戳, 其余是随机数。
+    新行的主键总是落在索引的末尾, 不会像 uuid4 那样随机分散插入到整棵 B-tree 中。
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                          # version
+    value |= ((rand >> 62) & 0xFFF) << 64       # rand_a, 12 位
+    value |= 0b10 << 62                         # variant
+    value |= rand & ((1 << 62) - 1)             # rand_b, 62 位
+    return uuid.UUID(int=value)
+
+def new_id() -> str:
+    """生成新的主键, 对外始终是标准 UUID 字符串"""
+    return str(uuid7())
+
+def key_bytes(value) -> bytes:
+    """把 ID 转换成 16 字节; 不是 UUID 格式的旧 ID 按 uuid5 映射"""
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    if isinstance(value, (bytes, bytearray)) and len(value) == 16:
+        return bytes(value)
+    try:
+        return uuid.UUID(str(value)).bytes
+    except ValueError:
+        return uuid.uuid5(LEGACY_KEY_NAMESPACE, str(value)).bytes
+
+class UUIDKey(TypeDecorator):
+    """
+    以 BINARY(16) 保存的 UUID 主键/外键。
+
+    比 VARCHAR(255) 保存 36 个字符的 UUID 小得多, 而 InnoDB 的每个二级索引都带有主键,
+    所以所有索引都会跟着变小。Python 和 API 中仍然使用 UUID 字符串。
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return key_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(bytes=bytes(value)))
+
+    def literal_processor(self, dialect):
+        # 十六进制字面量 MySQL 和 SQLite 都支持 (EXPLAIN 和 alembic --sql 输出会用到)
+        def process(value):
+            return f"X'{key_bytes(value).hex()}'"
+        return process
+
+    @property
+    def python_type(self):
+        return str
+
+def key_type():
+    """主键和外键列使用的类型, 由 DB_BINARY_KEYS 决定"""
+    return UUIDKey() if settings.DB_BINARY_KEYS else String(255)
+
+def stored_keys_are_binary(inspector) -> bool:
+    """数据库中 users.user_id 列是否不是字符串类型 (SQLite 会把 BINARY(16) 反射成 NUMERIC)"""
+    for column in inspector.get_columns("users"):
+        if column["name"] == "user_id":
+            return not isinstance(column["type"], String)
+    return False
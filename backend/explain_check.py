@@ -0,0 +1,103 @@
+"""
+检查热点查询的执行计划是否用上了索引。
+
+    python -m backend.explain_check
+
+对 DATABASE_URL 指向的数据库 (需要已执行 alembic upgrade head) 执行 EXPLAIN:
+MySQL 上出现 type=ALL (全表扫描) 或需要 filesort / 临时表时失败,
+SQLite 上出现不走索引的 SCAN 或为 ORDER BY / GROUP BY 建临时 B-tree 时失败。
+有失败的查询时退出码为 1, 可以放在部署流水线中迁移之后执行。
+backend/tests/test_explain.py 在迁移建出的临时 SQLite 数据库上对每条查询执行同样的检查。
+"""
+import sys
+from typing import List, Tuple
+
+from sqlalchemy import case, func, select
+
+from backend.database.base import Feedback, HotQuestionClick, Knowledge, Question, Solution, User
+from backend.database.database import engine
+from backend.database.pagination import encode_cursor, keyset_query
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+SAMPLE_TIME = "2026-01-01 00:00:00"
+
+def hot_queries() -> List[Tuple[str, object]]:
+    """(名称, 语句), 与各接口实际使用的查询形状一致"""
+    cursor = encode_cursor([SAMPLE_TIME, SAMPLE_ID])
+    queries = []
+    for suffix, page_cursor in (("", None), (" (next page)", cursor)):
+        queries += [
+            ("users list" + suffix, keyset_query(
+                select(User), [User.register_date, User.user_id], page_cursor, 20
+            )),
+            ("feedback list" + suffix, keyset_query(
+                select(Feedback, User.username).join(User, User.user_id == Feedback.user_id),
+                [Feedback.created_at, Feedback.feedback_id], page_cursor, 10
+            )),
+            ("user conversations" + suffix, keyset_query(
+                select(Question, Solution)
+                .outerjoin(Solution, Solution.question_id == Question.question_id)
+                .filter(Question.user_id == SAMPLE_ID),
+                [Question.ask_time, Question.question_id], page_cursor, 20
+            )),
+        ]
+    queries += [
+        ("conversation feedbacks", select(Feedback).filter(
+            Feedback.solution_id.in_([SAMPLE_ID, SAMPLE_ID[::-1]]), Feedback.user_id == SAMPLE_ID
+        )),
+        ("user feedbacks", select(Feedback).filter(Feedback.user_id == SAMPLE_ID)
+            .order_by(Feedback.created_at.desc())),
+        ("question categories", select(Question.category, func.count(Question.question_id))
+            .group_by(Question.category)),
+        ("feedback stats", select(
+            func.count(),
+            func.avg(Feedback.rating),
+            func.sum(case((Feedback.status == "待处理", 1), else_=0)),
+            *[func.sum(case((Feedback.rating == rating, 1), else_=0)) for rating in range(1, 6)]
+        )),
+        ("knowledge by protocol", select(Knowledge).filter(Knowledge.protocol_id == SAMPLE_ID)),
+        ("hot question clicks", select(func.count()).select_from(HotQuestionClick).filter(
+            HotQuestionClick.question_id == SAMPLE_ID, HotQuestionClick.clicked_at >= SAMPLE_TIME
+        )),
+    ]
+    return queries
+
+def explain(conn, statement) -> List[str]:
+    """执行 EXPLAIN, 返回发现的问题 (为空表示计划没问题)"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    problems = []
+    if conn.dialect.name == "sqlite":
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+            detail = row[3]
+            if detail.startswith("SCAN ") and " INDEX " not in detail and "CONSTANT ROW" not in detail:
+                problems.append(detail)
+            elif "TEMP B-TREE FOR ORDER BY" in detail or "TEMP B-TREE FOR GROUP BY" in detail:
+                problems.append(detail)
+    elif conn.dialect.name == "mysql":
+        for row in conn.exec_driver_sql("EXPLAIN " + sql.replace("%", "%%")).mappings():
+            extra = row.get("Extra") or ""
+            if row.get("type") == "ALL":
+                problems.append(f"full scan on {row.get('table')}")
+            if "Using filesort" in extra or "Using temporary" in extra:
+                problems.append(f"{row.get('table')}: {extra}")
+    else:
+        raise RuntimeError(f"EXPLAIN check does not support {conn.dialect.name}")
+    return problems
+
+def main() -> int:
+    failed = 0
+    with engine.connect() as conn:
+        for name, statement in hot_queries():
+            problems = explain(conn, statement)
+            if problems:
+                failed += 1
+                print(f"FAIL  {name}")
+                for problem in problems:
+                    print(f"      {problem}")
+            else:
+                print(f"ok    {name}")
+    print(f"{failed} of {len(hot_queries())} queries fall back to a full scan or sort")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+批量导入知识库 (RFC 全文、厂商文档等):
+
+    python -m backend.ingest corpus.ndjson [more.ndjson ...] [--batch-size 500]
+    python -m backend.ingest rfc4271.txt rfc2328.txt --protocol BGP
+    cat corpus.ndjson | python -m backend.ingest -
+
+.ndjson / .jsonl 文件每行一个 {"content", "source", "protocol" 或 "protocol_id"};
+其他文件整篇作为一个文档导入, source 为文件名, 协议由 --protocol 指定。
+长文档按 KNOWLEDGE_CHUNK_CHARS 切块, 每批一条多行 INSERT; 已经导入过的块会被跳过, 中断后可以直接重新运行。
+直接写数据库, 完成后通过 BROADCAST_URL 通知正在运行的后端重建检索索引 (BROADCAST_URL 为 memory:// 时需要重启后端)。
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from backend.services.knowledge_ingest import KnowledgeIngester, create_ingester
+from backend.services.knowledge_sync import knowledge_sync
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+def ingest_ndjson(ingester: KnowledgeIngester, stream, name: str):
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            ingester.add_error(line_number, f"{name}: invalid JSON")
+            continue
+        if ingester.add(record, line=line_number):
+            ingester.flush()
+            print(f"Imported {ingester.chunks} chunks from {ingester.documents} documents")
+
+def ingest_document(ingester: KnowledgeIngester, path: Path, protocol: str):
+    record = {"content": path.read_text(encoding="utf-8"), "source": path.name, "protocol": protocol}
+    if ingester.add(record):
+        ingester.flush()
+        print(f"Imported {ingester.chunks} chunks from {ingester.documents} documents")
+
+async def notify_workers():
+    await knowledge_sync.publish_reload()
+    await knowledge_sync.backend.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import knowledge entries")
+    parser.add_argument("paths", nargs="+", help="NDJSON files, plain text documents, or - for NDJSON on stdin")
+    parser.add_argument("--protocol", help="protocol name for plain text documents")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--no-create-protocols", action="store_true", help="reject unknown protocol names")
+    args = parser.parse_args()
+
+    ingester = create_ingester(create_protocols=not args.no_create_protocols, batch_size=args.batch_size)
+    for name in args.paths:
+        if name == "-":
+            ingest_ndjson(ingester, sys.stdin, "stdin")
+            continue
+        path = Path(name)
+        if path.suffix.lower() in NDJSON_SUFFIXES:
+            with path.open(encoding="utf-8") as stream:
+                ingest_ndjson(ingester, stream, path.name)
+        else:
+            ingest_document(ingester, path, args.protocol)
+
+    result = ingester.finish()
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}")
+    print(
+        f"Done, {result.chunks} chunks from {result.documents} documents "
+        f"({result.skipped} already imported, {result.protocols_created} protocols created, {result.error_count} errors)"
+    )
+    if result.chunks:
+        asyncio.run(notify_workers())
+
+if __name__ == "__main__":
+    main()
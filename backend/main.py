@@ -6,13 +6,24 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # 使用正确的导入路径
-from backend.database.base import Base
-from backend.database.database import engine
-from backend.database.routers import users, chat, feedbacks, protocols, knowledge
+from backend.config import settings
+from backend.database.database import engine, async_engine
+from backend.database.migrate import upgrade_to_head
+from backend.database.routers import users, chat, feedbacks, protocols, knowledge, metrics, attachments, websocket
+from starlette.concurrency import run_in_threadpool
+from backend.services.llm_client import llm_client
+from backend.services.password_hasher import password_hasher
+from backend.services.event_queue import event_queue
+from backend.services.trending import trending_snapshotter
+from backend.services.websocket_hub import manager as websocket_manager
+from backend.services.knowledge_index import load_knowledge_index
+from backend.services.knowledge_sync import knowledge_sync
+from backend.services.protocol_classifier import load_protocol_names
 
-# Create all database tables
-# 只创建不存在的表，不删除现有表
-Base.metadata.create_all(bind=engine)
+# 建表和索引由 alembic 迁移管理 (backend/migrations), 已有的表不会重建
+# 多个 worker 同时导入时由 migration_lock 串行执行, 也可以关闭 DB_AUTO_MIGRATE 改为启动前执行 python -m backend.database.migrate
+if settings.DB_AUTO_MIGRATE:
+    upgrade_to_head()
 
 app = FastAPI()
 
@@ -39,12 +50,62 @@ app.add_middleware(
     max_age=3600,
 )
 
+@app.on_event("startup")
+async def startup():
+    # 创建进程级共享的 LLM 客户端（连接池）
+    llm_client.start()
+    password_hasher.start()
+    event_queue.start()
+    await websocket_manager.start()
+    # 其他 worker 新增的知识通过广播同步到本进程的检索索引
+    await knowledge_sync.start()
+
+    # 把 protocols 表中的协议名称加入问题分类器
+    try:
+        count = await run_in_threadpool(load_protocol_names)
+        print(f"Protocol classifier loaded with {count} names")
+    except Exception as e:
+        print(f"WARNING: Failed to load protocol names: {e}")
+
+    # 从数据库构建知识库检索索引
+    try:
+        count = await run_in_threadpool(load_knowledge_index)
+        print(f"Knowledge index built with {count} entries")
+    except Exception as e:
+        print(f"WARNING: Failed to build knowledge index: {e}")
+
+    # 从快照恢复热门问题排行, 并定期写入新的快照
+    try:
+        count = await trending_snapshotter.load()
+        print(f"Hot question ranking restored with {count} entries")
+    except Exception as e:
+        print(f"WARNING: Failed to restore hot question ranking: {e}")
+    trending_snapshotter.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await websocket_manager.close_all()
+    await knowledge_sync.close()
+    await llm_client.close()
+    # 先写完队列中的事件和热门问题快照, 再关闭数据库连接
+    await event_queue.close()
+    try:
+        await trending_snapshotter.close()
+    except Exception as e:
+        print(f"WARNING: Failed to save hot question snapshot: {e}")
+    await run_in_threadpool(password_hasher.shutdown)
+    await async_engine.dispose()
+
 # Include the routers
 app.include_router(users.router, prefix="/api", tags=["Users"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
 app.include_router(feedbacks.router, prefix="/api", tags=["Feedbacks"])
 app.include_router(protocols.router, prefix="/api", tags=["Protocols"])
 app.include_router(knowledge.router, prefix="/api", tags=["Knowledge"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
+# 上传的附件: save_upload_file 返回的 /static/uploads/... 地址, 不加 /api 前缀
+app.include_router(attachments.router, tags=["Attachments"])
+app.include_router(websocket.router)
 
 @app.get("/")
 def read_root():
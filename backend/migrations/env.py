@@ -0,0 +1,48 @@
+from logging.config import fileConfig
+
+from alembic import context
+import sqlalchemy as sa
+from sqlalchemy import create_engine, pool
+
+from backend.config import settings
+from backend.database.base import Base
+from backend.database.types import UUIDKey
+
+config = context.config
+
+# 在后端进程内执行迁移时不覆盖应用的日志配置
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    """SQLite 把 BINARY(16) 反射成 NUMERIC, 二进制主键只在数据库中仍是字符串列时才算类型不同"""
+    if isinstance(metadata_type, UUIDKey):
+        return isinstance(inspected_type, sa.String)
+    return None
+
+def run_migrations_offline() -> None:
+    """只输出 SQL, 不连接数据库 (alembic upgrade head --sql)"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        compare_type=compare_type,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    connectable = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, compare_type=compare_type)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,120 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+已有的数据库 (init-db.sql 或 create_all 创建) 可以直接升级: 已存在的表不会重建,
+只补上缺少的列; 新数据库则创建全部表。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.database.types import key_type
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _tables():
+    """
+    各表在基线版本中的列, 按外键依赖顺序排列。
+    主键和外键的类型 (VARCHAR 或 BINARY(16)) 是部署时的选择, 由 DB_BINARY_KEYS 决定
+    """
+    return {
+        "users": [
+            sa.Column("user_id", key_type(), primary_key=True),
+            sa.Column("username", sa.String(255), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("hashed_password", sa.String(255), nullable=False),
+            sa.Column("register_date", sa.DateTime(), server_default=sa.func.now()),
+        ],
+        "protocols": [
+            sa.Column("protocol_id", key_type(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("rfc_number", sa.String(255)),
+        ],
+        "knowledge": [
+            sa.Column("knowledge_id", key_type(), primary_key=True),
+            sa.Column("protocol_id", key_type(), sa.ForeignKey("protocols.protocol_id")),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("source", sa.String(2048)),
+            sa.Column("update_time", sa.DateTime(), server_default=sa.func.now()),
+        ],
+        "questions": [
+            sa.Column("question_id", key_type(), primary_key=True),
+            sa.Column("user_id", key_type(), sa.ForeignKey("users.user_id"), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("image_url", sa.String(2048)),
+            sa.Column("file_url", sa.String(2048)),
+            sa.Column("file_name", sa.String(255)),
+            sa.Column("category", sa.String(64)),
+            sa.Column("ask_time", sa.DateTime(), server_default=sa.func.now()),
+        ],
+        "solutions": [
+            sa.Column("solution_id", key_type(), primary_key=True),
+            sa.Column("question_id", key_type(), sa.ForeignKey("questions.question_id"), nullable=False, unique=True),
+            sa.Column("steps", sa.Text()),
+            sa.Column("confidence_score", sa.Float()),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        ],
+        "feedbacks": [
+            sa.Column("feedback_id", key_type(), primary_key=True),
+            sa.Column("user_id", key_type(), sa.ForeignKey("users.user_id"), nullable=False),
+            sa.Column("solution_id", key_type(), sa.ForeignKey("solutions.solution_id"), nullable=False),
+            sa.Column("rating", sa.Integer()),
+            sa.Column("comment", sa.Text()),
+            sa.Column("status", sa.String(255), server_default="待处理"),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        ],
+        "solution_references_knowledge": [
+            sa.Column("solution_id", key_type(), sa.ForeignKey("solutions.solution_id"), primary_key=True),
+            sa.Column("knowledge_id", key_type(), sa.ForeignKey("knowledge.knowledge_id"), primary_key=True),
+        ],
+        "hot_question_clicks": [
+            sa.Column("click_id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("question_id", sa.String(255), nullable=False),
+            sa.Column("clicked_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        ],
+        "hot_question_snapshots": [
+            sa.Column("question_id", sa.String(32), primary_key=True),
+            sa.Column("question", sa.Text(), nullable=False),
+            sa.Column("score", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        ],
+    }
+
+# 新建表时一起创建的唯一索引
+UNIQUE_INDEXES = {
+    "users": [("ix_users_username", ["username"]), ("ix_users_email", ["email"])],
+}
+
+
+def upgrade() -> None:
+    # --sql (离线模式) 无法检查数据库, 输出完整的建表脚本
+    offline = op.get_context().as_sql
+    inspector = None if offline else sa.inspect(op.get_bind())
+    existing_tables = set() if offline else set(inspector.get_table_names())
+
+    for table_name, columns in _tables().items():
+        if table_name not in existing_tables:
+            op.create_table(table_name, *columns)
+            for index_name, index_columns in UNIQUE_INDEXES.get(table_name, []):
+                op.create_index(index_name, table_name, index_columns, unique=True)
+            continue
+
+        # 旧版本的表缺少后来新增的列 (这些列都允许为空或带有默认值)
+        existing_columns = {column["name"] for column in inspector.get_columns(table_name)}
+        for column in columns:
+            if column.name not in existing_columns:
+                op.add_column(table_name, column)
+
+
+def downgrade() -> None:
+    for table_name in reversed(list(_tables())):
+        op.drop_table(table_name)
@@ -0,0 +1,72 @@
+"""secondary indexes for listing, history and dashboard queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+已经存在同名索引, 或已有索引的列与要创建的完全相同 (例如 init-db.sql 中创建的) 时跳过。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # 问题分类统计 (GROUP BY category)
+    ("ix_questions_category", "questions", ["category"]),
+    # 游标分页: (时间, 主键) 倒序
+    ("ix_users_register_date_id", "users", ["register_date", "user_id"]),
+    ("ix_questions_ask_time_id", "questions", ["ask_time", "question_id"]),
+    ("ix_solutions_created_at_id", "solutions", ["created_at", "solution_id"]),
+    ("ix_feedbacks_created_at_id", "feedbacks", ["created_at", "feedback_id"]),
+    # 用户的问答记录
+    ("ix_questions_user_ask_time_id", "questions", ["user_id", "ask_time", "question_id"]),
+    # 问答记录中按解决方案加载用户自己的反馈
+    ("ix_feedbacks_solution_user", "feedbacks", ["solution_id", "user_id"]),
+    ("ix_feedbacks_user_created", "feedbacks", ["user_id", "created_at"]),
+    # 反馈统计只需要扫描这个覆盖索引
+    ("ix_feedbacks_status_rating", "feedbacks", ["status", "rating"]),
+    ("ix_knowledge_protocol_id", "knowledge", ["protocol_id"]),
+    ("ix_hot_question_clicks_question_time", "hot_question_clicks", ["question_id", "clicked_at"]),
+]
+
+
+def _existing_indexes(inspector, table_name):
+    # --sql (离线模式) 无法检查数据库, 按所有索引都不存在处理
+    indexes = inspector.get_indexes(table_name) if inspector is not None else []
+    return {index["name"] for index in indexes}, {tuple(index["column_names"]) for index in indexes}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = None if op.get_context().as_sql else sa.inspect(bind)
+    for index_name, table_name, columns in INDEXES:
+        names, column_sets = _existing_indexes(inspector, table_name)
+        if index_name in names or tuple(columns) in column_sets:
+            continue
+        op.create_index(index_name, table_name, columns)
+
+    # 知识全文检索 (KNOWLEDGE_SEARCH_BACKEND=fulltext) 只在 MySQL 上可用
+    if bind.dialect.name == "mysql":
+        names, _ = _existing_indexes(inspector, "knowledge")
+        if "ft_knowledge_content" not in names:
+            op.execute("CREATE FULLTEXT INDEX ft_knowledge_content ON knowledge (content) WITH PARSER ngram")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if bind.dialect.name == "mysql":
+        names, _ = _existing_indexes(inspector, "knowledge")
+        if "ft_knowledge_content" in names:
+            op.drop_index("ft_knowledge_content", table_name="knowledge")
+    for index_name, table_name, _ in reversed(INDEXES):
+        names, _ = _existing_indexes(inspector, table_name)
+        if index_name in names:
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,40 @@
+"""hot question snapshots: distinct asker count
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+热门问题只有足够多的不同用户问过才会公开展示, 快照中保存提问人数, 重启后门槛仍然有效。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_users_column() -> bool:
+    # --sql (离线模式) 无法检查数据库, 按列不存在处理
+    if op.get_context().as_sql:
+        return False
+    columns = sa.inspect(op.get_bind()).get_columns("hot_question_snapshots")
+    return any(column["name"] == "users" for column in columns)
+
+
+def upgrade() -> None:
+    if not _has_users_column():
+        op.add_column(
+            "hot_question_snapshots",
+            sa.Column("users", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    if _has_users_column():
+        with op.batch_alter_table("hot_question_snapshots") as batch_op:
+            batch_op.drop_column("users")
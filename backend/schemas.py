@@ -17,6 +17,10 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+
 # Question schemas
 class QuestionBase(BaseModel):
     content: str
@@ -80,6 +84,38 @@ class Knowledge(KnowledgeBase):
     class Config:
         from_attributes = True
 
+class KnowledgeSearchHit(BaseModel):
+    knowledge_id: str
+    protocol_id: Optional[str] = None
+    source: Optional[str] = None
+    score: float
+    snippet: str
+    highlights: List[List[int]] = []  # snippet 中命中词的 [start, end) 位置
+
+class KnowledgeSearchPage(BaseModel):
+    items: List[KnowledgeSearchHit]
+    next_cursor: Optional[str] = None
+
+class KnowledgeImport(BaseModel):
+    """批量导入的一篇文档 (NDJSON 的一行), 过长的内容会被切成多条知识"""
+    content: str
+    source: Optional[str] = None
+    protocol_id: Optional[str] = None
+    protocol: Optional[str] = None  # 协议名称, 与 protocol_id 二选一
+
+class KnowledgeImportError(BaseModel):
+    line: Optional[int] = None
+    error: str
+
+class KnowledgeImportResult(BaseModel):
+    documents: int
+    chunks: int
+    batches: int
+    skipped: int = 0  # 已经导入过而跳过的块
+    protocols_created: int
+    error_count: int
+    errors: List[KnowledgeImportError] = []
+
 # Feedback schemas
 class FeedbackBase(BaseModel):
     rating: int
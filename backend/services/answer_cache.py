@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+from backend.config import settings
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# 英文词、数字、地址和网段 (如 vlan, 10, 10.1.0.0/16, ge-0/0/1), 在去掉标点之前提取
+_KEY_TOKEN = re.compile(r"[a-z0-9]+(?:[./:_-][a-z0-9]+)*")
+
+# 出现与否会让问题意思相反的否定词
+NEGATION_WORDS = ("禁止", "不", "没", "无", "非", "未", "勿", "别", "否")
+
+def normalize_question(text: str) -> str:
+    """统一全角/半角和大小写，去掉空白与标点，作为缓存键"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_WORD.sub("", text)
+
+def key_tokens(text: str) -> Tuple[str, ...]:
+    """
+    近似匹配时必须完全相同的部分: 英文词和数字 (按出现顺序) 以及否定词。
+    只差一个 VLAN 号、网段或 "禁止" 的两个问题 n-gram 相似度很高, 答案却完全不同。
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = _KEY_TOKEN.findall(text)
+    negations = [word for word in NEGATION_WORDS for _ in range(text.count(word))]
+    return tuple(tokens) + ("|",) + tuple(negations)
+
+def char_ngrams(text: str, n: int) -> Set[str]:
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class _Entry:
+    __slots__ = ("steps", "confidence_score", "knowledge_ids", "expires_at", "grams", "tokens")
+
+    def __init__(
+        self,
+        steps: str,
+        confidence_score: float,
+        knowledge_ids: Tuple[str, ...],
+        expires_at: float,
+        grams: Set[str],
+        tokens: Tuple[str, ...]
+    ):
+        self.steps = steps
+        self.confidence_score = confidence_score
+        self.knowledge_ids = knowledge_ids
+        self.expires_at = expires_at
+        self.grams = grams
+        self.tokens = tokens
+
+class AnswerCache:
+    """
+    LLM 回答缓存。
+
+    先按规范化后的问题文本精确匹配; similarity > 0 时再用字符 n-gram 的
+    Jaccard 相似度查找近似重复的问题, 且英文词、数字和否定词必须完全相同 (见 key_tokens)。
+    条目同时记录生成回答时引用的 knowledge_id, 命中时不需要再检索知识库。
+    条目带 TTL，超出容量时按 LRU 淘汰。
+    """
+
+    def __init__(self, max_size: int, ttl: float, similarity: float = 0.0, ngram: int = 3):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.ngram = ngram
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._gram_index: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, question: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+
+            if entry is None and self.similarity > 0:
+                key = self._find_similar(key, key_tokens(question), now)
+                entry = self._entries.get(key) if key else None
+                if entry is not None:
+                    self.near_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return {
+                "steps": entry.steps,
+                "confidence_score": entry.confidence_score,
+                "knowledge_ids": list(entry.knowledge_ids),
+            }
+
+    def put(self, question: str, steps: str, confidence_score: float, knowledge_ids: Sequence[str] = ()):
+        if not self.enabled or not steps:
+            return
+
+        key = normalize_question(question)
+        if not key:
+            return
+
+        entry = _Entry(
+            steps, confidence_score, tuple(knowledge_ids), time.monotonic() + self.ttl,
+            char_ngrams(key, self.ngram), key_tokens(question)
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for gram in entry.grams:
+                self._gram_index.setdefault(gram, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._gram_index.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry.grams:
+            keys = self._gram_index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._gram_index[gram]
+
+    def _find_similar(self, key: str, tokens: Tuple[str, ...], now: float) -> Optional[str]:
+        grams = char_ngrams(key, self.ngram)
+        if not grams:
+            return None
+
+        # 只比较至少共享一个 n-gram 的候选问题
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._gram_index.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        best_key, best_score = None, self.similarity
+        for candidate, shared in overlap.items():
+            entry = self._entries[candidate]
+            if entry.expires_at <= now or entry.tokens != tokens:
+                continue
+            score = shared / (len(grams) + len(entry.grams) - shared)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+answer_cache = AnswerCache(
+    max_size=settings.ANSWER_CACHE_SIZE,
+    ttl=settings.ANSWER_CACHE_TTL,
+    similarity=settings.ANSWER_CACHE_SIMILARITY,
+)
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[str], None]
+
+class BroadcastBackend(ABC):
+    """
+    跨 worker 的发布/订阅后端, WebSocket 广播和知识库索引同步共用。
+
+    publish 把消息发给所有进程 (包括自己) 中订阅了该频道的 handler,
+    handler 在事件循环中同步调用, 不能阻塞。
+    """
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        """把消息发布到频道"""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        """订阅频道, 之后发布到该频道的消息都会交给 handler"""
+
+def dispatch(handlers: List[MessageHandler], message: str):
+    for handler in list(handlers):
+        try:
+            handler(message)
+        except Exception as e:
+            logger.warning(f"广播消息处理失败: {e}")
+
+class MemoryBroadcastBackend(BroadcastBackend):
+    """进程内实现, 用于单进程部署和本地测试"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+
+    async def disconnect(self):
+        self._handlers.clear()
+
+    async def publish(self, channel: str, message: str):
+        dispatch(self._handlers[channel], message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel].append(handler)
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """
+    基于 Redis PUBLISH/SUBSCRIBE 的实现, 多个 worker 或多台机器共享同一个频道。
+    需要安装 redis 包; 兼容 Redis 协议的服务 (如 KeyDB, Valkey) 也可以使用。
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._pubsub = None
+        self._handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        # WebSocket 广播和知识库索引同步共用一个后端, 重复调用时保留已有连接
+        if self._client is not None:
+            return
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("BROADCAST_URL uses Redis but the 'redis' package is not installed")
+        self._client = aioredis.from_url(self.url, decode_responses=True)
+        self._pubsub = self._client.pubsub()
+        logger.info(f"WebSocket 广播使用 Redis: {self.url}")
+
+    async def disconnect(self):
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._client is not None:
+            await self._client.close()
+        self._client = self._pubsub = None
+        self._handlers.clear()
+
+    async def publish(self, channel: str, message: str):
+        await self._client.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel].append(handler)
+        await self._pubsub.subscribe(channel)
+        if self._reader is None:
+            self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def _read_loop(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    dispatch(self._handlers[message["channel"]], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 连接断开后稍等再重新订阅, 期间的消息会丢失
+                logger.warning(f"Redis 订阅中断, 1 秒后重试: {e}")
+                await asyncio.sleep(1)
+
+class SQLiteBroadcastBackend(BroadcastBackend):
+    """
+    同一台机器上的多个 worker 共享一个 SQLite 文件: publish 插入一行, 每个进程轮询新插入的行。
+    不依赖任何外部服务, 用于单机多 worker 部署和测试跨进程广播; 延迟约为一个轮询间隔。
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05, retention: float = 60.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        # 超过 retention 秒的消息会被删除, 所有订阅者早已读过
+        self.retention = retention
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+        self._last_id = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        if self._conn is None:
+            await asyncio.to_thread(self._open)
+            logger.info(f"WebSocket 广播使用 SQLite: {self.path}")
+
+    async def disconnect(self):
+        poller, self._poller = self._poller, None
+        if poller is not None:
+            poller.cancel()
+            try:
+                await poller
+            except asyncio.CancelledError:
+                pass
+        # 取消轮询任务不会中断线程里正在执行的查询, 需要持锁关闭连接
+        await asyncio.to_thread(self._close)
+        self._handlers.clear()
+
+    async def publish(self, channel: str, message: str):
+        await asyncio.to_thread(self._insert, channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel].append(handler)
+        if self._poller is None:
+            self._poller = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    def _open(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcast_messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        # 只接收连接之后发布的消息
+        self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM broadcast_messages").fetchone()[0]
+        self._conn = conn
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert(self, channel: str, message: str):
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError("SQLite broadcast backend is not connected")
+            self._conn.execute(
+                "INSERT INTO broadcast_messages (channel, message, created_at) VALUES (?, ?, ?)",
+                (channel, message, now)
+            )
+            self._conn.execute("DELETE FROM broadcast_messages WHERE created_at < ?", (now - self.retention,))
+
+    def _fetch(self) -> List[tuple]:
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                "SELECT id, channel, message FROM broadcast_messages WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return rows
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                for _, channel, message in await asyncio.to_thread(self._fetch):
+                    dispatch(self._handlers[channel], message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"SQLite 广播读取失败: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+def create_broadcast_backend(url: str) -> BroadcastBackend:
+    scheme = url.partition("://")[0].lower()
+    if scheme == "memory":
+        return MemoryBroadcastBackend()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBroadcastBackend(url)
+    if scheme == "sqlite":
+        # 与 SQLAlchemy 相同: sqlite:///相对路径, sqlite:////绝对路径
+        return SQLiteBroadcastBackend(url.partition(":///")[2])
+    raise ValueError(f"Unsupported BROADCAST_URL: {url}")
+
+broadcast_backend = create_broadcast_backend(settings.BROADCAST_URL)
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Table
+
+from backend.config import settings
+from backend.database.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("async", "sync")
+
+class EventQueue:
+    """
+    反馈、点击等事件的后台批量写入队列 (write-behind)。
+
+    接口只把事件放进内存缓冲区, 后台任务每隔 flush_interval 秒或攒够 batch_size 条后,
+    对每张表执行一条多行 INSERT。整批写入失败时逐行重试, 只丢弃出错的事件。
+    durability="sync" 时 enqueue 返回的 Future 在事件所在批次提交后完成, 调用方可以等待它。
+    所有方法都必须在事件循环中调用。
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int, durability: str):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"EVENT_DURABILITY must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self._buffers: Dict[str, List[Tuple[Dict, Optional[asyncio.Future]]]] = defaultdict(list)
+        self._tables: Dict[str, Table] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+        self._pending = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.max_flush_seconds = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"事件写入队列已启动: durability={self.durability}, batch_size={self.batch_size}")
+
+    async def close(self):
+        """停止后台任务, 并把缓冲区中剩余的事件全部写入"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await task
+        await self.flush()
+
+    def on_flush(self, table: Table, callback: Callable[[], None]):
+        """注册回调, 该表有事件写入后调用 (例如让统计缓存失效)"""
+        self._listeners[table.name].append(callback)
+
+    def enqueue(self, table: Table, row: Dict) -> Optional[asyncio.Future]:
+        """
+        把一行数据放入写入队列。同一张表的所有行必须包含相同的列。
+        队列已满时返回 503; sync 模式下返回一个在写入完成后结束的 Future。
+        """
+        self.start()
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Too many pending events, please retry")
+
+        future = asyncio.get_running_loop().create_future() if self.durability == "sync" else None
+        self._tables[table.name] = table
+        buffer = self._buffers[table.name]
+        buffer.append((row, future))
+        self._pending += 1
+        self.enqueued += 1
+        if len(buffer) >= self.batch_size:
+            self._wakeup.set()
+        return future
+
+    async def flush(self):
+        """立即写入缓冲区中的所有事件"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            buffers, self._buffers = self._buffers, defaultdict(list)
+            for table_name, items in buffers.items():
+                table = self._tables[table_name]
+                start = time.perf_counter()
+                for offset in range(0, len(items), self.batch_size):
+                    await self._write_batch(table, items[offset:offset + self.batch_size])
+                self.max_flush_seconds = max(self.max_flush_seconds, time.perf_counter() - start)
+                self._pending -= len(items)
+                for callback in self._listeners[table_name]:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.warning(f"事件写入回调失败: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "durability": self.durability,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": round(self.flush_interval * 1000, 3),
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+        }
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # 不能让后台任务退出, 否则之后的事件都不会再被写入
+                logger.exception(f"事件批量写入失败: {e}")
+
+    async def _write_batch(self, table: Table, items: List[Tuple[Dict, Optional[asyncio.Future]]]):
+        rows = [row for row, _ in items]
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(table.insert().values(rows))
+        except Exception as e:
+            # 整批失败 (例如某一行外键不存在) 时逐行写入, 只丢弃出错的行
+            logger.warning(f"{table.name} 批量写入 {len(rows)} 行失败, 改为逐行写入: {e}")
+            self.fallbacks += 1
+            for row, future in items:
+                try:
+                    async with async_engine.begin() as conn:
+                        await conn.execute(table.insert().values(row))
+                except Exception as row_error:
+                    self.failed += 1
+                    logger.error(f"{table.name} 事件写入失败, 已丢弃: {row} ({row_error})")
+                    if future is not None and not future.done():
+                        future.set_exception(row_error)
+                else:
+                    self.written += 1
+                    if future is not None and not future.done():
+                        future.set_result(None)
+            return
+
+        self.batches += 1
+        self.written += len(rows)
+        for _, future in items:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+event_queue = EventQueue(
+    batch_size=settings.EVENT_BATCH_SIZE,
+    flush_interval=settings.EVENT_FLUSH_INTERVAL_MS / 1000,
+    max_pending=settings.EVENT_MAX_PENDING,
+    durability=settings.EVENT_DURABILITY,
+)
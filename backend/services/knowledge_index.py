@@ -0,0 +1,352 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # 稠密向量索引是可选的
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 英文/数字按单词切分, 中日韩文字按连续片段切分后再取二元组
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_ASCII_RE = re.compile(r"[a-z0-9]")
+
+def tokenize(text: str) -> List[str]:
+    """中英文混合分词: 英文单词整体作为词项, 中文取相邻二字组 (单字片段保留单字)"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if _ASCII_RE.match(run) or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def make_snippet(content: str, query: str, width: int = 160) -> Tuple[str, List[List[int]]]:
+    """截取包含首个命中词的片段, 并返回片段内命中词的 [start, end) 位置"""
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    patterns = [
+        rf"(?<![a-z0-9]){re.escape(term)}(?![a-z0-9])" if _ASCII_RE.match(term) else re.escape(term)
+        for term in terms
+    ]
+    spans: List[List[int]] = []
+    if patterns:
+        for match in re.finditer("|".join(patterns), content, re.IGNORECASE):
+            if spans and match.start() <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], match.end())
+            else:
+                spans.append([match.start(), match.end()])
+    if not spans:
+        return content[:width], []
+
+    start = max(0, spans[0][0] - width // 4)
+    end = min(len(content), start + width)
+    highlights = [
+        [max(span_start, start) - start, min(span_end, end) - start]
+        for span_start, span_end in spans
+        if span_start < end and span_end > start
+    ]
+    return content[start:end], highlights
+
+class BM25Index:
+    """支持增量增删的 BM25 倒排索引"""
+
+    # prune=True 时, 出现在超过该比例文档中的词项只给已有候选加分, 不再遍历整条倒排链
+    COMMON_TERM_RATIO = 0.2
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: str, tokens: List[str]):
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+
+        term_freqs: Dict[str, int] = {}
+        for token in tokens:
+            term_freqs[token] = term_freqs.get(token, 0) + 1
+        for term, tf in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+        self._doc_terms[doc_id] = term_freqs
+        self._doc_len[doc_id] = len(tokens)
+        self._total_len += len(tokens)
+
+    def remove(self, doc_id: str):
+        term_freqs = self._doc_terms.pop(doc_id, None)
+        if term_freqs is None:
+            return
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def scores(self, tokens: List[str], prune: bool = True) -> Dict[str, float]:
+        """
+        prune=True 只适合取前 k 个结果 (聊天检索参考资料): 只包含常见词项的文档不会出现在结果中。
+        需要完整召回时使用 prune=False。
+        """
+        return self.pruned_scores(tokens)[0] if prune else self._accumulate(tokens, False)[0]
+
+    def pruned_scores(self, tokens: List[str]) -> Tuple[Dict[str, float], float]:
+        """
+        返回剪枝后的分数和被剪掉文档的分数上界: 每个词项的贡献小于它的 idf 权重,
+        所以没有进入结果的文档 (只包含常见词项) 分数一定低于这些常见词项的权重之和。
+        候选分数本身是精确的。
+        """
+        return self._accumulate(tokens, True)
+
+    def _accumulate(self, tokens: List[str], prune: bool) -> Tuple[Dict[str, float], float]:
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return {}, 0.0
+
+        avg_len = self._total_len / n_docs or 1.0
+        base = self.k1 * (1 - self.b)
+        scale = self.k1 * self.b / avg_len
+        doc_len = self._doc_len
+        terms = sorted(
+            {token for token in tokens if token in self._postings},
+            key=lambda term: len(self._postings[term]),
+        )
+        scores: Dict[str, float] = {}
+        bound = 0.0
+        for term in terms:
+            postings = self._postings[term]
+            df = len(postings)
+            weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+            get = scores.get
+
+            # 词项由少到多处理: 常见词项只在已有候选上累加
+            if prune and scores and df > self.COMMON_TERM_RATIO * n_docs:
+                bound += weight
+                for doc_id in list(scores):
+                    tf = postings.get(doc_id)
+                    if tf:
+                        scores[doc_id] = get(doc_id) + weight * tf / (tf + base + scale * doc_len[doc_id])
+            else:
+                for doc_id, tf in postings.items():
+                    scores[doc_id] = get(doc_id, 0.0) + weight * tf / (tf + base + scale * doc_len[doc_id])
+        return scores, bound
+
+def hashing_embed(tokens: List[str], dim: int):
+    """特征哈希向量, 没有外部向量模型时作为稠密索引的默认表示"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class DenseIndex:
+    """基于 NumPy 的稠密向量索引, 使用内积 (余弦) 相似度"""
+
+    def __init__(self, dim: int, embed: Optional[Callable] = None):
+        self.dim = dim
+        self.embed = embed or (lambda tokens: hashing_embed(tokens, dim))
+        self._matrix = np.zeros((1024, dim), dtype=np.float32)
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+
+    def add(self, doc_id: str, tokens: List[str]):
+        row = self._rows.get(doc_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= len(self._matrix):
+                grown = np.zeros((len(self._matrix) * 2, self.dim), dtype=np.float32)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+            self._ids.append(doc_id)
+            self._rows[doc_id] = row
+        self._matrix[row] = self.embed(tokens)
+
+    def remove(self, doc_id: str):
+        row = self._rows.pop(doc_id, None)
+        if row is not None:
+            self._ids[row] = None
+            self._matrix[row] = 0.0
+
+    def search(self, tokens: List[str], k: int) -> List[Tuple[str, float]]:
+        n_rows = len(self._ids)
+        if not n_rows or k <= 0:
+            return []
+        sims = self._matrix[:n_rows] @ self.embed(tokens)
+        k = min(k, n_rows)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self._ids[row], float(sims[row])) for row in top if self._ids[row] is not None and sims[row] > 0]
+
+class KnowledgeIndex:
+    """
+    知识库检索引擎: 在进程内为 Knowledge.content 建立 BM25 倒排索引,
+    可选再叠加 NumPy 稠密向量索引 (两路结果按倒数排名融合)。
+    应用启动时全量构建, 新增知识时增量更新。
+    """
+
+    RRF_K = 60
+
+    def __init__(self, dense: bool = False, dense_dim: int = 256):
+        self._bm25 = BM25Index()
+        self._dense = DenseIndex(dense_dim) if dense and np is not None else None
+        if dense and np is None:
+            logger.warning("NumPy 未安装, 知识库稠密向量索引已关闭")
+        self._protocols: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bm25)
+
+    def add(self, knowledge_id: str, content: str, protocol_id: Optional[str] = None):
+        tokens = tokenize(content)
+        with self._lock:
+            self._add(knowledge_id, tokens, protocol_id)
+
+    def add_many(self, rows: Iterable[Tuple[str, Optional[str], str]]):
+        """rows: (knowledge_id, protocol_id, content)"""
+        prepared = [(knowledge_id, protocol_id, tokenize(content)) for knowledge_id, protocol_id, content in rows]
+        with self._lock:
+            for knowledge_id, protocol_id, tokens in prepared:
+                self._add(knowledge_id, tokens, protocol_id)
+
+    def remove(self, knowledge_id: str):
+        with self._lock:
+            self._bm25.remove(knowledge_id)
+            if self._dense is not None:
+                self._dense.remove(knowledge_id)
+            self._protocols.pop(knowledge_id, None)
+
+    def clear(self):
+        with self._lock:
+            dense = self._dense is not None
+            self._bm25 = BM25Index()
+            self._dense = DenseIndex(self._dense.dim) if dense else None
+            self._protocols = {}
+
+    def search(self, query: str, k: int = 5, protocol_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """返回按相关度排序的 (knowledge_id, score)"""
+        tokens = tokenize(query)
+        if not tokens or k <= 0:
+            return []
+
+        with self._lock:
+            scores = self._bm25.scores(tokens)
+            if protocol_id is not None:
+                scores = {doc_id: score for doc_id, score in scores.items()
+                          if self._protocols.get(doc_id) == protocol_id}
+            ranked = heapq.nlargest(k if self._dense is None else k * 4, scores.items(), key=lambda item: item[1])
+            if self._dense is None:
+                return ranked
+
+            dense_ranked = [
+                (doc_id, score) for doc_id, score in self._dense.search(tokens, k * 4)
+                if protocol_id is None or self._protocols.get(doc_id) == protocol_id
+            ]
+
+        fused: Dict[str, float] = {}
+        for results in (ranked, dense_ranked):
+            for rank, (doc_id, _) in enumerate(results):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.RRF_K + rank + 1)
+        return heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+
+    def page(
+        self,
+        query: str,
+        limit: int,
+        after: Optional[Tuple[float, str]] = None,
+        protocol_id: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        按 (score desc, knowledge_id asc) 返回 after 之后的 limit 条结果, 供分页检索使用。
+        先用剪枝后的候选取本页; 只有本页排到了被剪掉文档的分数上界以下时才退回完整打分,
+        所以靠前的页不会遍历常见词项的整条倒排链, 结果和完整打分一致。
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+
+        with self._lock:
+            scores, bound = self._bm25.pruned_scores(tokens)
+            hits = self._select(scores, limit, after, protocol_id)
+            if bound and (len(hits) < limit or hits[-1][1] < bound):
+                hits = self._select(self._bm25.scores(tokens, prune=False), limit, after, protocol_id)
+        return hits
+
+    def _select(
+        self,
+        scores: Dict[str, float],
+        limit: int,
+        after: Optional[Tuple[float, str]],
+        protocol_id: Optional[str]
+    ) -> List[Tuple[str, float]]:
+        """从游标位置之后取 limit 条, 堆的大小不超过 limit"""
+        items: Iterable[Tuple[str, float]] = scores.items()
+        if protocol_id is not None:
+            items = ((doc_id, score) for doc_id, score in items if self._protocols.get(doc_id) == protocol_id)
+        if after is not None:
+            last_score, last_id = after
+            items = ((doc_id, score) for doc_id, score in items
+                     if score < last_score or (score == last_score and doc_id > last_id))
+        return heapq.nsmallest(limit, items, key=lambda item: (-item[1], item[0]))
+
+    def _add(self, knowledge_id: str, tokens: List[str], protocol_id: Optional[str]):
+        self._bm25.add(knowledge_id, tokens)
+        if self._dense is not None:
+            self._dense.add(knowledge_id, tokens)
+        self._protocols[knowledge_id] = protocol_id
+
+knowledge_index = KnowledgeIndex(dense=settings.KNOWLEDGE_DENSE_INDEX, dense_dim=settings.KNOWLEDGE_DENSE_DIM)
+
+def load_knowledge_index(batch_size: int = 1000) -> int:
+    """从数据库全量构建知识库索引, 返回索引的条目数"""
+    from backend.database.database import SessionLocal
+    from backend.database.base import Knowledge
+
+    db = SessionLocal()
+    try:
+        knowledge_index.clear()
+        query = db.query(Knowledge.knowledge_id, Knowledge.protocol_id, Knowledge.content).yield_per(batch_size)
+        batch = []
+        for row in query:
+            batch.append(tuple(row))
+            if len(batch) >= batch_size:
+                knowledge_index.add_many(batch)
+                batch = []
+        if batch:
+            knowledge_index.add_many(batch)
+        return len(knowledge_index)
+    finally:
+        db.close()
+
+def load_knowledge_entries(knowledge_ids: List[str]) -> int:
+    """从数据库读取指定的知识条目加入索引 (其他 worker 新增的知识), 返回加入的条目数"""
+    from backend.database.database import SessionLocal
+    from backend.database.base import Knowledge
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Knowledge.knowledge_id, Knowledge.protocol_id, Knowledge.content).filter(
+            Knowledge.knowledge_id.in_(knowledge_ids)
+        ).all()
+        knowledge_index.add_many(tuple(row) for row in rows)
+        return len(rows)
+    finally:
+        db.close()
@@ -0,0 +1,233 @@
+import uuid
+from typing import Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from backend import schemas
+from backend.config import settings
+from backend.database.base import Knowledge, Protocol
+from backend.database.database import engine
+from backend.database.types import new_id
+from backend.services.knowledge_index import KnowledgeIndex
+from backend.services.protocol_classifier import add_protocol_names
+
+# 最多返回的错误条数, 避免整份语料格式错误时响应过大
+MAX_REPORTED_ERRORS = 100
+
+# 导入的知识块 ID 由 (protocol_id, source, 内容) 经 uuid5 生成, 同一份语料重复导入时不会产生重复条目
+IMPORT_KEY_NAMESPACE = uuid.UUID("3b8e5d2a-7c41-5f96-a0d3-4e2f1c6b9a87")
+
+# 切分长文档时优先断开的位置, 越靠前越优先
+BREAK_MARKERS = ("\n\n", "\n", "。", "！", "？", ". ", "; ", "；", " ")
+
+def chunk_text(text: str, size: int, overlap: int = 0) -> List[str]:
+    """
+    把长文档切成不超过 size 个字符的块, 尽量在段落、换行或句子结尾处断开,
+    相邻两块重叠 overlap 个字符, 避免一句话被切断后两边都检索不到。
+    """
+    text = text.strip()
+    if len(text) <= size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + size
+        if end < len(text):
+            # 只在后半段里找断点, 保证每块至少有 size / 2 个字符
+            window = text[start + size // 2:end]
+            for marker in BREAK_MARKERS:
+                position = window.rfind(marker)
+                if position >= 0:
+                    end = start + size // 2 + position + len(marker)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+def import_key(protocol_id: Optional[str], source: Optional[str], content: str) -> str:
+    """导入块的确定性 ID, 相同协议、来源和内容的块总是得到同一个 ID"""
+    return str(uuid.uuid5(IMPORT_KEY_NAMESPACE, f"{protocol_id or ''}\n{source or ''}\n{content}"))
+
+class KnowledgeIngester:
+    """
+    知识库批量导入, 供 POST /knowledge/bulk 和 python -m backend.ingest 共用。
+
+    add() 只把文档切块后放进缓冲区, flush() 对整批执行: 一次查询解析协议名称 (缺少的协议一次性创建),
+    一次查询校验 protocol_id, 一次查询跳过已经导入过的块, 一条多行 INSERT 写入其余的块,
+    提交后再把整批加入检索索引, 新条目的 ID 由 take_new_ids() 取出后广播给其他 worker。
+    块的 ID 由 import_key() 生成, 中断后重新导入同一份语料只会补上缺少的块。
+    flush() 会访问数据库, 在接口中需要放到线程池执行。
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        chunk_chars: int,
+        chunk_overlap: int,
+        index: Optional[KnowledgeIndex] = None,
+        create_protocols: bool = True
+    ):
+        self.batch_size = batch_size
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.index = index
+        self.create_protocols = create_protocols
+        # 协议名称 -> protocol_id, 跨批次复用
+        self._protocol_ids: Dict[str, str] = {}
+        self._known_protocol_ids = set()
+        self._pending: List[Dict] = []
+        self.documents = 0
+        self.chunks = 0
+        self.batches = 0
+        self.skipped = 0
+        self.protocols_created = 0
+        self.errors: List[Dict] = []
+        self.error_count = 0
+        # 已加入本进程索引、还没有通知其他 worker 的条目
+        self._new_ids: List[str] = []
+
+    def add(self, record, line: Optional[int] = None) -> bool:
+        """
+        加入一篇文档 (dict 或 KnowledgeImport), 格式错误时记录错误并跳过。
+        缓冲区攒够 batch_size 个块时返回 True, 调用方应执行 flush()。
+        """
+        try:
+            document = record if isinstance(record, schemas.KnowledgeImport) else schemas.KnowledgeImport.model_validate(record)
+        except ValidationError as e:
+            error = e.errors()[0]
+            self._error(line, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}")
+            return False
+
+        chunks = chunk_text(document.content, self.chunk_chars, self.chunk_overlap)
+        if not chunks:
+            self._error(line, "content is empty")
+            return False
+        self.documents += 1
+        for chunk in chunks:
+            self._pending.append({
+                "line": line,
+                "content": chunk,
+                "source": document.source,
+                "protocol_id": document.protocol_id,
+                "protocol": document.protocol.strip() if document.protocol else None,
+            })
+        return len(self._pending) >= self.batch_size
+
+    def add_error(self, line: Optional[int], message: str):
+        """记录调用方解析时发现的错误 (例如不是合法的 JSON)"""
+        self._error(line, message)
+
+    def flush(self) -> int:
+        """写入缓冲区中的所有块, 返回写入的块数"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        with engine.begin() as conn:
+            self._resolve_protocols(conn, pending)
+            rows = {}
+            failed_lines = set()
+            for item in pending:
+                if item.get("error"):
+                    # 同一篇文档的多个块只报告一次
+                    if item["line"] is None or item["line"] not in failed_lines:
+                        failed_lines.add(item["line"])
+                        self._error(item["line"], item["error"])
+                    continue
+                knowledge_id = import_key(item["protocol_id"], item["source"], item["content"])
+                if knowledge_id in rows:
+                    self.skipped += 1
+                    continue
+                rows[knowledge_id] = {
+                    "knowledge_id": knowledge_id,
+                    "protocol_id": item["protocol_id"],
+                    "content": item["content"],
+                    "source": item["source"],
+                }
+            if rows:
+                # 之前已经导入过的块不再写入
+                for (knowledge_id,) in conn.execute(
+                    select(Knowledge.knowledge_id).where(Knowledge.knowledge_id.in_(list(rows)))
+                ):
+                    del rows[knowledge_id]
+                    self.skipped += 1
+            rows = list(rows.values())
+            if rows:
+                conn.execute(Knowledge.__table__.insert(), rows)
+
+        if self.index is not None and rows:
+            self.index.add_many((row["knowledge_id"], row["protocol_id"], row["content"]) for row in rows)
+            self._new_ids.extend(row["knowledge_id"] for row in rows)
+        self.chunks += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def take_new_ids(self) -> List[str]:
+        """取出上次调用之后加入索引的 knowledge_id, 用于通知其他 worker"""
+        new_ids, self._new_ids = self._new_ids, []
+        return new_ids
+
+    def finish(self) -> schemas.KnowledgeImportResult:
+        """写入剩余的块并返回导入结果"""
+        self.flush()
+        return schemas.KnowledgeImportResult(
+            documents=self.documents,
+            chunks=self.chunks,
+            batches=self.batches,
+            skipped=self.skipped,
+            protocols_created=self.protocols_created,
+            error_count=self.error_count,
+            errors=self.errors,
+        )
+
+    def _resolve_protocols(self, conn, pending: List[Dict]):
+        """每批一次查询: 协议名称换成 protocol_id, 并校验直接给出的 protocol_id 是否存在"""
+        names = {item["protocol"] for item in pending if item["protocol"]} - set(self._protocol_ids)
+        if names:
+            for protocol_id, name in conn.execute(
+                select(Protocol.protocol_id, Protocol.name).where(Protocol.name.in_(names))
+            ):
+                self._protocol_ids.setdefault(name, protocol_id)
+            missing = sorted(names - set(self._protocol_ids))
+            if missing and self.create_protocols:
+                created = [{"protocol_id": new_id(), "name": name} for name in missing]
+                conn.execute(Protocol.__table__.insert(), created)
+                self._protocol_ids.update((row["name"], row["protocol_id"]) for row in created)
+                self.protocols_created += len(created)
+                add_protocol_names(missing)
+
+        ids = {item["protocol_id"] for item in pending if item["protocol_id"]} - self._known_protocol_ids
+        if ids:
+            self._known_protocol_ids.update(
+                protocol_id for (protocol_id,) in conn.execute(
+                    select(Protocol.protocol_id).where(Protocol.protocol_id.in_(ids))
+                )
+            )
+
+        for item in pending:
+            if item["protocol"]:
+                item["protocol_id"] = self._protocol_ids.get(item["protocol"])
+                if item["protocol_id"] is None:
+                    item["error"] = f"Protocol {item['protocol']!r} not found"
+            elif item["protocol_id"] and item["protocol_id"] not in self._known_protocol_ids:
+                item["error"] = f"Protocol with id {item['protocol_id']} not found"
+
+    def _error(self, line: Optional[int], message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+def create_ingester(index: Optional[KnowledgeIndex] = None, create_protocols: bool = True, batch_size: Optional[int] = None) -> KnowledgeIngester:
+    return KnowledgeIngester(
+        batch_size=batch_size or settings.KNOWLEDGE_INGEST_BATCH_SIZE,
+        chunk_chars=settings.KNOWLEDGE_CHUNK_CHARS,
+        chunk_overlap=settings.KNOWLEDGE_CHUNK_OVERLAP,
+        index=index,
+        create_protocols=create_protocols,
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import logging
+from typing import List, Set
+
+from backend.database.types import new_id
+from backend.services.broker import BroadcastBackend, broadcast_backend
+from backend.services.knowledge_index import load_knowledge_entries, load_knowledge_index
+
+logger = logging.getLogger(__name__)
+
+# 知识库索引更新的广播频道
+INDEX_CHANNEL = "knowledge:index"
+
+class KnowledgeIndexSync:
+    """
+    多 worker 部署时同步各进程内的知识库索引。
+
+    新增知识的 worker 先更新自己的索引, 再通过 BroadcastBackend 发布新条目的 knowledge_id,
+    其他 worker 收到后从数据库读取这些条目加入索引; reload 消息 (命令行批量导入) 让每个 worker 全量重建。
+    自己发布的消息会被忽略。
+    """
+
+    def __init__(self, backend: BroadcastBackend):
+        self.backend = backend
+        self.origin = new_id()
+        self._subscribed = False
+        self._tasks: Set[asyncio.Task] = set()
+        self.received = 0
+
+    async def start(self):
+        """连接广播后端并订阅索引频道 (服务启动时调用)"""
+        if not self._subscribed:
+            await self.backend.connect()
+            await self.backend.subscribe(INDEX_CHANNEL, self.receive)
+            self._subscribed = True
+
+    async def publish(self, knowledge_ids: List[str]):
+        """通知其他 worker 把这些条目加入索引"""
+        if knowledge_ids:
+            await self._publish({"origin": self.origin, "ids": list(knowledge_ids)})
+
+    async def publish_reload(self):
+        """通知所有 worker 从数据库重建索引"""
+        await self._publish({"origin": self.origin, "reload": True})
+
+    async def _publish(self, payload: dict):
+        await self.backend.connect()
+        await self.backend.publish(INDEX_CHANNEL, json.dumps(payload))
+
+    def receive(self, message: str):
+        """广播 handler 不能阻塞, 读库在线程中执行"""
+        payload = json.loads(message)
+        if payload.get("origin") == self.origin:
+            return
+        self.received += 1
+        if payload.get("reload"):
+            task = asyncio.get_running_loop().create_task(asyncio.to_thread(load_knowledge_index))
+        else:
+            task = asyncio.get_running_loop().create_task(asyncio.to_thread(load_knowledge_entries, payload["ids"]))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"同步知识库索引失败: {task.exception()}")
+
+    async def wait_idle(self):
+        """等待正在进行的索引更新完成"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def close(self):
+        await self.wait_idle()
+        if self._subscribed:
+            self._subscribed = False
+            await self.backend.disconnect()
+
+knowledge_sync = KnowledgeIndexSync(broadcast_backend)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class LLMClient:
+    """
+    进程级共享的异步 LLM 客户端。
+
+    在应用启动时创建, 关闭时释放。所有请求共用同一个 httpx 连接池
+    (HTTP/2 keep-alive), 并通过信号量限制同时进行的补全请求数量。
+    """
+
+    def __init__(self):
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    def start(self):
+        if self._client is not None:
+            return
+
+        http2 = settings.LLM_HTTP2 and _http2_available()
+        if settings.LLM_HTTP2 and not http2:
+            logger.warning("h2 未安装, LLM 客户端退回到 HTTP/1.1")
+
+        self._http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+        )
+        self._client = AsyncOpenAI(
+            api_key=settings.KIMI_API_KEY,
+            base_url=settings.KIMI_BASE_URL,
+            http_client=self._http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+        self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        logger.info(
+            f"LLM 客户端已启动: http2={http2}, "
+            f"max_concurrency={settings.LLM_MAX_CONCURRENCY}, "
+            f"max_connections={settings.LLM_MAX_CONNECTIONS}"
+        )
+
+    async def close(self):
+        client, http_client = self._client, self._http_client
+        self._client = None
+        self._http_client = None
+        self._semaphore = None
+        if client is not None:
+            await client.close()
+        if http_client is not None and not http_client.is_closed:
+            await http_client.aclose()
+
+    async def complete(self, messages: List[Dict], timeout: Optional[float] = None, **kwargs) -> str:
+        """返回一次完整补全的文本"""
+        self.start()
+        async with self._semaphore:
+            completion = await self._client.chat.completions.create(
+                model=settings.KIMI_MODEL,
+                messages=messages,
+                timeout=timeout or settings.LLM_TIMEOUT,
+                **kwargs,
+            )
+        return completion.choices[0].message.content
+
+    async def stream(self, messages: List[Dict], timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """逐个产生模型返回的增量文本; 提前退出时会关闭上游连接"""
+        self.start()
+        async with self._semaphore:
+            stream = await self._client.chat.completions.create(
+                model=settings.KIMI_MODEL,
+                messages=messages,
+                timeout=timeout or settings.LLM_TIMEOUT,
+                stream=True,
+                **kwargs,
+            )
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                await stream.response.aclose()
+
+llm_client = LLMClient()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import bcrypt
+from fastapi import HTTPException
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 以下两个函数在工作进程中执行, 必须是模块级函数才能被 pickle
+def _hash_password(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+class PasswordHasher:
+    """
+    在独立的、大小固定的进程池中执行 bcrypt 哈希和校验。
+
+    bcrypt 是纯 CPU 计算, 放在进程池里既不会阻塞事件循环, 也不会占用
+    处理其他同步接口的线程池。排队数超过上限时直接返回 503, 避免登录
+    高峰时请求无限堆积。
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"密码哈希进程池已启动: workers={self.workers}, rounds={self.rounds}")
+
+    def shutdown(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run(_hash_password, password.encode('utf-8'), self.rounds)
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_check_password, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "max_ms": round(self.max_seconds * 1000, 3),
+            }
+
+    async def _run(self, func, *args):
+        self.start()
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Too many concurrent password operations, please retry")
+            self.in_flight += 1
+
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+password_hasher = PasswordHasher(
+    workers=settings.BCRYPT_WORKERS,
+    max_queue=settings.BCRYPT_MAX_QUEUE,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from backend.config import settings
+
+@dataclass(frozen=True)
+class Principal:
+    """通过认证的用户, 只保留鉴权需要的字段"""
+    user_id: str
+    username: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user_id=user.user_id, username=user.username, email=user.email)
+
+class PrincipalCache:
+    """按 token 的 sub (user_id) 缓存已验证的用户, 容量有上限 (LRU), 条目短时间过期"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal: Principal):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[principal.user_id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """修改或删除用户 (改名、改邮箱、改密码、注销) 的接口必须在提交后调用"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache(max_size=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
@@ -0,0 +1,134 @@
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 问题分类使用的内置协议关键词列表, 启动后再合并 protocols 表中的协议名称
+PROTOCOL_KEYWORDS = [
+    'OSPF', 'BGP', 'RIP', 'EIGRP', 'VLAN', 'STP', 'RSTP', 'MSTP',
+    'ACL', 'NAT', 'VPN', 'QoS', 'MPLS', 'VRRP', 'HSRP', 'GLBP',
+    'DHCP', 'DNS', 'HTTP', 'HTTPS', 'FTP', 'SMTP', 'SNMP', 'SSH',
+    'TCP', 'UDP', 'ICMP', 'ARP', 'RARP', 'IGMP', 'PIM', 'OSPFV3',
+    'IPV4', 'IPV6', 'RIPNG', 'BGP4+', 'IS-IS', 'LDP', 'RSVP'
+]
+
+# 未匹配到任何协议的问题分类
+OTHER_CATEGORY = '其他'
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").upper()
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+class ProtocolMatcher:
+    """
+    Aho–Corasick 多模式匹配器。
+
+    一次线性扫描找出文本中所有协议名称, 匹配不区分大小写。
+    以字母或数字开头/结尾的名称要求两侧不是 ASCII 字母数字, 所以 OSPFV3
+    不会命中 OSPF, RSTP 不会命中 STP; 重叠的命中取最左最长的一个。
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, str]]] = [[]]
+        self.names: Dict[str, str] = {}
+
+        for name in names:
+            pattern = _normalize(name).strip()
+            if pattern and pattern not in self.names:
+                self.names[pattern] = name
+                self._insert(pattern, name)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, name: str):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append((len(pattern), name))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # 合并后缀节点的输出, 扫描时不需要再沿失败链回溯
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回不重叠的 (start, end, name), 按出现顺序排列"""
+        text = _normalize(text)
+        matches = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, name in self._outputs[node]:
+                start = end - length
+                if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                matches.append((start, end, name))
+
+        # 最左最长: 按起点排序, 同一起点优先更长的名称, 跳过与已选重叠的命中
+        selected = []
+        last_end = 0
+        for start, end, name in sorted(matches, key=lambda match: (match[0], match[0] - match[1])):
+            if start >= last_end:
+                selected.append((start, end, name))
+                last_end = end
+        return selected
+
+    def classify(self, text: Optional[str]) -> str:
+        matches = self.find_all(text or "")
+        return matches[0][2] if matches else OTHER_CATEGORY
+
+_lock = threading.Lock()
+_extra_names: List[str] = []
+_matcher = ProtocolMatcher(PROTOCOL_KEYWORDS)
+
+def get_matcher() -> ProtocolMatcher:
+    return _matcher
+
+def add_protocol_names(names: Iterable[str]):
+    """把新的协议名称加入分类器; 重新编译后整体替换, 不影响正在进行的匹配"""
+    global _matcher
+    with _lock:
+        known = set(_matcher.names)
+        new_names = [name for name in names if name and _normalize(name).strip() not in known]
+        if not new_names:
+            return
+        _extra_names.extend(new_names)
+        _matcher = ProtocolMatcher(PROTOCOL_KEYWORDS + _extra_names)
+
+def load_protocol_names() -> int:
+    """从 protocols 表加载协议名称, 返回分类器中的名称数量"""
+    from backend.database.database import SessionLocal
+    from backend.database.base import Protocol
+
+    db = SessionLocal()
+    try:
+        add_protocol_names(name for (name,) in db.query(Protocol.name).all())
+    finally:
+        db.close()
+    return len(_matcher.names)
+
+def classify_question(content: Optional[str]) -> str:
+    """返回问题所属的协议分类（最先出现的协议），在创建问题时计算一次并保存"""
+    return _matcher.classify(content)
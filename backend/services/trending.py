@@ -0,0 +1,387 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, select, update
+
+from backend.config import settings
+from backend.database.base import HotQuestionSnapshot
+from backend.database.database import async_engine
+from backend.services.answer_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# 前向衰减的指数超过该值时整体缩放一次, 避免浮点数溢出
+RESCALE_EXPONENT = 32.0
+# 快照表中超过这么多个半衰期没有更新的问题会被删除 (分数已衰减到原来的 1/1024 以下)
+SNAPSHOT_RETENTION_HALF_LIVES = 10
+
+def question_key_id(key: str) -> str:
+    """热门问题对外使用的短 ID"""
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+class CountMinSketch:
+    """Count-Min sketch: 固定内存的近似计数, 估计值只会偏大不会偏小"""
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0.0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, weight: float) -> float:
+        """增加计数并返回新的估计值"""
+        estimate = math.inf
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += weight
+            estimate = min(estimate, row[index])
+        return estimate
+
+    def scale(self, factor: float):
+        for row in self.rows:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value * factor
+
+def display_text(question: str, max_chars: int) -> str:
+    """对外展示的问题文本: 统一全角/半角, 合并空白, 超过 max_chars 个字符时截断"""
+    text = " ".join(unicodedata.normalize("NFKC", question).split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+def user_digest(user_id: str) -> str:
+    return hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).hexdigest()
+
+class _Candidate:
+    """
+    排行中的一个问题。score 使用前向衰减的单位;
+    pending / pending_users 是上次写入快照之后本进程新增的分数和提问人数。
+    """
+
+    __slots__ = ("score", "text", "question_id", "users", "shared_users", "pending", "pending_users")
+
+    def __init__(self, score: float, text: str, question_id: str):
+        self.score = score
+        self.text = text
+        self.question_id = question_id
+        # 本进程见过的提问者 (哈希), 最多保存 min_users 个, 只用于判断是否达到门槛
+        self.users: Set[str] = set()
+        # 快照中记录的提问人数 (包括其他 worker)
+        self.shared_users = 0
+        self.pending = 0.0
+        self.pending_users = 0
+
+class TrendingQuestions:
+    """
+    带时间衰减的热门问题排行。
+
+    使用前向衰减 (forward decay): 时刻 t 的一次提问记为 2^((t - t0) / half_life),
+    所以已有计数不需要随时间更新, 分数按 2^(-(now - t0) / half_life) 换算成当前值。
+    Count-Min sketch 统计所有问题, 只有分数最高的 capacity 个问题保存原文 (最小堆淘汰)。
+    问题原文会公开展示, 衰减后的次数不少于 min_count 且至少有 min_users 个不同用户问过才会进入排行。
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        half_life: float,
+        width: int,
+        depth: int,
+        click_weight: float,
+        min_count: float = 3,
+        min_users: int = 2,
+        max_chars: int = 80
+    ):
+        self.capacity = capacity
+        self.half_life = half_life
+        self.click_weight = click_weight
+        self.min_count = min_count
+        self.min_users = min_users
+        self.max_chars = max_chars
+        self._sketch = CountMinSketch(width, depth)
+        self._landmark = time.time()
+        self._top: Dict[str, _Candidate] = {}
+        self._ids: Dict[str, str] = {}
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+        self.asks = 0
+        self.clicks = 0
+
+    def record_ask(self, question: str, user_id: Optional[str] = None):
+        """记录一次提问, 按规范化后的问题计数"""
+        key = normalize_question(question)
+        if not key:
+            return
+        with self._lock:
+            self.asks += 1
+            candidate = self._add(key, display_text(question, self.max_chars), 1.0)
+            if candidate is not None and user_id and len(candidate.users) < self.min_users:
+                digest = user_digest(user_id)
+                if digest not in candidate.users:
+                    candidate.users.add(digest)
+                    candidate.pending_users += 1
+
+    def record_click(self, question_id: str) -> bool:
+        """记录热门问题的点击, ID 不在当前排行中时返回 False"""
+        with self._lock:
+            key = self._ids.get(question_id)
+            if key is None:
+                return False
+            self.clicks += 1
+            self._add(key, self._top[key].text, self.click_weight)
+            return True
+
+    def top(self, limit: int) -> List[Dict]:
+        """当前排行前 limit 个达到展示门槛的问题, 只遍历内存中的 capacity 个候选"""
+        with self._lock:
+            decay = self._decay_factor(time.time())
+            eligible = [
+                candidate for candidate in self._top.values()
+                if round(candidate.score * decay, 6) >= self.min_count
+                and len(candidate.users) + candidate.shared_users >= self.min_users
+            ]
+            entries = heapq.nlargest(limit, eligible, key=lambda candidate: candidate.score)
+            return [
+                {"id": candidate.question_id, "question": candidate.text, "count": max(1, round(candidate.score * decay))}
+                for candidate in entries
+            ]
+
+    def take_pending(self) -> List[Dict]:
+        """
+        取出上次快照之后新增的分数 (换算成当前值) 和提问人数, 用于累加到快照表。
+        每个 worker 只写自己的增量, 多个 worker 的计数在数据库中合并。
+        """
+        with self._lock:
+            decay = self._decay_factor(time.time())
+            rows = []
+            for candidate in self._top.values():
+                if candidate.pending > 0 or candidate.pending_users > 0:
+                    rows.append({
+                        "question_id": candidate.question_id,
+                        "question": candidate.text,
+                        "score": candidate.pending * decay,
+                        "users": candidate.pending_users,
+                    })
+                    candidate.pending = 0.0
+                    candidate.pending_users = 0
+            return rows
+
+    def return_pending(self, rows: List[Dict]):
+        """快照写入失败时把取出的增量放回, 下次再写"""
+        with self._lock:
+            decay = self._decay_factor(time.time())
+            for row in rows:
+                key = self._ids.get(row["question_id"])
+                if key is not None:
+                    self._top[key].pending += row["score"] / decay
+                    self._top[key].pending_users += row["users"]
+
+    def restore(self, rows: List[Dict], now: Optional[float] = None):
+        """从快照恢复, rows 中的 score 是 updated_at 时刻的值; 恢复的分数已经在数据库中, 不计入增量"""
+        now = now or time.time()
+        with self._lock:
+            for row in rows:
+                age = max(0.0, now - row["updated_at"])
+                score = row["score"] * 2 ** (-age / self.half_life)
+                key = normalize_question(row["question"])
+                if key and score > 0:
+                    candidate = self._add(key, row["question"], score, pending=False)
+                    if candidate is not None:
+                        candidate.shared_users = max(candidate.shared_users, row.get("users", 0))
+
+    def clear(self):
+        with self._lock:
+            self._sketch = CountMinSketch(self._sketch.width, self._sketch.depth)
+            self._landmark = time.time()
+            self._top.clear()
+            self._ids.clear()
+            self._heap.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "tracked": len(self._top),
+                "capacity": self.capacity,
+                "half_life_hours": round(self.half_life / 3600, 3),
+                "min_count": self.min_count,
+                "min_users": self.min_users,
+                "asks": self.asks,
+                "clicks": self.clicks,
+            }
+
+    def _decay_factor(self, now: float) -> float:
+        return 2 ** (-(now - self._landmark) / self.half_life)
+
+    def _add(self, key: str, text: str, weight: float, pending: bool = True) -> Optional[_Candidate]:
+        """增加计数, 返回问题所在的候选; 分数不够进入候选时返回 None"""
+        now = time.time()
+        exponent = (now - self._landmark) / self.half_life
+        if exponent > RESCALE_EXPONENT:
+            self._rescale(now, 2 ** -exponent)
+            exponent = 0.0
+        weight *= 2 ** exponent
+        score = self._sketch.add(key, weight)
+
+        candidate = self._top.get(key)
+        if candidate is None:
+            if len(self._top) >= self.capacity:
+                min_score, min_key = self._peek_min()
+                if score <= min_score:
+                    return None
+                heapq.heappop(self._heap)
+                del self._ids[self._top.pop(min_key).question_id]
+
+            candidate = _Candidate(score, text, question_key_id(key))
+            self._top[key] = candidate
+            self._ids[candidate.question_id] = key
+        else:
+            candidate.score = score
+            if len(self._heap) > 4 * self.capacity:
+                self._rebuild_heap()
+        heapq.heappush(self._heap, (score, key))
+        if pending:
+            candidate.pending += weight
+        return candidate
+
+    def _peek_min(self) -> tuple:
+        # 堆中可能有分数已更新的过期条目, 跳过它们
+        while True:
+            score, key = self._heap[0]
+            candidate = self._top.get(key)
+            if candidate is not None and candidate.score == score:
+                return score, key
+            heapq.heappop(self._heap)
+
+    def _rebuild_heap(self):
+        self._heap = [(candidate.score, key) for key, candidate in self._top.items()]
+        heapq.heapify(self._heap)
+
+    def _rescale(self, now: float, factor: float):
+        self._sketch.scale(factor)
+        for candidate in self._top.values():
+            candidate.score *= factor
+            candidate.pending *= factor
+        self._rebuild_heap()
+        self._landmark = now
+
+class TrendingSnapshotter:
+    """
+    定期把排行的增量累加到 hot_question_snapshots 表, 重启后从中恢复。
+    每个 worker 只写自己上次快照之后的增量, 按问题逐行合并, 不会覆盖其他 worker 的计数。
+    """
+
+    def __init__(self, trending: TrendingQuestions, interval: float):
+        self.trending = trending
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._stop = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """停止定时任务并写入最后一次快照"""
+        task, self._task = self._task, None
+        if task is not None:
+            self._stop.set()
+            await task
+        await self.save()
+
+    async def load(self) -> int:
+        async with async_engine.connect() as conn:
+            result = await conn.execute(select(HotQuestionSnapshot.__table__))
+            rows = [
+                {
+                    "question": row.question,
+                    "score": row.score,
+                    "users": row.users,
+                    "updated_at": row.updated_at.timestamp(),
+                }
+                for row in result
+            ]
+        self.trending.restore(rows)
+        return len(rows)
+
+    async def save(self):
+        rows = self.trending.take_pending()
+        try:
+            await self._merge(rows)
+        except Exception:
+            self.trending.return_pending(rows)
+            raise
+
+    async def _merge(self, rows: List[Dict]):
+        table = HotQuestionSnapshot.__table__
+        now = datetime.now()
+        async with async_engine.begin() as conn:
+            if rows:
+                # 锁住已有的行 (MySQL SELECT ... FOR UPDATE), 同时写快照的 worker 依次合并
+                result = await conn.execute(
+                    select(table)
+                    .where(table.c.question_id.in_([row["question_id"] for row in rows]))
+                    .with_for_update()
+                )
+                existing = {row.question_id: row for row in result}
+                inserts = []
+                for row in rows:
+                    old = existing.get(row["question_id"])
+                    if old is None:
+                        inserts.append({**row, "updated_at": now})
+                        continue
+                    age = max(0.0, (now - old.updated_at).total_seconds())
+                    await conn.execute(
+                        update(table)
+                        .where(table.c.question_id == row["question_id"])
+                        .values(
+                            question=row["question"],
+                            score=old.score * 2 ** (-age / self.trending.half_life) + row["score"],
+                            users=old.users + row["users"],
+                            updated_at=now,
+                        )
+                    )
+                # 另一个 worker 同时插入了同一个问题时主键冲突, 整批回滚, 增量留到下次写入
+                if inserts:
+                    await conn.execute(table.insert().values(inserts))
+
+            # 很久没有更新的问题分数已衰减到可以忽略, 删除它们避免表无限增长
+            expired = now - timedelta(seconds=SNAPSHOT_RETENTION_HALF_LIVES * self.trending.half_life)
+            await conn.execute(delete(table).where(table.c.updated_at < expired))
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stop.is_set():
+                break
+            try:
+                await self.save()
+            except Exception as e:
+                logger.warning(f"热门问题快照写入失败: {e}")
+
+trending_questions = TrendingQuestions(
+    capacity=settings.TRENDING_CAPACITY,
+    half_life=settings.TRENDING_HALF_LIFE_HOURS * 3600,
+    width=settings.TRENDING_SKETCH_WIDTH,
+    depth=settings.TRENDING_SKETCH_DEPTH,
+    click_weight=settings.TRENDING_CLICK_WEIGHT,
+    min_count=settings.TRENDING_MIN_COUNT,
+    min_users=settings.TRENDING_MIN_USERS,
+    max_chars=settings.TRENDING_MAX_CHARS,
+)
+
+trending_snapshotter = TrendingSnapshotter(trending_questions, interval=settings.TRENDING_SNAPSHOT_INTERVAL)
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from fastapi import WebSocket
+
+from backend.config import settings
+from backend.services.broker import BroadcastBackend, broadcast_backend
+
+logger = logging.getLogger(__name__)
+
+# 发送队列满或发送超时时关闭连接使用的关闭码 (1013: Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# 所有 worker 共用的广播频道
+BROADCAST_CHANNEL = "websocket:broadcast"
+
+class ClientConnection:
+    """一个 WebSocket 连接, 带有容量有限的发送队列和独立的写任务"""
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, queue_size: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    def send(self, message: str) -> bool:
+        """放入发送队列, 不等待发送完成; 队列已满时返回 False"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write_loop(self):
+        # 发送超时由定时器断开连接 (会取消本任务), 不用 asyncio.wait_for:
+        # Python 3.11 及更早版本中发送刚好完成时 wait_for 会吞掉取消, 写任务会一直留在 queue.get() 上
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                message = await self.queue.get()
+                timer = loop.call_later(self.manager.send_timeout, self.manager.evict, self, "send timeout")
+                try:
+                    await self.websocket.send_text(message)
+                finally:
+                    timer.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 对端已断开, 由读循环或这里负责移除连接
+            logger.debug(f"WebSocket 发送失败: {e}")
+            self.manager.disconnect(self.websocket)
+
+class ConnectionManager:
+    """
+    WebSocket 广播中心。
+
+    每个连接有自己的发送队列和写任务, 广播只是把消息放进各个队列, 不等待任何客户端,
+    所以一个慢客户端不会拖慢其他客户端。发送队列满或单次发送超时的慢客户端会被断开。
+    广播经过 BroadcastBackend 发布, 每个 worker 收到后再发给自己的连接, 因此多 worker 部署时
+    所有客户端都能收到。
+    """
+
+    def __init__(self, queue_size: int, send_timeout: float, backend: BroadcastBackend):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.backend = backend
+        self._subscribed = False
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.evicted = 0
+        self.broadcasts = 0
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        connection = ClientConnection(self, websocket, self.queue_size)
+        connection.start()
+        self.active_connections[websocket] = connection
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.active_connections.pop(websocket, None)
+        if connection is not None and connection.writer is not None:
+            if connection.writer is not asyncio.current_task():
+                connection.writer.cancel()
+
+    def evict(self, connection: ClientConnection, reason: str):
+        """断开跟不上的客户端, 关闭握手在后台进行, 不阻塞调用方"""
+        if self.active_connections.get(connection.websocket) is not connection:
+            return
+        self.evicted += 1
+        logger.warning(f"断开慢速 WebSocket 客户端: {reason}")
+        self.disconnect(connection.websocket)
+        asyncio.get_running_loop().create_task(self._close(connection.websocket, SLOW_CONSUMER_CLOSE_CODE))
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        connection = self.active_connections.get(websocket)
+        if connection is not None and not connection.send(message):
+            self.evict(connection, "send queue full")
+
+    async def start(self):
+        """连接广播后端并订阅广播频道 (服务启动时调用)"""
+        if not self._subscribed:
+            await self.backend.connect()
+            await self.backend.subscribe(BROADCAST_CHANNEL, self.deliver)
+            self._subscribed = True
+
+    async def broadcast(self, message: str):
+        """发给所有 worker 上的所有连接"""
+        await self.start()
+        await self.backend.publish(BROADCAST_CHANNEL, message)
+
+    def deliver(self, message: str):
+        """把广播频道收到的消息放入本 worker 每个连接的发送队列"""
+        self.broadcasts += 1
+        for connection in list(self.active_connections.values()):
+            if not connection.send(message):
+                self.evict(connection, "send queue full")
+
+    async def close_all(self):
+        """关闭所有连接 (服务停止时调用)"""
+        websockets = list(self.active_connections)
+        for websocket in websockets:
+            self.disconnect(websocket)
+        await asyncio.gather(*(self._close(websocket, 1001) for websocket in websockets))
+        if self._subscribed:
+            self._subscribed = False
+            await self.backend.disconnect()
+
+    def stats(self) -> Dict:
+        return {
+            "connections": len(self.active_connections),
+            "queued": sum(connection.queue.qsize() for connection in self.active_connections.values()),
+            "queue_size": self.queue_size,
+            "broadcasts": self.broadcasts,
+            "evicted": self.evicted,
+        }
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            pass
+
+manager = ConnectionManager(
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT,
+    backend=broadcast_backend,
+)
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+# 在导入 backend 之前指定测试用的 SQLite 数据库和上传目录, config.py 读取环境变量时就会使用它们
+TEST_DIR = tempfile.mkdtemp(prefix="agentai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+# LLM 请求立即失败, 聊天接口使用模拟回答
+os.environ["KIMI_BASE_URL"] = "http://127.0.0.1:9/v1"
+os.environ["LLM_MAX_RETRIES"] = "0"
+os.environ["LLM_TIMEOUT"] = "2"
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def migrated():
+    """通过迁移在临时数据库中建表和索引"""
+    from backend.database.migrate import upgrade_to_head
+    upgrade_to_head()
+
+@pytest.fixture(scope="session")
+def client(migrated):
+    from backend.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers(client):
+    """注册一个新用户并返回带 token 的请求头和用户 ID"""
+    from backend.database.types import new_id
+    name = f"user-{new_id()[-12:]}"
+    email = f"{name}@example.com"
+    response = client.post("/api/users/", json={"username": name, "email": email, "password": "pw"})
+    assert response.status_code == 200, response.text
+    token = client.post("/api/users/token", json={"email": email, "password": "pw"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}, token["user_id"]
@@ -0,0 +1,35 @@
+import pytest
+
+from backend.config import settings
+from backend.services.answer_cache import AnswerCache
+
+BASE = "在华为交换机上配置BGP邻居时，如何设置路由策略，让本端的路由只向对端通告默认路由，并保持其他邻居关系不变，具体命令是什么"
+
+def make_cache(question: str) -> AnswerCache:
+    cache = AnswerCache(max_size=16, ttl=60, similarity=0.85)
+    cache.put(question, "cached answer", 0.9)
+    return cache
+
+def test_default_is_exact_match_only():
+    assert settings.ANSWER_CACHE_SIMILARITY == 0.0
+
+def test_exact_match_ignores_punctuation_and_width():
+    cache = make_cache("如何配置 OSPF 区域？")
+    assert cache.get("如何配置ＯＳＰＦ区域") is not None
+
+def test_near_duplicate_with_same_key_tokens_hits():
+    cache = make_cache(BASE)
+    assert cache.get("请问" + BASE) is not None
+    assert cache.near_hits == 1
+
+@pytest.mark.parametrize("cached, asked", [
+    (BASE, BASE.replace("只向对端通告", "禁止向对端通告")),
+    ("在交换机上把接口GE0/0/1加入VLAN 10并配置为access模式后，主机之间无法互通，需要检查哪些配置项和命令",
+     "在交换机上把接口GE0/0/1加入VLAN 30并配置为access模式后，主机之间无法互通，需要检查哪些配置项和命令"),
+    ("在核心路由器上配置静态路由，把目的网段10.1.0.0/16的流量转发到下一跳防火墙，应该使用什么命令完成配置",
+     "在核心路由器上配置静态路由，把目的网段10.2.0.0/16的流量转发到下一跳防火墙，应该使用什么命令完成配置"),
+])
+def test_near_duplicate_with_different_key_token_misses(cached, asked):
+    cache = make_cache(cached)
+    assert cache.get(asked) is None
+    assert cache.near_hits == 0
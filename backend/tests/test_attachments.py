@@ -0,0 +1,90 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.database.routers import attachments
+
+CONTENT = bytes(range(256)) * 4
+
+@pytest.fixture
+def upload_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachments, "UPLOAD_ROOT", tmp_path.resolve())
+    app = FastAPI()
+    app.include_router(attachments.router)
+    return TestClient(app), tmp_path
+
+def store(root, content: bytes, suffix: str) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    path = root / digest[:2] / f"{digest}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return f"/static/uploads/{digest[:2]}/{digest}{suffix}"
+
+def test_full_file_is_cached_as_immutable(upload_client):
+    client, root = upload_client
+    url = store(root, CONTENT, ".log")
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_range_returns_partial_content(upload_client, range_header, start, end):
+    client, root = upload_client
+    response = client.get(store(root, CONTENT, ".pcap"), headers={"Range": range_header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+def test_unsatisfiable_range_returns_416(upload_client):
+    client, root = upload_client
+    response = client.get(store(root, CONTENT, ".pcap"), headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_stale_if_range_ignores_range(upload_client):
+    client, root = upload_client
+    response = client.get(store(root, CONTENT, ".pcap"), headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_matching_etag_returns_304(upload_client):
+    client, root = upload_client
+    url = store(root, CONTENT, ".png")
+    etag = client.get(url).headers["etag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_hidden_and_traversal_paths_are_not_served(upload_client):
+    client, root = upload_client
+    (root / ".tmp").mkdir()
+    (root / ".tmp" / "x.part").write_bytes(b"partial")
+    assert client.get("/static/uploads/.tmp/x.part").status_code == 404
+    assert client.get("/static/uploads/%2e%2e/secret.txt").status_code == 404
+
+def test_allowed_types_are_served_inline_with_nosniff(upload_client):
+    client, root = upload_client
+    response = client.get(store(root, b"\x89PNG fake", ".png"))
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "content-disposition" not in response.headers
+
+@pytest.mark.parametrize("suffix", [".html", ".svg", ".js", ""])
+def test_other_types_are_downloaded(upload_client, suffix):
+    client, root = upload_client
+    response = client.get(store(root, b"<script>alert(1)</script>" + suffix.encode(), suffix))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"] == "attachment"
+    assert response.headers["x-content-type-options"] == "nosniff"
@@ -0,0 +1,111 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from backend.services.broker import (BroadcastBackend, MemoryBroadcastBackend, SQLiteBroadcastBackend,
+                                     create_broadcast_backend)
+from backend.services.websocket_hub import ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out waiting for broadcast")
+        await asyncio.sleep(0.01)
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        BroadcastBackend()
+
+def test_create_backend_from_url(tmp_path):
+    assert isinstance(create_broadcast_backend("memory://"), MemoryBroadcastBackend)
+    backend = create_broadcast_backend(f"sqlite:///{tmp_path}/broadcast.db")
+    assert isinstance(backend, SQLiteBroadcastBackend)
+    assert backend.path == f"{tmp_path}/broadcast.db"
+
+def test_sqlite_backends_receive_each_others_messages(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+
+    async def run():
+        first = SQLiteBroadcastBackend(path, poll_interval=0.01)
+        second = SQLiteBroadcastBackend(path, poll_interval=0.01)
+        received = {"first": [], "second": []}
+        for name, backend in (("first", first), ("second", second)):
+            await backend.connect()
+            await backend.subscribe("chat", received[name].append)
+        await second.subscribe("other", received["second"].append)
+        try:
+            await first.publish("chat", "from first")
+            await second.publish("chat", "from second")
+            await wait_for(lambda: all(len(messages) == 2 for messages in received.values()))
+            assert received["first"] == received["second"] == ["from first", "from second"]
+        finally:
+            await first.disconnect()
+            await second.disconnect()
+
+    asyncio.run(run())
+
+def test_sqlite_backend_receives_from_another_process(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    publisher = (
+        "import asyncio\n"
+        "from backend.services.broker import SQLiteBroadcastBackend\n"
+        "async def main():\n"
+        f"    backend = SQLiteBroadcastBackend({path!r})\n"
+        "    await backend.connect()\n"
+        "    await backend.publish('chat', 'from another process')\n"
+        "    await backend.disconnect()\n"
+        "asyncio.run(main())\n"
+    )
+
+    async def run():
+        backend = SQLiteBroadcastBackend(path, poll_interval=0.01)
+        received = []
+        await backend.connect()
+        await backend.subscribe("chat", received.append)
+        try:
+            process = await asyncio.create_subprocess_exec(sys.executable, "-c", publisher)
+            assert await process.wait() == 0
+            await wait_for(lambda: received)
+            assert received == ["from another process"]
+        finally:
+            await backend.disconnect()
+
+    asyncio.run(run())
+
+def test_websocket_broadcast_reaches_clients_on_another_worker(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+
+    async def run():
+        workers = [
+            ConnectionManager(queue_size=8, send_timeout=1, backend=SQLiteBroadcastBackend(path, poll_interval=0.01))
+            for _ in range(2)
+        ]
+        clients = [FakeWebSocket(), FakeWebSocket()]
+        for worker, websocket in zip(workers, clients):
+            await worker.start()
+            await worker.connect(websocket)
+        try:
+            await workers[0].broadcast("hello")
+            await wait_for(lambda: all(websocket.sent for websocket in clients))
+            assert [websocket.sent for websocket in clients] == [["hello"], ["hello"]]
+        finally:
+            for worker in workers:
+                await worker.close_all()
+
+    asyncio.run(run())
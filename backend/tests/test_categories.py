@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from backend.backfill_categories import backfill
+from backend.database.base import Question
+from backend.database.database import engine
+from backend.database.types import new_id
+from backend.services.protocol_classifier import OTHER_CATEGORY
+
+def insert_questions(user_id: str, contents, category=None):
+    ids = [new_id() for _ in contents]
+    with engine.begin() as conn:
+        conn.execute(Question.__table__.insert(), [
+            {"question_id": question_id, "user_id": user_id, "content": content, "category": category}
+            for question_id, content in zip(ids, contents)
+        ])
+    return ids
+
+def category_counts(client):
+    body = client.get("/api/questions/categories").json()
+    assert body["success"]
+    assert body["total_questions"] == sum(item["count"] for item in body["categories"])
+    return {item["category"]: item["count"] for item in body["categories"]}
+
+def test_created_questions_are_counted_by_stored_category(client, auth_headers):
+    headers, _ = auth_headers
+    before = category_counts(client)
+    for content in ("VRRP 主备切换", "vrrp 抢占延时", "路由器重启后怎么办"):
+        assert client.post("/api/chat", json={"content": content}, headers=headers).status_code == 200
+    after = category_counts(client)
+    assert after["VRRP"] - before.get("VRRP", 0) == 2
+    assert after[OTHER_CATEGORY] - before.get(OTHER_CATEGORY, 0) == 1
+
+def test_questions_without_a_category_count_as_other_until_backfilled(client, auth_headers):
+    _, user_id = auth_headers
+    before = category_counts(client)
+    ids = insert_questions(user_id, ["GLBP 负载均衡", "GLBP 虚拟网关"])
+    middle = category_counts(client)
+    assert middle[OTHER_CATEGORY] - before.get(OTHER_CATEGORY, 0) == 2
+
+    assert backfill(batch_size=1) >= 2
+    with engine.connect() as conn:
+        stored = conn.execute(select(Question.category).where(Question.question_id.in_(ids))).scalars().all()
+    assert stored == ["GLBP", "GLBP"]
+    after = category_counts(client)
+    assert after[OTHER_CATEGORY] == before.get(OTHER_CATEGORY, 0)
+    assert after["GLBP"] - before.get("GLBP", 0) == 2
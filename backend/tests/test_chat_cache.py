@@ -0,0 +1,55 @@
+import pytest
+
+from backend.database.routers import chat
+from backend.services.answer_cache import AnswerCache
+
+@pytest.fixture
+def llm(monkeypatch):
+    """模拟 LLM 和知识库检索, 记录每次调用的问题"""
+    calls = {"complete": [], "retrieve": []}
+
+    async def complete(messages, **kwargs):
+        calls["complete"].append(messages[-1]["content"])
+        return f"answer {len(calls['complete'])}"
+
+    async def retrieve_references(content):
+        calls["retrieve"].append(content)
+        return [{"knowledge_id": "k1", "content": "OSPF 区域", "source": None}]
+
+    monkeypatch.setattr(chat.llm_client, "complete", complete)
+    monkeypatch.setattr(chat, "retrieve_references", retrieve_references)
+    monkeypatch.setattr(chat, "answer_cache", AnswerCache(max_size=16, ttl=60))
+    return calls
+
+def test_cached_answer_skips_retrieval(client, auth_headers, llm):
+    headers, _ = auth_headers
+    first = client.post("/api/chat", json={"content": "如何配置 OSPF 区域"}, headers=headers).json()
+    second = client.post("/api/chat", json={"content": "如何配置OSPF区域？"}, headers=headers).json()
+    assert second["content"] == first["content"] == "answer 1"
+    assert second["knowledge_ids"] == first["knowledge_ids"] == ["k1"]
+    assert llm["retrieve"] == llm["complete"] == ["如何配置 OSPF 区域"]
+
+def test_questions_with_attachments_bypass_the_cache(client, auth_headers, llm):
+    headers, _ = auth_headers
+    client.post("/api/chat", json={"content": "这个报文有什么问题"}, headers=headers)
+    response = client.post(
+        "/api/chat",
+        data={"content": "这个报文有什么问题"},
+        files={"files": ("capture.pcap", b"\xd4\xc3\xb2\xa1 packet", "application/octet-stream")},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["content"] == "answer 2"
+    assert response.json()["file_name"] == "capture.pcap"
+    assert len(llm["retrieve"]) == len(llm["complete"]) == 2
+    # 带附件的回答不会写入缓存
+    assert chat.answer_cache.get("这个报文有什么问题")["steps"] == "answer 1"
+
+def test_streamed_answer_uses_the_cache(client, auth_headers, llm):
+    headers, _ = auth_headers
+    client.post("/api/chat", json={"content": "BGP 邻居状态 Idle"}, headers=headers)
+    response = client.post("/api/chat/stream", json={"content": "BGP 邻居状态 Idle"}, headers=headers)
+    assert response.status_code == 200
+    assert "answer 1" in response.text
+    assert '"knowledge_ids": ["k1"]' in response.text
+    assert len(llm["retrieve"]) == len(llm["complete"]) == 1
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from backend.database.database import async_engine
+from backend.database.routers import chat
+
+@pytest.fixture
+def ask(client, monkeypatch):
+    async def complete(messages, **kwargs):
+        return "answer"
+
+    monkeypatch.setattr(chat.llm_client, "complete", complete)
+
+    def ask(headers, count: int):
+        for i in range(count):
+            response = client.post("/api/chat", json={"content": f"OSPF 问题 {i}"}, headers=headers)
+            assert response.status_code == 200, response.text
+    return ask
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def read_conversations(client, headers, user_id, **params):
+    with count_queries() as statements:
+        response = client.get(f"/api/users/{user_id}/conversations", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json(), len(statements)
+
+def test_query_count_does_not_grow_with_the_page(client, auth_headers, ask):
+    headers, user_id = auth_headers
+    ask(headers, 2)
+    small, small_queries = read_conversations(client, headers, user_id)
+    ask(headers, 6)
+    large, large_queries = read_conversations(client, headers, user_id)
+    assert len(small["items"]) == 2 and len(large["items"]) == 8
+    assert large_queries == small_queries
+    assert large["items"][0]["steps"] == "answer"
+    assert large["items"][0]["rating"] is None
+
+def test_selected_fields_skip_the_solution_query(client, auth_headers, ask):
+    headers, user_id = auth_headers
+    ask(headers, 3)
+    page, queries = read_conversations(client, headers, user_id, fields="content")
+    _, all_field_queries = read_conversations(client, headers, user_id)
+    assert set(page["items"][0]) == {"question_id", "ask_time", "content"}
+    assert queries < all_field_queries
+
+def test_cursor_pages_through_conversations(client, auth_headers, ask):
+    headers, user_id = auth_headers
+    ask(headers, 5)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "fields": "content"}
+        if cursor:
+            params["cursor"] = cursor
+        page, _ = read_conversations(client, headers, user_id, **params)
+        seen.extend(item["question_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+def test_other_users_conversations_are_forbidden(client, auth_headers):
+    headers, _ = auth_headers
+    assert client.get("/api/users/someone-else/conversations", headers=headers).status_code == 403
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from backend.database.base import HotQuestionClick
+from backend.database.database import engine
+from backend.services.event_queue import EventQueue
+
+CLICKS = HotQuestionClick.__table__
+
+@pytest.fixture
+def clicks(migrated):
+    with engine.begin() as conn:
+        conn.execute(delete(CLICKS))
+    yield
+    with engine.begin() as conn:
+        conn.execute(delete(CLICKS))
+
+def click_count() -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(CLICKS)).scalar()
+
+def click(question_id="q1"):
+    return {"question_id": question_id, "clicked_at": datetime.now()}
+
+def make_queue(**kwargs) -> EventQueue:
+    options = {"batch_size": 3, "flush_interval": 60, "max_pending": 100, "durability": "async"}
+    options.update(kwargs)
+    return EventQueue(**options)
+
+def test_events_are_written_in_batches(clicks):
+    queue = make_queue()
+    flushed = []
+    queue.on_flush(CLICKS, lambda: flushed.append(click_count()))
+
+    async def run():
+        for i in range(7):
+            queue.enqueue(CLICKS, click(f"q{i}"))
+        assert click_count() == 0
+        await queue.close()
+
+    asyncio.run(run())
+    assert click_count() == 7
+    assert queue.batches == 3
+    assert queue.stats()["pending"] == 0
+    # 回调在整张表写完之后调用一次
+    assert flushed == [7]
+
+def test_full_batch_wakes_the_writer(clicks):
+    queue = make_queue()
+
+    async def run():
+        for i in range(3):
+            queue.enqueue(CLICKS, click())
+        for _ in range(200):
+            if queue.written:
+                break
+            await asyncio.sleep(0.01)
+        assert queue.written == 3
+        await queue.close()
+
+    asyncio.run(run())
+
+def test_sync_mode_waits_for_the_commit(clicks):
+    queue = make_queue(durability="sync", flush_interval=0.01)
+
+    async def run():
+        await queue.enqueue(CLICKS, click())
+        assert click_count() == 1
+        await queue.close()
+
+    asyncio.run(run())
+
+def test_bad_row_is_dropped_without_losing_the_batch(clicks):
+    queue = make_queue(durability="sync")
+
+    async def run():
+        good = queue.enqueue(CLICKS, click("good"))
+        bad = queue.enqueue(CLICKS, {"question_id": None, "clicked_at": datetime.now()})
+        await queue.flush()
+        await good
+        with pytest.raises(Exception):
+            await bad
+        await queue.close()
+
+    asyncio.run(run())
+    assert click_count() == 1
+    assert (queue.fallbacks, queue.failed, queue.written) == (1, 1, 1)
+
+def test_full_queue_rejects_with_503(clicks):
+    queue = make_queue(max_pending=2)
+
+    async def run():
+        queue.enqueue(CLICKS, click())
+        queue.enqueue(CLICKS, click())
+        with pytest.raises(HTTPException) as excinfo:
+            queue.enqueue(CLICKS, click())
+        assert excinfo.value.status_code == 503
+        await queue.close()
+
+    asyncio.run(run())
+    assert queue.rejected == 1
+    assert click_count() == 2
@@ -0,0 +1,11 @@
+import pytest
+
+from backend.database.database import engine
+from backend.explain_check import explain, hot_queries
+
+QUERIES = dict(hot_queries())
+
+@pytest.mark.parametrize("name", list(QUERIES))
+def test_hot_query_uses_an_index(migrated, name):
+    with engine.connect() as conn:
+        assert explain(conn, QUERIES[name]) == []
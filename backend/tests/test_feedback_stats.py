@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from backend.database.database import engine
+from backend.database.routers import feedbacks
+from backend.services.event_queue import event_queue
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def solution(client, auth_headers, monkeypatch):
+    """提问一次得到 solution_id; 反馈写入等待所在批次提交 (sync 模式)"""
+    monkeypatch.setattr(event_queue, "durability", "sync")
+    feedbacks.invalidate_feedback_stats()
+    headers, user_id = auth_headers
+    response = client.post("/api/chat", json={"content": "HSRP 优先级配置"}, headers=headers)
+    return user_id, response.json()["solution_id"]
+
+def give_feedback(client, user_id: str, solution_id: str, rating: int) -> str:
+    response = client.post("/api/feedbacks/", json={"user_id": user_id, "solution_id": solution_id, "rating": rating})
+    assert response.status_code == 200, response.text
+    return response.json()["feedback_id"]
+
+def test_stats_are_served_from_cache(client, solution):
+    first = client.get("/api/feedbacks/stats").json()
+    with count_queries() as statements:
+        second = client.get("/api/feedbacks/stats").json()
+    assert second == first
+    assert statements == []
+
+def test_flushed_feedback_invalidates_the_cache(client, solution):
+    user_id, solution_id = solution
+    before = client.get("/api/feedbacks/stats").json()
+    give_feedback(client, user_id, solution_id, 5)
+    after = client.get("/api/feedbacks/stats").json()
+    assert after["total_count"] == before["total_count"] + 1
+    assert after["pending_count"] == before["pending_count"] + 1
+    assert after["rating_distribution"][4]["count"] == before["rating_distribution"][4]["count"] + 1
+
+def test_status_change_invalidates_the_cache(client, solution):
+    user_id, solution_id = solution
+    feedback_id = give_feedback(client, user_id, solution_id, 3)
+    before = client.get("/api/feedbacks/stats").json()
+    response = client.put(f"/api/feedbacks/{feedback_id}/status", json={"status": "已处理"})
+    assert response.status_code == 200
+    assert client.get("/api/feedbacks/stats").json()["pending_count"] == before["pending_count"] - 1
+
+def test_stats_aggregate_in_one_query(client, solution):
+    with count_queries() as statements:
+        client.get("/api/feedbacks/stats")
+    feedback_queries = [statement for statement in statements if "FROM feedbacks" in statement]
+    assert len(feedback_queries) == 1
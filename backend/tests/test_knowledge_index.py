@@ -0,0 +1,67 @@
+from backend.database.routers.knowledge import search_local_index
+from backend.services.knowledge_index import KnowledgeIndex, knowledge_index, tokenize
+
+def build_index(target: KnowledgeIndex):
+    target.clear()
+    target.add("ospf", "OSPF 区域配置说明")
+    # "配置" 出现在超过 20% 的文档中, 是常见词项
+    for i in range(10):
+        target.add(f"common-{i}", f"交换机端口配置步骤 {i}")
+    for i in range(10):
+        target.add(f"other-{i}", f"路由表查看命令 {i}")
+
+def full_ranking(index: KnowledgeIndex, query: str):
+    scores = index._bm25.scores(tokenize(query), prune=False)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+def test_pruned_documents_score_below_the_bound():
+    index = KnowledgeIndex()
+    build_index(index)
+    tokens = tokenize("OSPF 配置")
+    pruned, bound = index._bm25.pruned_scores(tokens)
+    full = index._bm25.scores(tokens, prune=False)
+    assert set(pruned) == {"ospf"}
+    assert pruned["ospf"] == full["ospf"]
+    assert all(score < bound for doc_id, score in full.items() if doc_id not in pruned)
+
+def test_first_page_uses_pruned_candidates_only(monkeypatch):
+    index = KnowledgeIndex()
+    build_index(index)
+    expected = full_ranking(index, "OSPF 配置")[:1]
+    full_scans = []
+    original = index._bm25.scores
+    monkeypatch.setattr(index._bm25, "scores", lambda tokens, prune=True: full_scans.append(prune) or original(tokens, prune))
+    assert index.page("OSPF 配置", 1) == expected
+    assert full_scans == []
+
+def test_pages_match_the_full_ranking():
+    index = KnowledgeIndex()
+    build_index(index)
+    pages, after = [], None
+    while True:
+        page = index.page("OSPF 配置", 3, after=after)
+        if not page:
+            break
+        pages.extend(page)
+        after = (page[-1][1], page[-1][0])
+    assert pages == full_ranking(index, "OSPF 配置")
+
+def test_top_k_search_still_ranks_rare_term_first():
+    index = KnowledgeIndex()
+    build_index(index)
+    assert index.search("OSPF 配置", k=1)[0][0] == "ospf"
+
+def test_paged_search_returns_common_term_matches():
+    build_index(knowledge_index)
+    try:
+        seen, after = [], None
+        while True:
+            page = search_local_index("OSPF 配置", None, after, 4)
+            if not page:
+                break
+            seen.extend(knowledge_id for knowledge_id, _ in page)
+            after = [page[-1][1], page[-1][0]]
+        assert seen[0] == "ospf"
+        assert set(seen) == {"ospf", *(f"common-{i}" for i in range(10))}
+    finally:
+        knowledge_index.clear()
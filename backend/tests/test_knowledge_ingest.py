@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from backend.database.base import Knowledge
+from backend.database.database import engine
+from backend.services.knowledge_index import knowledge_index
+from backend.services.knowledge_ingest import KnowledgeIngester, chunk_text, import_key
+from backend.services.knowledge_sync import knowledge_sync
+
+SOURCE = "test-ingest.ndjson"
+
+@pytest.fixture
+def imported(migrated, monkeypatch):
+    """清理本测试导入的条目, 并屏蔽跨 worker 广播"""
+    async def publish(knowledge_ids):
+        pass
+
+    monkeypatch.setattr(knowledge_sync, "publish", publish)
+    yield
+    with engine.begin() as conn:
+        ids = conn.execute(select(Knowledge.knowledge_id).where(Knowledge.source == SOURCE)).scalars().all()
+        conn.execute(delete(Knowledge).where(Knowledge.source == SOURCE))
+    for knowledge_id in ids:
+        knowledge_index.remove(knowledge_id)
+
+def stored_count() -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Knowledge).where(Knowledge.source == SOURCE)).scalar()
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("  OSPF hello  ", size=100) == ["OSPF hello"]
+    assert chunk_text("   ", size=100) == []
+
+def test_chunks_break_at_paragraphs_and_respect_the_size():
+    paragraphs = [f"第{i}段" + "链路状态通告" * 8 for i in range(6)]
+    chunks = chunk_text("\n\n".join(paragraphs), size=120)
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    # 每块都在段落边界结束, 不会切断段落
+    assert all(chunk.split("\n\n")[-1] in paragraphs for chunk in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+
+def test_falls_back_to_sentence_breaks():
+    text = "。".join("邻居状态机" * 5 for _ in range(10)) + "。"
+    chunks = chunk_text(text, size=60)
+    assert all(len(chunk) <= 60 and chunk.endswith("。") for chunk in chunks)
+
+def test_adjacent_chunks_overlap():
+    text = " ".join(f"w{i:03d}" for i in range(100))
+    chunks = chunk_text(text, size=50, overlap=10)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous[-5:].strip() in current[:15]
+    words = {word for chunk in chunks for word in chunk.split()}
+    assert words == {f"w{i:03d}" for i in range(100)}
+
+def test_text_without_break_markers_is_cut_at_the_size():
+    assert chunk_text("x" * 25, size=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+def test_long_documents_are_chunked_and_batched(imported):
+    ingester = KnowledgeIngester(batch_size=4, chunk_chars=40, chunk_overlap=0)
+    content = "\n".join(f"RIP 路由条目 {i} 的度量值" for i in range(12))
+    # 一篇文档的块数超过 batch_size, 调用方应立即 flush
+    assert ingester.add({"content": content, "source": SOURCE})
+    assert ingester.flush() == len(chunk_text(content, 40)) > 4
+    assert not ingester.add({"content": "RIP 水平分割", "source": SOURCE})
+    result = ingester.finish()
+    assert (result.documents, result.batches) == (2, 2)
+    assert result.chunks == stored_count() == len(chunk_text(content, 40)) + 1
+
+def test_reimporting_the_same_corpus_adds_nothing(client, imported):
+    body = "\n".join(json.dumps({"content": f"EIGRP 可行后继 {i}", "source": SOURCE, "protocol": "EIGRP"}) for i in range(5))
+    first = client.post("/api/knowledge/bulk", content=body).json()
+    assert (first["chunks"], first["skipped"]) == (5, 0)
+
+    # 中断后重新导入: 已有的块被跳过, 只补上新增的一行
+    body += "\n" + json.dumps({"content": "EIGRP 可行后继 5", "source": SOURCE, "protocol": "EIGRP"})
+    second = client.post("/api/knowledge/bulk", content=body).json()
+    assert (second["chunks"], second["skipped"], second["protocols_created"]) == (1, 5, 0)
+    assert stored_count() == 6
+
+def test_duplicate_chunks_in_one_batch_are_written_once(imported):
+    ingester = KnowledgeIngester(batch_size=100, chunk_chars=1000, chunk_overlap=0)
+    for _ in range(3):
+        ingester.add({"content": "HSRP 虚拟网关", "source": SOURCE})
+    result = ingester.finish()
+    assert (result.chunks, result.skipped) == (1, 2)
+    with engine.connect() as conn:
+        stored = conn.execute(select(Knowledge.knowledge_id).where(Knowledge.source == SOURCE)).scalar()
+    assert stored == import_key(None, SOURCE, "HSRP 虚拟网关")
+
+def test_bad_lines_are_reported_and_skipped(client, imported):
+    body = "\n".join([
+        json.dumps({"content": "LACP 聚合", "source": SOURCE}),
+        "{not json",
+        json.dumps({"source": SOURCE}),
+        json.dumps({"content": "   ", "source": SOURCE}),
+        json.dumps({"content": "LLDP 邻居", "source": SOURCE, "protocol_id": "missing-protocol"}),
+    ])
+    result = client.post("/api/knowledge/bulk", params={"create_protocols": False}, content=body).json()
+    assert result["chunks"] == stored_count() == 1
+    assert result["error_count"] == 4
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4, 5]
+    assert result["errors"][0]["error"] == "Invalid JSON"
+    assert result["errors"][3]["error"] == "Protocol with id missing-protocol not found"
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from backend.database.base import Knowledge
+from backend.database.database import engine
+from backend.database.types import new_id
+from backend.services.broker import SQLiteBroadcastBackend
+from backend.services.knowledge_index import knowledge_index
+from backend.services.knowledge_sync import KnowledgeIndexSync, knowledge_sync
+
+def insert_knowledge(content: str) -> str:
+    knowledge_id = new_id()
+    with engine.begin() as conn:
+        conn.execute(Knowledge.__table__.insert(), [{"knowledge_id": knowledge_id, "content": content}])
+    return knowledge_id
+
+def test_knowledge_added_on_one_worker_is_indexed_on_another(migrated, tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    # 另一个 worker 写入了数据库, 本进程的索引里还没有
+    knowledge_id = insert_knowledge("MPLS LDP 会话建立失败的排查步骤")
+
+    async def run():
+        publisher = KnowledgeIndexSync(SQLiteBroadcastBackend(path, poll_interval=0.01))
+        receiver = KnowledgeIndexSync(SQLiteBroadcastBackend(path, poll_interval=0.01))
+        for sync in (publisher, receiver):
+            await sync.start()
+        try:
+            await publisher.publish([knowledge_id])
+            for _ in range(200):
+                if receiver.received:
+                    break
+                await asyncio.sleep(0.01)
+            await receiver.wait_idle()
+            assert receiver.received == 1
+            # 发布者忽略自己的消息
+            assert publisher.received == 0
+        finally:
+            await publisher.close()
+            await receiver.close()
+
+    try:
+        asyncio.run(run())
+        assert knowledge_index.search("MPLS LDP", k=1)[0][0] == knowledge_id
+    finally:
+        knowledge_index.remove(knowledge_id)
+
+def test_reload_rebuilds_the_index(migrated):
+    knowledge_id = insert_knowledge("IS-IS 邻接关系无法建立")
+    sync = KnowledgeIndexSync(backend=None)
+
+    async def run():
+        sync.receive(json.dumps({"origin": "cli", "reload": True}))
+        await sync.wait_idle()
+
+    try:
+        asyncio.run(run())
+        assert knowledge_index.search("IS-IS 邻接", k=1)[0][0] == knowledge_id
+    finally:
+        knowledge_index.clear()
+
+def test_bulk_import_publishes_the_new_ids(client, monkeypatch):
+    published = []
+
+    async def publish(knowledge_ids):
+        published.extend(knowledge_ids)
+
+    monkeypatch.setattr(knowledge_sync, "publish", publish)
+    body = "\n".join(json.dumps({"content": f"VRRP 主备切换 {i}"}) for i in range(3))
+    response = client.post("/api/knowledge/bulk", content=body)
+    assert response.status_code == 200
+    assert len(published) == response.json()["chunks"] == 3
+    try:
+        assert {knowledge_id for knowledge_id, _ in knowledge_index.search("VRRP 主备", k=10)} == set(published)
+    finally:
+        for knowledge_id in published:
+            knowledge_index.remove(knowledge_id)
+
+def test_create_knowledge_publishes_its_id(client, monkeypatch):
+    published = []
+
+    async def publish(knowledge_ids):
+        published.extend(knowledge_ids)
+
+    monkeypatch.setattr(knowledge_sync, "publish", publish)
+    response = client.post("/api/knowledge/", json={"content": "STP 根桥选举"})
+    assert response.status_code == 200
+    knowledge_id = response.json()["knowledge_id"]
+    knowledge_index.remove(knowledge_id)
+    assert published == [knowledge_id]
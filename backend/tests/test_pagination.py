@@ -0,0 +1,55 @@
+import pytest
+
+from backend.database.types import new_id
+
+def register(client, count: int):
+    for _ in range(count):
+        name = f"page-{new_id()[-12:]}"
+        response = client.post("/api/users/", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+        assert response.status_code == 200, response.text
+
+def test_users_are_paged_by_cursor_without_duplicates(client):
+    register(client, 5)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/users/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(user["user_id"] for user in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) >= 5
+    everything = client.get("/api/users/", params={"limit": 500}).json()
+    assert [user["user_id"] for user in everything["items"]] == seen
+
+@pytest.mark.parametrize("path", ["/api/users/", "/api/feedbacks/"])
+def test_bad_cursor_returns_400(client, path):
+    assert client.get(path, params={"cursor": "not-a-cursor"}).status_code == 400
+
+@pytest.mark.parametrize("path", ["/api/users/", "/api/feedbacks/"])
+def test_next_cursor_is_in_the_body(client, path):
+    response = client.get(path, params={"limit": 1})
+    assert response.status_code == 200
+    assert set(response.json()) == {"items", "next_cursor"}
+    assert "x-next-cursor" not in response.headers
+    assert "deprecation" not in response.headers
+
+def test_deprecated_skip_still_works(client):
+    register(client, 3)
+    first_page = client.get("/api/users/", params={"limit": 2}).json()
+    response = client.get("/api/users/", params={"limit": 2, "skip": 1})
+    assert response.status_code == 200
+    assert response.headers["deprecation"] == "true"
+    assert response.json()["items"][0] == first_page["items"][1]
+    assert client.get("/api/feedbacks/", params={"skip": 0}).headers["deprecation"] == "true"
+
+@pytest.mark.parametrize("path", ["/api/users/", "/api/feedbacks/"])
+def test_skip_and_cursor_together_are_rejected(client, path):
+    cursor = client.get("/api/users/", params={"limit": 1}).json()["next_cursor"]
+    response = client.get(path, params={"skip": 1, "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+import asyncio
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+from backend.database.crud import get_password_hash
+from backend.services.password_hasher import PasswordHasher
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=0, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_round_trip(hasher):
+    async def run():
+        hashed = await hasher.hash_password("s3cret")
+        assert bcrypt.checkpw(b"s3cret", hashed.encode())
+        assert await hasher.verify_password("s3cret", hashed)
+        assert not await hasher.verify_password("wrong", hashed)
+        # 旧接口 (同步 bcrypt) 生成的哈希同样可以校验
+        assert await hasher.verify_password("legacy", get_password_hash("legacy"))
+
+    asyncio.run(run())
+    assert hasher.stats()["completed"] == 4
+    assert hasher.stats()["in_flight"] == 0
+
+def test_event_loop_keeps_running_while_hashing():
+    hasher = PasswordHasher(workers=1, max_queue=0, rounds=12)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        task = asyncio.get_running_loop().create_task(ticker())
+        await hasher.hash_password("s3cret")
+        task.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert len(ticks) > 5
+
+def test_requests_beyond_the_queue_limit_are_rejected(hasher):
+    async def run():
+        return await asyncio.gather(
+            hasher.hash_password("first"), hasher.hash_password("second"), return_exceptions=True
+        )
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, str)
+    assert isinstance(second, HTTPException) and second.status_code == 503
+    assert hasher.stats()["rejected"] == 1
@@ -0,0 +1,36 @@
+import pytest
+
+from backend.services.protocol_classifier import (OTHER_CATEGORY, PROTOCOL_KEYWORDS, ProtocolMatcher,
+                                                  add_protocol_names, classify_question)
+
+@pytest.fixture(scope="module")
+def matcher():
+    return ProtocolMatcher(PROTOCOL_KEYWORDS)
+
+@pytest.mark.parametrize("text, expected", [
+    ("OSPFv3 邻居无法建立", "OSPFV3"),
+    ("RSTP 端口角色", "RSTP"),
+    ("STP 根桥选举", "STP"),
+    ("HTTPS 证书错误", "HTTPS"),
+    ("BGP4+ 路由通告", "BGP4+"),
+    ("IS-IS 邻接关系", "IS-IS"),
+    ("RIPng 配置", "RIPNG"),
+])
+def test_longer_overlapping_name_wins(matcher, text, expected):
+    assert matcher.classify(text) == expected
+
+@pytest.mark.parametrize("text", ["MSTPX 是什么", "配置 XOSPF", "查看 vlan100 的状态", "no protocol here"])
+def test_names_inside_longer_words_do_not_match(matcher, text):
+    assert matcher.classify(text) == OTHER_CATEGORY
+
+def test_first_protocol_in_the_text_is_the_category(matcher):
+    assert matcher.classify("通过 BGP 把 OSPF 路由引入") == "BGP"
+    assert [name for _, _, name in matcher.find_all("ospf 和 ＢＧＰ，再加 VLAN")] == ["OSPF", "BGP", "VLAN"]
+
+def test_chinese_text_next_to_names_still_matches(matcher):
+    assert matcher.classify("如何配置OSPF协议") == "OSPF"
+
+def test_added_protocol_names_are_classified():
+    assert classify_question("SRv6 Policy 配置") == OTHER_CATEGORY
+    add_protocol_names(["SRv6"])
+    assert classify_question("srv6 policy 配置") == "SRv6"
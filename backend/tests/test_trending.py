@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import delete, select
+
+from backend.database.base import HotQuestionSnapshot
+from backend.database.database import engine
+from backend.services.trending import TrendingQuestions, TrendingSnapshotter
+
+HOUR = 3600
+
+def make_trending(**kwargs) -> TrendingQuestions:
+    options = {"capacity": 3, "half_life": HOUR, "width": 1024, "depth": 4, "click_weight": 0.5,
+               "min_count": 1, "min_users": 1}
+    options.update(kwargs)
+    return TrendingQuestions(**options)
+
+def ask(trending: TrendingQuestions, question: str, times: int, user_id: str = "u1"):
+    for _ in range(times):
+        trending.record_ask(question, user_id)
+
+def test_top_k_ranks_by_count_and_evicts_the_smallest():
+    trending = make_trending()
+    ask(trending, "OSPF 邻居建立失败", 5)
+    ask(trending, "BGP 路由通告", 3)
+    ask(trending, "VLAN 间通信", 2)
+    ask(trending, "ACL 配置", 4)
+    top = trending.top(3)
+    assert [entry["question"] for entry in top] == ["OSPF 邻居建立失败", "ACL 配置", "BGP 路由通告"]
+    assert [entry["count"] for entry in top] == [5, 4, 3]
+    assert trending.stats()["tracked"] == 3
+
+def test_questions_differing_only_in_punctuation_share_a_count():
+    trending = make_trending()
+    trending.record_ask("如何配置 OSPF？", "u1")
+    trending.record_ask("如何配置OSPF", "u2")
+    assert trending.top(5)[0]["count"] == 2
+
+def test_click_counts_towards_the_ranking():
+    trending = make_trending()
+    ask(trending, "OSPF", 2)
+    ask(trending, "BGP", 2)
+    bgp_id = next(entry["id"] for entry in trending.top(2) if entry["question"] == "BGP")
+    assert trending.record_click(bgp_id)
+    assert trending.top(1)[0]["question"] == "BGP"
+    assert not trending.record_click("unknown")
+
+def test_question_needs_enough_asks_from_enough_users():
+    trending = make_trending(min_count=3, min_users=2)
+    ask(trending, "我的交换机 10.0.0.1 密码是 secret", 5, user_id="alice")
+    assert trending.top(5) == []
+    trending.record_ask("OSPF 区域配置", "alice")
+    trending.record_ask("OSPF 区域配置", "bob")
+    assert trending.top(5) == []
+    trending.record_ask("OSPF 区域配置", "carol")
+    assert [entry["question"] for entry in trending.top(5)] == ["OSPF 区域配置"]
+
+def test_exposed_text_is_normalised_and_truncated():
+    trending = make_trending(max_chars=10)
+    ask(trending, "  ＯＳＰＦ\n  邻居一直停留在 ExStart 状态怎么办  ", 1)
+    text = trending.top(1)[0]["question"]
+    assert text == "OSPF 邻居一直…"
+    assert len(text) == 10
+
+def test_restore_applies_decay_since_the_snapshot():
+    trending = make_trending()
+    now = time.time()
+    trending.restore([
+        {"question": "OSPF", "score": 8.0, "users": 3, "updated_at": now - HOUR},
+        {"question": "BGP", "score": 2.0, "users": 3, "updated_at": now},
+    ], now=now)
+    assert [(entry["question"], entry["count"]) for entry in trending.top(5)] == [("OSPF", 4), ("BGP", 2)]
+    # 恢复的分数已经在数据库中, 不会作为增量再写一次
+    assert trending.take_pending() == []
+
+def test_restored_user_count_satisfies_the_threshold():
+    trending = make_trending(min_count=3, min_users=2)
+    trending.restore([{"question": "OSPF", "score": 4.0, "users": 2, "updated_at": time.time()}])
+    assert [entry["question"] for entry in trending.top(5)] == ["OSPF"]
+
+def snapshot_rows():
+    with engine.connect() as conn:
+        return {row.question: (round(row.score, 3), row.users) for row in conn.execute(select(HotQuestionSnapshot.__table__))}
+
+@pytest.fixture
+def empty_snapshots(migrated):
+    with engine.begin() as conn:
+        conn.execute(delete(HotQuestionSnapshot.__table__))
+    yield
+    with engine.begin() as conn:
+        conn.execute(delete(HotQuestionSnapshot.__table__))
+
+def test_snapshots_from_several_workers_are_merged(empty_snapshots):
+    worker_a, worker_b = make_trending(), make_trending()
+    ask(worker_a, "OSPF", 3, user_id="alice")
+    ask(worker_b, "OSPF", 2, user_id="bob")
+    ask(worker_b, "BGP", 1, user_id="bob")
+
+    asyncio.run(TrendingSnapshotter(worker_a, interval=0).save())
+    asyncio.run(TrendingSnapshotter(worker_b, interval=0).save())
+    # 没有新的提问时再次写入不会重复累加
+    asyncio.run(TrendingSnapshotter(worker_a, interval=0).save())
+    assert snapshot_rows() == {"OSPF": (5.0, 2), "BGP": (1.0, 1)}
+
+    restarted = make_trending(min_users=2)
+    assert asyncio.run(TrendingSnapshotter(restarted, interval=0).load()) == 2
+    assert [(entry["question"], entry["count"]) for entry in restarted.top(5)] == [("OSPF", 5)]
+
+def test_failed_save_keeps_the_increment(empty_snapshots, monkeypatch):
+    trending = make_trending()
+    ask(trending, "OSPF", 2)
+    snapshotter = TrendingSnapshotter(trending, interval=0)
+
+    async def fail(rows):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(snapshotter, "_merge", fail)
+    with pytest.raises(RuntimeError):
+        asyncio.run(snapshotter.save())
+    monkeypatch.undo()
+    asyncio.run(snapshotter.save())
+    assert snapshot_rows() == {"OSPF": (2.0, 1)}
@@ -0,0 +1,59 @@
+import time
+import uuid
+
+from sqlalchemy import Column, MetaData, String, Table, create_engine, literal, select
+
+from backend.config import settings
+from backend.database.types import LEGACY_KEY_NAMESPACE, UUIDKey, key_bytes, key_type, new_id, uuid7
+
+def test_uuid7_layout():
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= value.int >> 80 <= after
+
+def test_new_ids_sort_by_creation_time():
+    ids = []
+    for _ in range(5):
+        ids.append(new_id())
+        time.sleep(0.002)
+    assert ids == sorted(ids)
+    # 字符串顺序和 BINARY(16) 的字节顺序一致, 游标分页在两种列类型下结果相同
+    assert [key_bytes(value) for value in ids] == sorted(key_bytes(value) for value in ids)
+
+def test_key_bytes_accepts_every_form_of_id():
+    value = uuid7()
+    assert key_bytes(value) == key_bytes(str(value)) == key_bytes(value.bytes) == value.bytes
+    # 旧数据中的非 UUID 主键映射到固定的 uuid5
+    assert key_bytes("admin1") == uuid.uuid5(LEGACY_KEY_NAMESPACE, "admin1").bytes
+    assert key_bytes("admin1") == key_bytes("admin1")
+
+def test_uuid_key_round_trip():
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    table = Table("items", metadata, Column("item_id", UUIDKey(), primary_key=True), Column("name", String(20)))
+    metadata.create_all(engine)
+    item_id = new_id()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{"item_id": item_id, "name": "new"}, {"item_id": "p1", "name": "legacy"}])
+        stored = conn.execute(select(table.c.item_id).where(table.c.name == "new")).scalar()
+        raw = conn.exec_driver_sql("SELECT item_id FROM items WHERE name = 'new'").scalar()
+        legacy = conn.execute(select(table.c.name).where(table.c.item_id == "p1")).scalar()
+        # 字面量形式 (EXPLAIN 和 alembic --sql 输出) 渲染成十六进制, 查询结果相同
+        sql = str(select(table.c.name).where(table.c.item_id == literal(item_id, UUIDKey())).compile(
+            engine, compile_kwargs={"literal_binds": True}
+        ))
+        by_literal = conn.exec_driver_sql(sql).scalar()
+    assert stored == item_id
+    assert raw == uuid.UUID(item_id).bytes
+    assert legacy == "legacy"
+    assert f"X'{uuid.UUID(item_id).hex}'" in sql
+    assert by_literal == "new"
+
+def test_key_type_follows_the_setting(monkeypatch):
+    monkeypatch.setattr(settings, "DB_BINARY_KEYS", True)
+    assert isinstance(key_type(), UUIDKey)
+    monkeypatch.setattr(settings, "DB_BINARY_KEYS", False)
+    assert isinstance(key_type(), String)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend.config import settings
+from backend.database.routers.chat import limit_request_body
+
+def make_request(chunks, headers=()):
+    pulled = []
+
+    async def receive():
+        pulled.append(len(pulled))
+        index = len(pulled) - 1
+        return {"type": "http.request", "body": chunks[index], "more_body": index + 1 < len(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/chat",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+    }
+    return Request(scope, receive), pulled
+
+async def read_body(request: Request) -> bytes:
+    return b"".join([chunk async for chunk in request.stream()])
+
+def test_content_length_over_limit_is_rejected_before_reading(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_REQUEST_BYTES", 100)
+    request, pulled = make_request([b"x" * 200], headers=[("content-length", "200")])
+    with pytest.raises(HTTPException) as excinfo:
+        limit_request_body(request)
+    assert excinfo.value.status_code == 413
+    assert pulled == []
+
+def test_streamed_body_stops_at_limit(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_REQUEST_BYTES", 100)
+    request, pulled = make_request([b"x" * 40] * 10)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(read_body(limit_request_body(request)))
+    assert excinfo.value.status_code == 413
+    assert len(pulled) == 3
+
+def test_body_within_limit_is_read(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_REQUEST_BYTES", 100)
+    request, _ = make_request([b"x" * 40, b"y" * 40], headers=[("content-length", "80")])
+    assert asyncio.run(read_body(limit_request_body(request))) == b"x" * 40 + b"y" * 40
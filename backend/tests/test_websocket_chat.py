@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from backend.database.routers import chat
+from backend.services.answer_cache import AnswerCache
+
+@pytest.fixture
+def llm(monkeypatch):
+    """模拟流式 LLM: 每隔 interval 秒产生一段文本, 记录流是否被关闭"""
+    state = {"interval": 0.0, "closed": 0, "finished": 0}
+
+    async def stream(messages, **kwargs):
+        try:
+            for i in range(20):
+                await asyncio.sleep(state["interval"])
+                yield f"part{i} "
+            state["finished"] += 1
+        finally:
+            state["closed"] += 1
+
+    monkeypatch.setattr(chat.llm_client, "stream", stream)
+    monkeypatch.setattr(chat, "answer_cache", AnswerCache(max_size=16, ttl=60))
+    return state
+
+@pytest.fixture
+def token(auth_headers):
+    headers, _ = auth_headers
+    return headers["Authorization"].split()[1]
+
+def receive_until(websocket, frame_type: str):
+    frames = []
+    while True:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame["type"] in (frame_type, "error"):
+            return frames
+
+def test_question_is_answered_with_delta_and_done_frames(client, token, llm):
+    with client.websocket_connect(f"/ws/chat?token={token}") as websocket:
+        websocket.send_json({"type": "question", "id": "q1", "content": "OSPF 邻居状态"})
+        frames = receive_until(websocket, "done")
+    assert {frame["id"] for frame in frames} == {"q1"}
+    assert "".join(frame["data"]["content"] for frame in frames if frame["type"] == "delta").startswith("part0 part1")
+    assert frames[-1]["type"] == "done"
+    assert frames[-1]["data"]["question_id"]
+    assert llm["finished"] == 1
+
+def test_cancel_stops_the_llm_stream(client, token, llm):
+    llm["interval"] = 0.05
+    with client.websocket_connect(f"/ws/chat?token={token}") as websocket:
+        websocket.send_json({"type": "question", "id": "q1", "content": "BGP 会话反复震荡"})
+        assert websocket.receive_json()["type"] == "delta"
+        websocket.send_json({"type": "cancel", "id": "q1"})
+        frames = receive_until(websocket, "cancelled")
+        assert frames[-1] == {"type": "cancelled", "id": "q1"}
+        assert "done" not in [frame["type"] for frame in frames]
+        # 取消之后同一连接仍然可以提问
+        llm["interval"] = 0.0
+        websocket.send_json({"type": "question", "id": "q2", "content": "VLAN 间路由"})
+        assert receive_until(websocket, "done")[-1]["type"] == "done"
+    assert llm["closed"] == 2
+    assert llm["finished"] == 1
+
+@pytest.mark.parametrize("frame, detail", [
+    ({"type": "question", "content": "x"}, "id is required"),
+    ({"type": "question", "id": "q1"}, "content is required"),
+    ({"type": "cancel", "id": "missing"}, "No such question in progress"),
+    ({"type": "ping", "id": "q1"}, "Unknown frame type: ping"),
+])
+def test_bad_frames_get_an_error_frame(client, token, frame, detail):
+    with client.websocket_connect(f"/ws/chat?token={token}") as websocket:
+        websocket.send_json(frame)
+        reply = websocket.receive_json()
+    assert reply["type"] == "error"
+    assert reply["data"]["detail"] == detail
+
+def test_invalid_token_is_rejected(client):
+    with pytest.raises(WebSocketDisconnect) as excinfo:
+        with client.websocket_connect("/ws/chat?token=invalid") as websocket:
+            websocket.receive_json()
+    assert excinfo.value.code == 1008
@@ -0,0 +1,107 @@
+import asyncio
+
+from backend.services.broker import MemoryBroadcastBackend
+from backend.services.websocket_hub import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+def make_manager(queue_size: int = 2, send_timeout: float = 5) -> ConnectionManager:
+    return ConnectionManager(queue_size=queue_size, send_timeout=send_timeout, backend=MemoryBroadcastBackend())
+
+async def settle():
+    """让写任务把已经可以发送的消息发完"""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+def test_slow_client_does_not_delay_the_others():
+    async def run():
+        manager = make_manager(queue_size=8)
+        fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(3):
+            await manager.broadcast(f"m{i}")
+        await settle()
+        assert fast.sent == ["m0", "m1", "m2"]
+        assert slow.sent == []
+        slow.unblocked.set()
+        await settle()
+        assert slow.sent == ["m0", "m1", "m2"]
+        assert manager.stats()["broadcasts"] == 3
+        await manager.close_all()
+
+    asyncio.run(run())
+
+def test_full_send_queue_evicts_the_client():
+    async def run():
+        manager = make_manager(queue_size=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+        await manager.connect(fast)
+        await manager.connect(slow)
+        # 第一条被写任务取走并阻塞, 之后两条填满队列, 第四条放不下
+        for i in range(4):
+            await manager.broadcast(f"m{i}")
+            await settle()
+        assert slow not in manager.active_connections
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert fast in manager.active_connections
+        assert fast.sent == ["m0", "m1", "m2", "m3"]
+        assert manager.stats()["evicted"] == 1
+        await manager.close_all()
+
+    asyncio.run(run())
+
+def test_send_timeout_evicts_the_client():
+    async def run():
+        manager = make_manager(queue_size=8, send_timeout=0.05)
+        slow = FakeWebSocket(blocked=True)
+        await manager.connect(slow)
+        await manager.broadcast("m0")
+        await asyncio.sleep(0.2)
+        assert slow not in manager.active_connections
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        await manager.close_all()
+
+    asyncio.run(run())
+
+def test_disconnect_stops_the_writer_right_after_a_send():
+    async def run():
+        manager = make_manager(queue_size=8)
+        websocket = FakeWebSocket()
+        connection = await manager.connect(websocket)
+        await manager.broadcast("m0")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        manager.disconnect(websocket)
+        await settle()
+        assert connection.writer.cancelled()
+
+    asyncio.run(run())
+
+def test_close_all_closes_every_connection():
+    async def run():
+        manager = make_manager()
+        clients = [FakeWebSocket(), FakeWebSocket()]
+        for websocket in clients:
+            await manager.connect(websocket)
+        await manager.close_all()
+        assert [websocket.closed_with for websocket in clients] == [1001, 1001]
+        assert manager.stats()["connections"] == 0
+
+    asyncio.run(run())
@@ -2,13 +2,18 @@
 CREATE DATABASE IF NOT EXISTS agentai_db;
 USE agentai_db;
 
+-- 以下為字符串主鍵 (VARCHAR) 的表結構; 使用 DB_BINARY_KEYS=true 時請勿執行此腳本,
+-- 由後端啟動時的 alembic 遷移以 BINARY(16) 主鍵建表, 已有數據用 python -m backend.convert_binary_keys 轉換
+
 -- 創建用戶表
 CREATE TABLE IF NOT EXISTS users (
     user_id VARCHAR(255) PRIMARY KEY,
     username VARCHAR(255) NOT NULL UNIQUE,
     email VARCHAR(255) NOT NULL UNIQUE,
     hashed_password VARCHAR(255) NOT NULL,
-    register_date DATETIME DEFAULT CURRENT_TIMESTAMP
+    register_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    -- 游標分頁按 (時間, 主鍵) 倒序
+    INDEX ix_users_register_date_id (register_date, user_id)
 );
 
 -- 創建協議表
@@ -25,7 +30,10 @@ CREATE TABLE IF NOT EXISTS knowledge (
     content TEXT NOT NULL,
     source VARCHAR(2048),
     update_time DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    FOREIGN KEY (protocol_id) REFERENCES protocols(protocol_id)
+    INDEX ix_knowledge_protocol_id (protocol_id),
+    FOREIGN KEY (protocol_id) REFERENCES protocols(protocol_id),
+    -- 知識全文檢索 (KNOWLEDGE_SEARCH_BACKEND=fulltext), ngram 分詞支持中文
+    FULLTEXT INDEX ft_knowledge_content (content) WITH PARSER ngram
 );
 
 -- 創建問題表
@@ -36,7 +44,11 @@ CREATE TABLE IF NOT EXISTS questions (
     image_url VARCHAR(2048),
     file_url VARCHAR(2048),
     file_name VARCHAR(255),
+    category VARCHAR(64),
     ask_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_questions_category (category),
+    INDEX ix_questions_ask_time_id (ask_time, question_id),
+    INDEX ix_questions_user_ask_time_id (user_id, ask_time, question_id),
     FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
@@ -46,6 +58,8 @@ CREATE TABLE IF NOT EXISTS solutions (
     question_id VARCHAR(255) NOT NULL,
     steps TEXT NOT NULL,
     confidence_score FLOAT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_solutions_created_at_id (created_at, solution_id),
     FOREIGN KEY (question_id) REFERENCES questions(question_id)
 );
 
@@ -56,6 +70,12 @@ CREATE TABLE IF NOT EXISTS feedbacks (
     solution_id VARCHAR(255) NOT NULL,
     rating INT NOT NULL,
     comment TEXT,
+    status VARCHAR(255) DEFAULT '待处理',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_feedbacks_created_at_id (created_at, feedback_id),
+    INDEX ix_feedbacks_solution_user (solution_id, user_id),
+    INDEX ix_feedbacks_user_created (user_id, created_at),
+    INDEX ix_feedbacks_status_rating (status, rating),
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     FOREIGN KEY (solution_id) REFERENCES solutions(solution_id)
 );
@@ -69,6 +89,22 @@ CREATE TABLE IF NOT EXISTS solution_references_knowledge (
     FOREIGN KEY (knowledge_id) REFERENCES knowledge(knowledge_id)
 );
 
+-- 創建熱門問題點擊記錄表
+CREATE TABLE IF NOT EXISTS hot_question_clicks (
+    click_id INT AUTO_INCREMENT PRIMARY KEY,
+    question_id VARCHAR(255) NOT NULL,
+    clicked_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_hot_question_clicks_question_time (question_id, clicked_at)
+);
+
+-- 創建熱門問題排行快照表
+CREATE TABLE IF NOT EXISTS hot_question_snapshots (
+    question_id VARCHAR(32) PRIMARY KEY,
+    question TEXT NOT NULL,
+    score DOUBLE NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+
 -- 插入測試數據
 INSERT INTO protocols (protocol_id, name, rfc_number) VALUES
 ('p1', 'BGP', 'RFC 4271'),
@@ -22,19 +22,22 @@ class FeedbackService {
     }
   }
 
-  // 獲取用戶反饋列表
+  // 獲取用戶反饋列表 (下一頁傳入上一頁返回的 next_cursor)
   Future<List<Map<String, dynamic>>> getFeedbacks({
     int limit = 10,
-    int offset = 0,
+    String? cursor,
   }) async {
     try {
       final response = await http.get(
-        Uri.parse('${baseUrl}/feedbacks/?limit=$limit&offset=$offset'),
+        Uri.parse('${baseUrl}/feedbacks/').replace(queryParameters: {
+          'limit': '$limit',
+          if (cursor != null) 'cursor': cursor,
+        }),
         headers: await _getAuthHeaders(),
       );
 
       if (response.statusCode == 200) {
-        final List<dynamic> data = json.decode(response.body);
+        final List<dynamic> data = json.decode(response.body)['items'];
         return data.map((item) => item as Map<String, dynamic>).toList();
       } else {
         throw Exception('Failed to load feedbacks: ${response.statusCode}');